@@ -0,0 +1,176 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import sklearn
+from shared.schemas.inference import InferenceInput
+from shared.schemas.wire import decode_input, pack_input
+
+from ml_inference.core.config import settings
+from ml_inference.core.logger import get_logger
+from ml_inference.model.compiled_trees import compile_ensemble
+from ml_inference.model.encoder import SCALED_COLUMNS, encoder, ndarray_features, scale_features
+from ml_inference.model.load_model import load_model
+from ml_inference.model.predict import encode_batch, interpret_score, preprocess_input, run_batch_inference
+
+logger = get_logger("benchmark")
+
+DEFAULT_SIZES = [1, 32, 1_000, 100_000]
+# Совместимый путь через DataFrame строит по фрейму на строку — на больших батчах его не гоняем
+PREPROCESS_INPUT_MAX_ROWS = 1_000
+
+
+def sample_records(n: int, seed: int = 0) -> list[dict]:
+    """Случайные валидные анкеты в виде словарей, как они приходят в API"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        record = {name: rng.choice(values) for name, values in encoder.categories.items()}
+        record.update(Age=rng.randint(18, 90), Income=rng.randint(0, 200_000), Number_of_Children=rng.randint(0, 5))
+        records.append(record)
+    return records
+
+
+def time_stage(fn: Callable[[], object], min_time_s: float = 0.2, min_repeats: int = 3, max_repeats: int = 1000) -> float:
+    """Медианное время одного вызова fn: повторяем, пока не наберётся min_time_s и min_repeats"""
+    fn()  # прогрев
+    timings = []
+    total = 0.0
+    while len(timings) < max_repeats and (len(timings) < min_repeats or total < min_time_s):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        total += elapsed
+    return statistics.median(timings)
+
+
+def benchmark_model(model_type: str, size: int, min_time_s: float = 0.2) -> dict[str, float]:
+    """-> {стадия: секунд на вызов} для батча из size строк"""
+    model = load_model(model_type)
+    records = sample_records(size)
+    inputs = [InferenceInput.model_validate(record) for record in records]
+    packed = [pack_input(record) for record in records]
+    features = encode_batch(inputs)
+    scaled = scale_features(features.copy(), model.scaler)
+    scores = model.predict(features).tolist()
+
+    stages = {
+        "validate": lambda: [InferenceInput.model_validate(record) for record in records],
+        # разбор входа воркером из компактной записи (shared.schemas.wire)
+        "wire_decode": lambda: [decode_input(payload) for payload in packed],
+        "encode": lambda: encode_batch(inputs),
+        "scaler_transform": lambda: model.scaler.transform(features[:, SCALED_COLUMNS]),
+        "model_predict": lambda: model.model.predict(scaled),
+        "fast_path_predict": lambda: model.predict(features),
+        "interpret_score": lambda: [interpret_score(score) for score in scores],
+        "run_batch_inference": lambda: run_batch_inference(model_type, inputs),
+    }
+    try:
+        compiled = compile_ensemble(model.model)
+    except ValueError:
+        compiled = None  # не ансамбль деревьев
+    if compiled is not None:
+        # обход деревьев на numpy против model_predict: на одной строке он должен быть быстрее
+        stages["compiled_trees_predict"] = lambda: compiled.predict(scaled)
+    if size <= PREPROCESS_INPUT_MAX_ROWS:
+        stages["preprocess_input"] = lambda: [preprocess_input(item, model.scaler) for item in inputs]
+
+    results = {}
+    cache_enabled = settings.prediction_cache_enabled
+    # Кэш предсказаний превратил бы повторные прогоны в замер поиска по словарю
+    settings.prediction_cache_enabled = False
+    try:
+        with ndarray_features():
+            for stage, fn in stages.items():
+                results[stage] = time_stage(fn, min_time_s=min_time_s)
+    finally:
+        settings.prediction_cache_enabled = cache_enabled
+    return results
+
+
+def run_suite(models: list[str], sizes: list[int], min_time_s: float = 0.2) -> dict:
+    results = {}
+    for model_type in models:
+        results[model_type] = {}
+        for size in sizes:
+            stages = benchmark_model(model_type, size, min_time_s=min_time_s)
+            results[model_type][str(size)] = stages
+            for stage, seconds in stages.items():
+                print(f"{model_type:>8} {size:>7} {stage:>20}: {seconds * 1e6:12.1f} us  ({seconds / size * 1e6:8.3f} us/row)")
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+            "model_versions": {name: load_model(name).version for name in models},
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, noise_floor_s: float = 5e-6) -> list[str]:
+    """
+    Стадии, которые замедлились больше чем в (1 + threshold) раз относительно базы.
+
+    Разницы меньше noise_floor_s не считаются: у микросекундных стадий шум
+    таймера сравним с самим временем.
+    """
+    regressions = []
+    for model_type, sizes in current["results"].items():
+        for size, stages in sizes.items():
+            base_stages = baseline["results"].get(model_type, {}).get(size, {})
+            for stage, seconds in stages.items():
+                base = base_stages.get(stage)
+                if base is None:
+                    continue
+                if seconds > base * (1 + threshold) and seconds - base > noise_floor_s:
+                    regressions.append(
+                        f"{model_type} batch={size} {stage}: {base * 1e6:.1f} us -> {seconds * 1e6:.1f} us "
+                        f"(+{(seconds / base - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк стадий инференса на реальных артефактах из model_dir")
+    parser.add_argument("--models", nargs="+", help="по умолчанию все *.pkl из model_dir")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальное суммарное время замера стадии, с")
+    parser.add_argument("--save", help="сохранить результаты в JSON (новая база)")
+    parser.add_argument("--baseline", help="JSON с базой для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление стадии (0.25 = +25%%)")
+    parser.add_argument("--noise-floor-us", type=float, default=5.0, help="игнорировать разницу меньше, мкс")
+    args = parser.parse_args(argv)
+
+    from ml_inference.model.load_model import model_registry
+    current = run_suite(args.models or model_registry.available(), args.sizes, min_time_s=args.min_time)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(current, indent=2))
+        print(f"saved {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(baseline, current, args.threshold, noise_floor_s=args.noise_floor_us / 1e6)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed past +{args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"no regressions past +{args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
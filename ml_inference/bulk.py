@@ -0,0 +1,222 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from pydantic import ValidationError
+from shared.schemas.inference import InferenceInput
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("bulk")
+
+OUTPUT_FIELDS = ["row", "id", "score", "explanation", "model_version"]
+ERROR_FIELDS = ["row", "id", "error"]
+
+
+def read_records(stream: TextIO, fmt: str) -> tuple[list[str] | None, Iterator[tuple[int, str | list[str]]]]:
+    """
+    -> (заголовок CSV, поток (номер записи с 1, сырая запись)).
+
+    Разбор JSON и валидация идут в процессах пула: им передаются сырые строки,
+    которые сериализуются между процессами намного дешевле словарей.
+    """
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        return header, enumerate(reader, start=1)
+    lines = (line for line in stream if line.strip())
+    return None, enumerate(lines, start=1)
+
+
+def chunked(records: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _init_worker(model_type: str):
+    # Модель загружается один раз на процесс пула, дальше все чанки скорятся на ней
+    from ml_inference.model.load_model import load_model
+    load_model(model_type)
+
+
+def _parse(raw: str | list[str], header: list[str] | None) -> dict | str:
+    """Сырая запись -> словарь полей или текст ошибки разбора"""
+    if header is not None:
+        if len(raw) != len(header):
+            return f"expected {len(header)} columns, got {len(raw)}"
+        return dict(zip(header, raw))
+    try:
+        record = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return f"invalid JSON: {e}"
+    return record if isinstance(record, dict) else "record is not a JSON object"
+
+
+def _format(records: list[dict], fmt: str, fields: list[str]) -> str:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=fields).writerows(records)
+        return buffer.getvalue()
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def score_chunk(
+    model_type: str,
+    chunk: list[tuple[int, str | list[str]]],
+    header: list[str] | None = None,
+    output_format: str = "jsonl",
+    id_field: str | None = None,
+) -> tuple[str, str, int, int]:
+    """
+    Разбирает и валидирует чанк, скорит валидные строки одним predict.
+    -> (результаты и ошибки уже в выходном формате, число результатов, число ошибок)
+    """
+    from ml_inference.model.encoder import encoder
+    from ml_inference.model.load_model import load_model
+    from ml_inference.model.predict import interpret_score
+
+    valid, ids, rows, errors = [], [], [], []
+    for number, raw in chunk:
+        record = _parse(raw, header)
+        if isinstance(record, str):
+            errors.append({"row": number, "id": None, "error": record})
+            continue
+        record_id = record.get(id_field) if id_field else None
+        try:
+            valid.append(InferenceInput.model_validate(record))
+        except ValidationError as e:
+            reason = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append({"row": number, "id": record_id, "error": reason})
+            continue
+        ids.append(record_id)
+        rows.append(number)
+
+    results = []
+    if valid:
+        model = load_model(model_type)
+        scores = model.predict(encoder.encode(valid)).tolist()
+        results = [
+            {
+                "row": number,
+                "id": record_id,
+                "score": score,
+                "explanation": interpret_score(score),
+                "model_version": model.version,
+            }
+            for number, record_id, score in zip(rows, ids, scores)
+        ]
+    # Невалидные строки всегда пишутся JSONL: в тексте ошибки бывают запятые и переводы строк
+    return _format(results, output_format, OUTPUT_FIELDS), _format(errors, "jsonl", ERROR_FIELDS), len(results), len(errors)
+
+
+def run_bulk(
+    model_type: str,
+    source: TextIO,
+    sink: TextIO,
+    input_format: str = "jsonl",
+    output_format: str = "jsonl",
+    errors_sink: TextIO | None = None,
+    chunk_size: int = 10_000,
+    workers: int = 0,
+    id_field: str | None = None,
+) -> dict:
+    """
+    Скорит поток записей чанками и пишет результаты в порядке входа.
+
+    В работе одновременно не больше 2 * workers чанков, поэтому память
+    ограничена размером чанка, а не размером файла. workers=0 — без пула,
+    в текущем процессе.
+    """
+    if output_format == "csv":
+        csv.writer(sink).writerow(OUTPUT_FIELDS)
+    stats = {"rows": 0, "scored": 0, "invalid": 0}
+    started = time.perf_counter()
+
+    def consume(results: str, errors: str, scored: int, invalid: int):
+        sink.write(results)
+        if errors_sink is not None:
+            errors_sink.write(errors)
+        stats["scored"] += scored
+        stats["invalid"] += invalid
+        stats["rows"] += scored + invalid
+
+    header, records = read_records(source, input_format)
+    args = (header, output_format, id_field)
+    if workers <= 0:
+        _init_worker(model_type)
+        for chunk in chunked(records, chunk_size):
+            consume(*score_chunk(model_type, chunk, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_type,)) as pool:
+            in_flight = deque()
+            for chunk in chunked(records, chunk_size):
+                in_flight.append(pool.submit(score_chunk, model_type, chunk, *args))
+                if len(in_flight) >= 2 * workers:
+                    consume(*in_flight.popleft().result())
+            while in_flight:
+                consume(*in_flight.popleft().result())
+
+    stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+    stats["rows_per_s"] = round(stats["rows"] / stats["elapsed_s"], 1) if stats["elapsed_s"] else 0.0
+    logger.info(f"[BULK] model_type={model_type} {stats}")
+    return stats
+
+
+def _detect_format(path: str, explicit: str | None) -> str:
+    if explicit:
+        return explicit
+    return "csv" if Path(path).suffix.lower() == ".csv" else "jsonl"
+
+
+def _open(path: str, mode: str, std: TextIO):
+    if path == "-":
+        return nullcontext(std)
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Офлайн-скоринг файла InferenceInput (JSONL или CSV)")
+    parser.add_argument("model", help="имя модели из model_dir, например premium")
+    parser.add_argument("input", help="входной .jsonl/.csv или - для stdin")
+    parser.add_argument("-o", "--output", default="-", help="куда писать результаты (по умолчанию stdout)")
+    parser.add_argument("--errors", help="куда писать невалидные строки (по умолчанию только счётчик)")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"])
+    parser.add_argument("--output-format", choices=["jsonl", "csv"])
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=0, help="размер пула процессов (0 — в текущем процессе)")
+    parser.add_argument("--id-field", help="поле входа, которое переносится в результат как id")
+    args = parser.parse_args(argv)
+
+    output_format = _detect_format(args.output, args.output_format)
+    with _open(args.input, "r", sys.stdin) as source, \
+         _open(args.output, "w", sys.stdout) as sink, \
+         (_open(args.errors, "w", sys.stderr) if args.errors else nullcontext()) as errors_sink:
+        stats = run_bulk(
+            args.model, source, sink,
+            input_format=_detect_format(args.input, args.input_format),
+            output_format=output_format,
+            errors_sink=errors_sink,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            id_field=args.id_field,
+        )
+
+    print(
+        f"rows={stats['rows']} scored={stats['scored']} invalid={stats['invalid']} "
+        f"elapsed={stats['elapsed_s']}s throughput={stats['rows_per_s']} rows/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
+import os
+
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, task_postrun
 from ml_inference.core.config import settings
+from ml_inference.core.queues import celery_queue_config
+from ml_inference.core.preload import preload_models, log_process_memory
 from ml_inference.core.logger import get_logger
+from ml_inference.model.load_model import model_registry
+from ml_inference.monitoring.metrics import mark_process_dead, start_metrics_server
 
 logger = get_logger("celery")
 
 celery_app = Celery(
     "ml_inference",
     broker=settings.celery_broker_url,
-    backend="redis://redis:6379/1"  
+    backend=settings.celery_result_backend or None
 )
 
 celery_app.autodiscover_tasks(["ml_inference.tasks"])
@@ -15,8 +22,47 @@ celery_app.autodiscover_tasks(["ml_inference.tasks"])
 celery_app.conf.update(
     worker_send_task_events=True,
     task_send_sent_event=True,
+    task_ignore_result=not settings.celery_result_backend,
+    **celery_queue_config(),
 )
 
 logger.info("[CELERY] Celery app initialized")
 logger.info(f"[CELERY] Broker: {settings.celery_broker_url}")
+logger.info(f"[CELERY] Queues: {list(celery_app.amqp.queues)} | concurrency={celery_app.conf.worker_concurrency}")
 logger.info(f"[CELERY] Tasks autodiscovered from: ['ml_inference.tasks']")
+
+
+@worker_init.connect
+def preload_before_fork(**kwargs):
+    # worker_init срабатывает в родительском процессе до создания prefork-пула.
+    # Метрики поднимаем первыми: загрузка моделей уже пишет в гистограммы
+    start_metrics_server(settings.metrics_port)
+    if not settings.preload_enabled:
+        return
+    loaded = preload_models()
+    logger.info(f"[CELERY] Models preloaded before fork: {loaded}")
+    log_process_memory("parent_preloaded")
+
+
+@worker_process_init.connect
+def report_child_start(**kwargs):
+    log_process_memory("child_start")
+    model_registry.start_watcher()
+
+
+_tasks_done = 0
+
+
+@task_postrun.connect
+def report_child_memory(**kwargs):
+    global _tasks_done
+    _tasks_done += 1
+    every = settings.memory_report_every_tasks
+    if every > 0 and _tasks_done % every == 0:
+        log_process_memory(f"after_{_tasks_done}_tasks")
+
+
+@worker_process_shutdown.connect
+def report_child_shutdown(**kwargs):
+    log_process_memory("child_shutdown")
+    mark_process_dead(os.getpid())
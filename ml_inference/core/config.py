@@ -1,8 +1,103 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+
+class QueuePool(BaseModel):
+    """Параметры пула воркеров одной очереди"""
+    concurrency: int = 2
+    prefetch_multiplier: int = 1
+    soft_time_limit_s: float | None = None
+    time_limit_s: float | None = None
+
+
 class Settings(BaseSettings):
     celery_broker_url: str
     model_dir: str
+    # Result backend Celery не нужен API (результат приходит через result_channel); пусто — выключен
+    celery_result_backend: str = ""
+
+    # Доставка результата в API: SET + PUBLISH в inference:result:<task_uuid>
+    result_channel_redis_url: str = "redis://redis:6379/4"
+    result_channel_ttl_s: int = 300
+
+    # Singleflight (в том же Redis, что и result_channel): одинаковые (model_type, вход), пока первая
+    # такая задача в работе, в очередь не ставятся и получают её результат — каждая в свою строку
+    # и со своим списанием. Lease лидера истекает сам, если воркер умер
+    singleflight_enabled: bool = True
+    singleflight_lease_ms: int = 30_000
+    singleflight_followers_ttl_s: int = 3600
+
+    # Как часто реестр моделей проверяет артефакты в model_dir на изменения (0 — не проверять)
+    model_reload_interval_s: float = 30.0
+
+    # Скорить ансамбли деревьев (premium) через плоские массивы вместо sklearn predict
+    # (до compiled_trees_max_rows строк; на батчах крупнее быстрее сам sklearn)
+    compiled_trees_enabled: bool = True
+    compiled_trees_max_rows: int = 64
+
+    # Линейные модели (simple): скейлер вшивается в коэффициенты, скоринг — одно скалярное произведение
+    fused_linear_enabled: bool = True
+    # Сверять каждый ответ быстрого пути с исходным scaler.transform + model.predict
+    # (отдаётся результат исходного пути, расхождения пишутся в лог)
+    fast_path_verify: bool = False
+
+    # Кэш предсказаний по (модель, версия, канонический вход): LRU в процессе
+    # и, если задан prediction_cache_redis_url, общий уровень в Redis
+    prediction_cache_enabled: bool = True
+    prediction_cache_max_entries: int = 100_000
+    prediction_cache_ttl_s: int = 3600
+    prediction_cache_redis_url: str = ""
+
+    # Какие модели загрузить и прогреть в родительском процессе воркера до fork
+    # (None — все *.pkl из model_dir, [] — ни одной). Дочерние процессы делят эти страницы copy-on-write
+    preload_enabled: bool = True
+    preload_models: list[str] | None = None
+    # Раз в сколько задач дочерний процесс пишет в лог свой RSS/PSS (0 — только при старте/остановке)
+    memory_report_every_tasks: int = 100
+
+    # Микробатчинг: задачи одного model_type внутри процесса воркера копятся
+    # до max_size штук или max_wait_ms и скорятся одним model.predict.
+    # Имеет смысл с пулом, где в процессе идут несколько задач сразу (-P threads)
+    inference_batching_enabled: bool = False
+    inference_batch_max_size: int = 32
+    inference_batch_max_wait_ms: float = 10.0
+    # Сколько задача ждёт результат своего батча, прежде чем упасть по таймауту
+    inference_batch_result_timeout_s: float = 30.0
+
+    # Запись результатов: "sync" — воркер сам пишет строку и биллинг в Postgres,
+    # "stream" — публикует результат в Redis Stream, в БД пачками пишет python -m ml_inference.persistence
+    persistence_mode: Literal["sync", "stream"] = "sync"
+    persistence_redis_url: str = "redis://redis:6379/3"
+    persistence_stream: str = "inference:results"
+    persistence_group: str = "persistence"
+    persistence_batch_size: int = 500
+    persistence_block_ms: int = 1000
+    # Через сколько простоя запись, взятая упавшим consumer'ом, переходит другому
+    persistence_claim_idle_ms: int = 60_000
+    # Запись, которую не удаётся записать даже отдельно от пачки, после стольких доставок
+    # уходит в dead-letter поток, чтобы не держать остальные
+    persistence_max_deliveries: int = 5
+    persistence_dead_letter_stream: str = "inference:results:dead"
+    persistence_metrics_port: int = 9809
+
+    # Очереди по моделям: задача модели X идёт в <prefix>.X, если X есть в inference_queues,
+    # иначе в <prefix>.default; мультимодельные задачи — в <prefix>.multi.
+    # Дешёвые модели не стоят в очереди за тяжёлыми
+    inference_queue_prefix: str = "inference"
+    inference_queues: dict[str, QueuePool] = {
+        "simple": QueuePool(concurrency=4, prefetch_multiplier=4, soft_time_limit_s=5, time_limit_s=10),
+        "premium": QueuePool(concurrency=2, prefetch_multiplier=1, soft_time_limit_s=60, time_limit_s=120),
+        "multi": QueuePool(concurrency=2, prefetch_multiplier=1, soft_time_limit_s=60, time_limit_s=120),
+        "default": QueuePool(concurrency=2, prefetch_multiplier=1, soft_time_limit_s=60, time_limit_s=120),
+    }
+    # Какие очереди (ключи inference_queues) слушает этот воркер; None — все.
+    # Пул воркера настраивается по ним: concurrency складывается, prefetch — минимальный, лимиты — максимальные
+    worker_queues: list[str] | None = None
+
+    # Порт /metrics воркера (0 — не поднимать). Под prefork нужен PROMETHEUS_MULTIPROC_DIR
+    metrics_port: int = 9808
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,70 @@
+import gc
+import os
+import resource
+import time
+
+from shared.schemas.inference import InferenceInput
+from ml_inference.core.config import settings
+from ml_inference.model.encoder import encoder
+from ml_inference.model.load_model import model_registry
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("preload")
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def warmup_input() -> InferenceInput:
+    return InferenceInput(
+        Age=30,
+        Income=0,
+        Number_of_Children=0,
+        **{name: values[0] for name, values in encoder.categories.items()},
+    )
+
+
+def preload_models(names: list[str] | None = None) -> dict[str, str]:
+    """Загружает и прогревает модели в текущем процессе, возвращает {модель: версия}"""
+    # пустой список — явно ничего не грузить, None — все модели
+    if names is None:
+        names = model_registry.available() if settings.preload_models is None else settings.preload_models
+    features = encoder.encode([warmup_input()])
+    loaded = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            # без потока перезагрузки: его запускает каждый процесс воркера после fork
+            model = model_registry.get(name, watch=False)
+            model.predict(features)
+        except Exception:
+            logger.exception(f"[PRELOAD][ERROR] Failed to preload {name}, it will be loaded lazily")
+            continue
+        loaded[name] = model.version
+        logger.info(f"[PRELOAD] {name} version={model.version} ready in {time.perf_counter() - started:.3f}s")
+
+    # Объекты, созданные до fork, уводим из-под сборщика мусора: иначе его обходы
+    # в дочерних процессах пишут в заголовки объектов и копируют общие страницы
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+
+def process_memory() -> dict[str, int]:
+    """Память текущего процесса в КиБ: Rss/Pss/Shared_*/Private_* из smaps_rollup"""
+    try:
+        with open(f"/proc/{os.getpid()}/smaps_rollup") as f:
+            memory = {}
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    memory[key] = int(value.split()[0])
+            return memory
+    except OSError:
+        # не Linux — только пиковый RSS
+        return {"MaxRss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def log_process_memory(stage: str):
+    memory = " ".join(f"{key}={value}kB" for key, value in process_memory().items())
+    logger.info(f"[MEMORY] pid={os.getpid()} stage={stage} {memory}")
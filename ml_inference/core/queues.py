@@ -0,0 +1,70 @@
+from kombu import Exchange, Queue
+
+from ml_inference.core.config import QueuePool, settings
+
+MULTI = "multi"
+DEFAULT = "default"
+
+
+def queue_name(tier: str) -> str:
+    return f"{settings.inference_queue_prefix}.{tier}"
+
+
+def declare_queue(tier: str) -> Queue:
+    # Своя direct-биржа с ключом = имя очереди, как у очередей, которые Celery создаёт сам;
+    # без неё очередь привязывается к бирже по умолчанию с чужим routing_key
+    name = queue_name(tier)
+    return Queue(name, Exchange(name, type="direct"), routing_key=name)
+
+
+def tier_for(model_type: str | list[str]) -> str:
+    """Ключ inference_queues для задачи: своя очередь модели, multi для нескольких моделей или default"""
+    tier = model_type if isinstance(model_type, str) else MULTI
+    return tier if tier in settings.inference_queues else DEFAULT
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Роутер Celery: первый аргумент задач инференса — model_type (или список model_types)"""
+    model_type = args[0] if args else kwargs.get("model_type", kwargs.get("model_types"))
+    if model_type is None:
+        return None
+    return {"queue": queue_name(tier_for(model_type))}
+
+
+def worker_tiers() -> list[str]:
+    tiers = settings.worker_queues or list(settings.inference_queues)
+    unknown = [tier for tier in tiers if tier not in settings.inference_queues]
+    if unknown:
+        raise ValueError(f"worker_queues {unknown} are not configured in inference_queues")
+    return tiers
+
+
+def worker_pool(tiers: list[str]) -> QueuePool:
+    """Один пул на несколько очередей: воркер должен вытянуть сумму их нагрузки и не рубить самую долгую задачу"""
+    pools = [settings.inference_queues[tier] for tier in tiers]
+
+    def max_limit(values):
+        values = [value for value in values if value is not None]
+        return max(values) if values else None
+
+    return QueuePool(
+        concurrency=sum(pool.concurrency for pool in pools),
+        prefetch_multiplier=min(pool.prefetch_multiplier for pool in pools),
+        soft_time_limit_s=max_limit(pool.soft_time_limit_s for pool in pools),
+        time_limit_s=max_limit(pool.time_limit_s for pool in pools),
+    )
+
+
+def celery_queue_config() -> dict:
+    """Настройки Celery: очереди этого воркера, роутинг по model_type и параметры пула"""
+    tiers = worker_tiers()
+    pool = worker_pool(tiers)
+    return {
+        "task_queues": [declare_queue(tier) for tier in tiers],
+        "task_default_queue": queue_name(DEFAULT),
+        "task_routes": (route_task,),
+        "worker_concurrency": pool.concurrency,
+        "worker_prefetch_multiplier": pool.prefetch_multiplier,
+        "task_soft_time_limit": pool.soft_time_limit_s,
+        "task_time_limit": pool.time_limit_s,
+    }
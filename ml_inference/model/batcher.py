@@ -0,0 +1,120 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, Sequence
+
+from shared.schemas.inference import InferenceInput
+from ml_inference.core.config import settings
+from .predict import run_batch_inference
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("batcher")
+
+
+class MicroBatcher:
+    """
+    Копит запросы одного model_type и скорит их одним вызовом score_fn.
+
+    Батч отправляется, когда набралось max_batch_size запросов или с момента
+    прихода первого прошло max_wait_ms. Каждый вызывающий получает свой
+    Future со своим результатом.
+    """
+
+    def __init__(
+        self,
+        model_type: str,
+        max_batch_size: int,
+        max_wait_ms: float,
+        score_fn: Callable[[str, Sequence[InferenceInput]], list[dict]] = run_batch_inference,
+    ):
+        self.model_type = model_type
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.score_fn = score_fn
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def submit(self, user_input: InferenceInput) -> Future:
+        future = Future()
+        self._ensure_worker().put((user_input, future))
+        return future
+
+    def _ensure_worker(self) -> queue.Queue:
+        # После fork потоков родителя в дочернем процессе нет — поднимаем свой
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(
+                    target=self._run, args=(self._queue,), name=f"batcher-{self.model_type}", daemon=True
+                ).start()
+                logger.info(f"[BATCHER] Started for model_type={self.model_type} pid={self._pid}")
+            return self._queue
+
+    def _collect(self, pending: queue.Queue) -> list:
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = self._collect(pending)
+            # Поток один на процесс: если он умрёт, все следующие submit повиснут
+            try:
+                self._score(batch)
+            except Exception as e:
+                logger.exception(f"[BATCHER][ERROR] Batch failed | model_type={self.model_type} | size={len(batch)}")
+                for _, future in batch:
+                    _settle(future, error=e)
+
+    def _score(self, batch: list):
+        results = self.score_fn(self.model_type, [user_input for user_input, _ in batch])
+        if len(results) != len(batch):
+            raise ValueError(f"score_fn returned {len(results)} results for {len(batch)} inputs")
+        logger.info(f"[BATCHER] Scored batch | model_type={self.model_type} | size={len(batch)}")
+        for (_, future), result in zip(batch, results):
+            _settle(future, result=result)
+
+
+def _settle(future: Future, result=None, error: Exception | None = None):
+    # Future мог уже завершиться (частично разобранный батч) или быть отменён вызывающим
+    if future.done():
+        return
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+_batchers: dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_type: str) -> MicroBatcher:
+    with _batchers_lock:
+        if model_type not in _batchers:
+            _batchers[model_type] = MicroBatcher(
+                model_type,
+                max_batch_size=settings.inference_batch_max_size,
+                max_wait_ms=settings.inference_batch_max_wait_ms,
+            )
+        return _batchers[model_type]
+
+
+def run_batched_inference(model_type: str, user_input: InferenceInput) -> dict:
+    return get_batcher(model_type).submit(user_input).result(timeout=settings.inference_batch_result_timeout_s)
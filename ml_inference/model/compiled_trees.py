@@ -0,0 +1,166 @@
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("compiled_trees")
+
+# Сколько строк обходить за раз: память под индексы узлов — rows * n_trees * 8 байт
+CHUNK_ROWS = 8192
+
+
+@dataclass(frozen=True)
+class CompiledEnsemble:
+    """
+    Ансамбль деревьев в виде плоских массивов узлов.
+
+    Узлы всех деревьев лежат подряд; у листа feature=0, threshold=+inf и обе
+    ссылки указывают на него самого, поэтому за max_depth шагов каждая строка
+    гарантированно доходит до листа во всех деревьях одновременно.
+    Скор = base + scale * сумма значений листьев.
+    """
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    max_depth: int
+    base: float
+    scale: float
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # sklearn сравнивает признаки во float32 с порогами во float64 — делаем так же
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + CHUNK_ROWS])
+            for start in range(0, X.shape[0], CHUNK_ROWS)
+        ])
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.tile(self.roots, (X.shape[0], 1))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.base + self.scale * self.value[node].sum(axis=1)
+
+    def save(self, path: str | Path):
+        np.savez(
+            path,
+            feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            value=self.value, roots=self.roots,
+            meta=np.array([self.max_depth, self.base, self.scale], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompiledEnsemble":
+        with np.load(path) as data:
+            max_depth, base, scale = data["meta"]
+            return cls(
+                feature=data["feature"], threshold=data["threshold"], left=data["left"],
+                right=data["right"], value=data["value"], roots=data["roots"],
+                max_depth=int(max_depth), base=float(base), scale=float(scale),
+            )
+
+
+def _ensemble_parts(model) -> tuple[list, float, float]:
+    """-> (деревья sklearn, base, scale) для поддерживаемых ансамблей"""
+    kind = type(model).__name__
+    if kind == "GradientBoostingRegressor":
+        if model.init_ == "zero":
+            base = 0.0
+        elif type(model.init_).__name__ == "DummyRegressor":
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError(f"Unsupported init estimator for compilation: {model.init_!r}")
+        return [stage[0] for stage in model.estimators_], base, float(model.learning_rate)
+    if kind in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return list(model.estimators_), 0.0, 1.0 / len(model.estimators_)
+    if kind in ("DecisionTreeRegressor", "ExtraTreeRegressor"):
+        return [model], 0.0, 1.0
+    raise ValueError(f"Model {kind} cannot be compiled into flat trees")
+
+
+def compile_ensemble(model) -> CompiledEnsemble:
+    trees, base, scale = _ensemble_parts(model)
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in trees:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        own = np.arange(tree.node_count) + offset
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+        rights.append(np.where(is_leaf, own, tree.children_right + offset))
+        values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    compiled = CompiledEnsemble(
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.array(roots, dtype=np.intp),
+        max_depth=max_depth,
+        base=base,
+        scale=scale,
+    )
+    logger.info(f"[COMPILE] {type(model).__name__}: trees={len(trees)} nodes={offset} max_depth={max_depth}")
+    return compiled
+
+
+def max_abs_diff(model, compiled: CompiledEnsemble, X: np.ndarray) -> float:
+    return float(np.max(np.abs(np.asarray(model.predict(X)) - compiled.predict(X))))
+
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: list[str] | None = None):
+    from ml_inference.model.encoder import encoder, scale_features
+    from ml_inference.model.load_model import model_registry
+
+    parser = argparse.ArgumentParser(description="Компиляция ансамбля деревьев в плоские массивы, сверка и бенчмарк")
+    parser.add_argument("model", nargs="?", default="premium")
+    parser.add_argument("--out", help="куда сохранить .npz (по умолчанию <model_dir>/<model>.trees.npz)")
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    entry = model_registry.get(args.model)
+    compiled = compile_ensemble(entry.model)
+    out = Path(args.out) if args.out else model_registry.model_dir / f"{args.model}.trees.npz"
+    compiled.save(out)
+    print(f"saved {out}")
+
+    X = scale_features(encoder.sample_features(args.rows), entry.scaler)
+    print(f"parity max |diff| on {args.rows} rows: {max_abs_diff(entry.model, compiled, X):.3e}")
+
+    for label, batch, repeat in (("single row", X[:1], 200), ("batch 32", X[:32], 100), (f"batch {args.rows}", X, 5)):
+        original = _best_time(lambda: entry.model.predict(batch), repeat)
+        fast = _best_time(lambda: compiled.predict(batch), repeat)
+        print(f"{label:>14}: sklearn {original * 1e6:10.1f} us | compiled {fast * 1e6:10.1f} us | x{original / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import warnings
+from contextlib import contextmanager
+from typing import Mapping, Sequence, get_args
+
+import numpy as np
+from shared.schemas.inference import InferenceInput
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("encoder")
+
+# Порядок колонок, на котором обучались модели (model.feature_names_in_)
+FEATURE_COLUMNS = [
+    "Age",
+    "Employment Status",
+    "Income",
+    "Education Level_Bachelor's Degree",
+    "Education Level_High School",
+    "Education Level_Master's Degree",
+    "Education Level_PhD",
+    "Social_Support",
+    "family_personal_health",
+    "personal_burden",
+]
+# Колонки, которые масштабирует scaler.joblib (Age, Income)
+SCALED_COLUMNS = [0, 2]
+
+# Числовое поле InferenceInput -> колонка, в которую оно добавляется
+NUMERIC_FEATURES = {
+    "Age": "Age",
+    "Income": "Income",
+    "Number_of_Children": "Social_Support",
+}
+
+# Категориальное поле -> {значение: {колонка: вклад}}; отсутствующие значения дают 0
+CATEGORICAL_FEATURES = {
+    "Employment_Status": {"Employed": {"Employment Status": 1}},
+    "Education_Level": {
+        level: {f"Education Level_{level}": 1}
+        for level in ("High School", "Bachelor's Degree", "Master's Degree", "PhD")
+    },
+    "Marital_Status": {
+        "Married": {"Social_Support": 1},
+        "In a relationship": {"Social_Support": 1},
+    },
+    "Family_History_of_Depression": {"Yes": {"family_personal_health": 1}},
+    "History_of_Mental_Illness": {"Yes": {"family_personal_health": 1}},
+    "Chronic_Medical_Conditions": {"Yes": {"family_personal_health": 1}},
+    "Smoking_Status": {"Current": {"personal_burden": 1}},
+    "Alcohol_Consumption": {"High": {"personal_burden": 1}},
+    "Physical_Activity_Level": {"Active": {"personal_burden": -1}},
+    "Dietary_Habits": {"Healthy": {"personal_burden": -1}},
+    "Sleep_Patterns": {"Good": {"personal_burden": -1}},
+}
+
+
+class FeatureEncoder:
+    """
+    Кодирует InferenceInput в матрицу признаков без pandas.
+
+    Каждое категориальное значение получает целочисленный код (порядок значений
+    из Literal в InferenceInput), а вклад значения во все признаки хранится в
+    таблице (n_values, n_features): кодирование сводится к выборке строк
+    таблиц по кодам и их сложению.
+    """
+
+    def __init__(self):
+        self.numeric_fields = list(NUMERIC_FEATURES)
+        self.categorical_fields = [
+            name for name, field in InferenceInput.model_fields.items()
+            if name not in NUMERIC_FEATURES
+        ]
+        self.categories = {
+            name: get_args(InferenceInput.model_fields[name].annotation)
+            for name in self.categorical_fields
+        }
+        self.codes = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in self.categories.items()
+        }
+
+        column_index = {column: i for i, column in enumerate(FEATURE_COLUMNS)}
+        self.numeric_columns = [column_index[NUMERIC_FEATURES[name]] for name in self.numeric_fields]
+        self.tables = []
+        for name in self.categorical_fields:
+            table = np.zeros((len(self.categories[name]), len(FEATURE_COLUMNS)), dtype=np.float32)
+            for value, contributions in CATEGORICAL_FEATURES.get(name, {}).items():
+                for column, delta in contributions.items():
+                    table[self.codes[name][value], column_index[column]] = delta
+            self.tables.append(table)
+
+        logger.info(f"[ENCODER] Compiled lookup tables for {len(self.categorical_fields)} categorical fields")
+
+    def encode_codes(self, inputs: Sequence[InferenceInput] | Mapping[str, Sequence]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        -> (коды категорий uint8 (N, n_categorical), числовые поля int64 (N, 3)).
+        Числа остаются точными целыми: по ним строится ключ кэша, во float32 их переводит transform_codes
+        """
+        if isinstance(inputs, Mapping):
+            codes = np.column_stack([
+                self._codes_for_column(name, inputs[name]) for name in self.categorical_fields
+            ]).astype(np.uint8)
+            numeric = np.column_stack([
+                np.asarray(inputs[name], dtype=np.int64) for name in self.numeric_fields
+            ])
+            return codes, numeric
+
+        codes = np.array(
+            [[self.codes[name][getattr(item, name)] for name in self.categorical_fields] for item in inputs],
+            dtype=np.uint8,
+        ).reshape(len(inputs), len(self.categorical_fields))
+        numeric = np.array(
+            [[getattr(item, name) for name in self.numeric_fields] for item in inputs],
+            dtype=np.int64,
+        ).reshape(len(inputs), len(self.numeric_fields))
+        return codes, numeric
+
+    def transform_codes(self, codes: np.ndarray, numeric: np.ndarray) -> np.ndarray:
+        """Коды + числовые поля -> немасштабированная матрица float32 (N, 10) в порядке FEATURE_COLUMNS"""
+        X = np.zeros((codes.shape[0], len(FEATURE_COLUMNS)), dtype=np.float32)
+        for j, table in enumerate(self.tables):
+            X += table[codes[:, j]]
+        X[:, self.numeric_columns] += numeric.astype(np.float32)
+        return X
+
+    def encode(self, inputs: Sequence[InferenceInput] | Mapping[str, Sequence]) -> np.ndarray:
+        return self.transform_codes(*self.encode_codes(inputs))
+
+    def sample_features(self, n: int, seed: int = 0) -> np.ndarray:
+        """Случайные валидные входы в закодированном виде — для прогрева и сверки быстрых путей"""
+        rng = np.random.default_rng(seed)
+        codes = np.column_stack([
+            rng.integers(0, len(self.categories[name]), n) for name in self.categorical_fields
+        ]).astype(np.uint8)
+        numeric = np.column_stack([
+            rng.integers(18, 90, n),
+            rng.integers(0, 200_000, n),
+            rng.integers(0, 6, n),
+        ]).astype(np.float32)
+        return self.transform_codes(codes, numeric)
+
+    def _codes_for_column(self, name: str, values: Sequence) -> np.ndarray:
+        uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        try:
+            lookup = np.array([self.codes[name][value] for value in uniques], dtype=np.uint8)
+        except KeyError as e:
+            raise ValueError(f"Unknown value {e.args[0]!r} for field {name}") from None
+        return lookup[inverse.reshape(-1)]
+
+
+@contextmanager
+def ndarray_features():
+    """
+    Вызовы sklearn на матрице из encoder. Она собирается строго в порядке FEATURE_COLUMNS,
+    поэтому предупреждение об отсутствии имён признаков у ndarray глушим только здесь
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        yield
+
+
+def scale_features(X: np.ndarray, scaler) -> np.ndarray:
+    """Масштабирует Age/Income всего батча одним вызовом scaler.transform (на месте)"""
+    with ndarray_features():
+        X[:, SCALED_COLUMNS] = scaler.transform(X[:, SCALED_COLUMNS])
+    return X
+
+
+encoder = FeatureEncoder()
@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from .encoder import SCALED_COLUMNS
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("fused_linear")
+
+
+@dataclass(frozen=True)
+class FusedLinear:
+    """
+    Линейная модель со вшитым StandardScaler.
+
+    w * (x - mean) / scale = (w / scale) * x - w * mean / scale, поэтому
+    scaler.transform + model.predict сводятся к одному x @ coef + intercept
+    по немасштабированной матрице из encoder.
+    """
+    coef: np.ndarray
+    intercept: float
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return features.astype(np.float64) @ self.coef + self.intercept
+
+
+def is_linear_model(model) -> bool:
+    coef = getattr(model, "coef_", None)
+    return (
+        type(model).__module__.startswith("sklearn.linear_model")
+        and coef is not None
+        and np.ndim(coef) == 1
+        and np.ndim(getattr(model, "intercept_", None)) == 0
+    )
+
+
+def fuse_linear(model, scaler) -> FusedLinear:
+    if not is_linear_model(model):
+        raise ValueError(f"Model {type(model).__name__} is not a single-output linear model")
+    # Вшить можно только аффинное (x - mean) / scale; другие скейлеры скорим исходным пайплайном
+    if not isinstance(scaler, StandardScaler):
+        raise ValueError(f"Scaler {type(scaler).__name__} cannot be folded into a linear model")
+
+    coef = np.asarray(model.coef_, dtype=np.float64).copy()
+    intercept = float(model.intercept_)
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) else np.zeros(len(SCALED_COLUMNS))
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) else np.ones(len(SCALED_COLUMNS))
+
+    for k, column in enumerate(SCALED_COLUMNS):
+        intercept -= coef[column] * mean[k] / scale[k]
+        coef[column] = coef[column] / scale[k]
+
+    logger.info(f"[FUSE] {type(model).__name__}: scaler folded into {len(coef)} coefficients")
+    return FusedLinear(coef=coef, intercept=intercept)
@@ -1,30 +1,12 @@
-from pathlib import Path
-import joblib
-from functools import lru_cache
-from ml_inference.core.config import settings
+from .registry import LoadedModel, ModelRegistry
 
-from ml_inference.core.logger import get_logger
-logger = get_logger("model_loader")
+model_registry = ModelRegistry()
 
-@lru_cache(maxsize=3)
-def load_model_and_scaler(model_name: str):
-    model_path = Path(settings.model_dir) / f"{model_name}.pkl"
-    scaler_path = Path(settings.model_dir) / "scaler.joblib"
-
-    try:
-        model = joblib.load(model_path)
-        logger.info(f"[LOAD] Model loaded: {model_path}")
-    except Exception as e:
-        logger.exception(f"[ERROR] Failed to load model {model_name} at {model_path}")
-        raise
 
-    try:
-        scaler = joblib.load(scaler_path)
-        logger.info(f"[LOAD] Scaler loaded: {scaler_path}")
-    except Exception as e:
-        logger.exception(f"[ERROR] Failed to load scaler at {scaler_path}")
-        raise
-         
-    return model, scaler
+def load_model(model_name: str) -> LoadedModel:
+    return model_registry.get(model_name)
 
 
+def load_model_and_scaler(model_name: str):
+    entry = load_model(model_name)
+    return entry.model, entry.scaler
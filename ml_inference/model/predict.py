@@ -1,50 +1,43 @@
-import pandas as pd
-from .load_model import load_model_and_scaler
+import time
+from typing import Mapping, Sequence
+
+import numpy as np
+from .encoder import FEATURE_COLUMNS, encoder, scale_features
+from .load_model import load_model
+from .prediction_cache import PredictionCache, canonical_keys, prediction_cache
+from ml_inference.core.config import settings
+from ml_inference.monitoring import metrics
 from shared.schemas.inference import InferenceInput
 
 from ml_inference.core.logger import get_logger
 
 logger = get_logger("predict")
 
-def preprocess_input(user_input: InferenceInput, scaler):
+
+def encode_batch(inputs: Sequence[InferenceInput] | Mapping[str, Sequence]) -> np.ndarray:
+    """Список InferenceInput (или словарь колонок) -> немасштабированная матрица float32 (N, 10)"""
+    return encoder.encode(inputs)
+
+
+def preprocess_batch(inputs: Sequence[InferenceInput] | Mapping[str, Sequence], scaler) -> np.ndarray:
+    """Кодирует весь батч и масштабирует Age/Income одним вызовом scaler.transform"""
     try:
-        employment_map = {"Unemployed": 0, "Employed": 1}
-        marital_map = {
-            'Single': 0, 'Divorced': 0, 'Widowed': 0, 'Separated': 0,
-            'Married': 1, 'In a relationship': 1
-        }
-
-        df = pd.DataFrame([{
-            "Age": user_input.Age,
-            "Employment Status": employment_map[user_input.Employment_Status],
-            "Income": user_input.Income,
-            "Education Level_Bachelor's Degree": user_input.Education_Level == "Bachelor's Degree",
-            "Education Level_High School": user_input.Education_Level == "High School",
-            "Education Level_Master's Degree": user_input.Education_Level == "Master's Degree",
-            "Education Level_PhD": user_input.Education_Level == "PhD",
-            "Social_Support": marital_map[user_input.Marital_Status] + user_input.Number_of_Children,
-            "family_personal_health": (
-                int(user_input.Family_History_of_Depression == "Yes") +
-                int(user_input.History_of_Mental_Illness == "Yes") +
-                int(user_input.Chronic_Medical_Conditions == "Yes")
-            ),
-            "personal_burden": (
-                int(user_input.Smoking_Status == "Current") +
-                int(user_input.Alcohol_Consumption == "High") -
-                int(user_input.Physical_Activity_Level == "Active") -
-                int(user_input.Dietary_Habits == "Healthy") -
-                int(user_input.Sleep_Patterns == "Good")
-            )
-        }])
-
-        df[["Age", "Income"]] = scaler.transform(df[["Age", "Income"]])
-        logger.info("[PREPROCESS] Input transformed for inference")
-        return df
+        X = scale_features(encode_batch(inputs), scaler)
+        logger.info(f"[PREPROCESS] Batch transformed for inference | rows={X.shape[0]}")
+        return X
     except Exception:
-        logger.exception("[PREPROCESS][ERROR] Failed to preprocess user input")
+        logger.exception("[PREPROCESS][ERROR] Failed to preprocess batch")
         raise
 
 
+def preprocess_input(user_input: InferenceInput, scaler):
+    # pandas нужен только этому совместимому пути, горячий путь работает с ndarray
+    import pandas as pd
+
+    X = preprocess_batch([user_input], scaler)
+    return pd.DataFrame(X, columns=FEATURE_COLUMNS)
+
+
 
 def interpret_score(score: float) -> str:
     if score >= 5:
@@ -53,23 +46,106 @@ def interpret_score(score: float) -> str:
         return "🟠 Moderate risk — consider self-assessment or preventive steps."
     else:
         return "🟢 Low risk — no immediate concern detected."
-    
-def run_inference_task(model_type: str, user_input: dict) -> dict:
-    try:    
-        model, scaler = load_model_and_scaler(model_type)
-        logger.info(f"[INFERENCE] Model and scaler loaded for: {model_type}")
-        
-        df = preprocess_input(user_input, scaler)
-        prediction = model.predict(df)[0]
-        logger.info(f"[INFERENCE] Prediction made: {prediction}")
-
-        explanation = interpret_score(prediction)
-        logger.info(f"[INFERENCE] Interpretation: {explanation}")
-
-        return {
-            "score": float(prediction),
-            "explanation": explanation
-        }
+
+
+def _score_encoded(model, codes: np.ndarray, numeric: np.ndarray, features: np.ndarray | None = None) -> list[float]:
+    """
+    Скоры модели для закодированного батча: сначала кэш, затем predict по промахам.
+    features — уже собранная матрица, если её делят несколько моделей; иначе
+    собирается только для промахов.
+    """
+    labels = (model.name, model.version)
+    metrics.batch_rows.labels(model.name).observe(len(codes))
+
+    if settings.prediction_cache_enabled:
+        keys = [PredictionCache.key(model.name, model.version, raw) for raw in canonical_keys(codes, numeric)]
+        scores = prediction_cache.get_many(keys)
+    else:
+        keys, scores = None, [None] * len(codes)
+
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if keys is not None:
+        metrics.cache_requests_total.labels(model.name, "hit").inc(len(scores) - len(missing))
+        metrics.cache_requests_total.labels(model.name, "miss").inc(len(missing))
+    if missing:
+        started = time.perf_counter()
+        X = features[missing] if features is not None else encoder.transform_codes(codes[missing], numeric[missing])
+        predictions = model.predict(X)
+        metrics.predict_seconds.labels(*labels).observe(time.perf_counter() - started)
+        for i, prediction in zip(missing, predictions):
+            scores[i] = float(prediction)
+        if keys is not None:
+            prediction_cache.set_many({keys[i]: scores[i] for i in missing})
+    logger.info(
+        f"[INFERENCE] Batch prediction made | model_type={model.name} | rows={len(scores)} | cached={len(scores) - len(missing)}"
+    )
+    return scores
+
+
+def run_batch_inference(model_type: str, inputs: Sequence[InferenceInput]) -> list[dict]:
+    try:
+        model = load_model(model_type)
+        logger.info(f"[INFERENCE] Model loaded for: {model_type} | version={model.version}")
+
+        started = time.perf_counter()
+        codes, numeric = encoder.encode_codes(inputs)
+        metrics.preprocess_seconds.labels(model.name, model.version).observe(time.perf_counter() - started)
+
+        scores = _score_encoded(model, codes, numeric)
+
+        return [
+            {
+                "score": score,
+                "explanation": interpret_score(score),
+                "model_version": model.version
+            }
+            for score in scores
+        ]
+    except Exception:
+        metrics.failures_total.labels(model_type, "inference").inc()
+        logger.exception("[INFERENCE][ERROR] Failed to run batch inference")
+        raise
+
+
+def run_inference_task(model_type: str, user_input: InferenceInput) -> dict:
+    try:
+        result = run_batch_inference(model_type, [user_input])[0]
+        logger.info(f"[INFERENCE] Prediction made: {result['score']}")
+        logger.info(f"[INFERENCE] Interpretation: {result['explanation']}")
+        return result
     except Exception:
         logger.exception("[INFERENCE][ERROR] Failed to run inference")
-        raise    
\ No newline at end of file
+        raise
+
+
+def run_multi_inference(model_types: Sequence[str], user_input: InferenceInput) -> dict:
+    """
+    Один вход -> скоры нескольких моделей. Вход кодируется один раз, одна и та же
+    матрица признаков идёт во все модели.
+    -> {"results": {model_type: {score, explanation, model_version, predict_ms}}, "encode_ms": ...}
+    """
+    try:
+        started = time.perf_counter()
+        codes, numeric = encoder.encode_codes([user_input])
+        features = encoder.transform_codes(codes, numeric)
+        encode_ms = (time.perf_counter() - started) * 1000
+
+        results = {}
+        for model_type in model_types:
+            model = load_model(model_type)
+            metrics.preprocess_seconds.labels(model.name, model.version).observe(encode_ms / 1000)
+            started = time.perf_counter()
+            score = _score_encoded(model, codes, numeric, features)[0]
+            results[model_type] = {
+                "score": score,
+                "explanation": interpret_score(score),
+                "model_version": model.version,
+                "predict_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+        logger.info(f"[INFERENCE] Multi-model prediction made: { {name: r['score'] for name, r in results.items()} }")
+        return {"results": results, "encode_ms": round(encode_ms, 3)}
+    except Exception:
+        for model_type in model_types:
+            metrics.failures_total.labels(model_type, "inference").inc()
+        logger.exception("[INFERENCE][ERROR] Failed to run multi-model inference")
+        raise
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Sequence
+
+import numpy as np
+import redis
+from ml_inference.core.config import settings
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("prediction_cache")
+
+KEY_PREFIX = "pred"
+
+
+def canonical_keys(codes: np.ndarray, numeric: np.ndarray) -> list[bytes]:
+    """
+    Каноническое представление входа: коды категорий (uint8) + числовые поля (int64).
+    numeric — точные целые из encode_codes: приведение к int32 или float32 склеило бы разные большие входы
+    """
+    rows = np.hstack([
+        codes.astype(np.uint8).view(np.uint8),
+        numeric.astype("<i8").view(np.uint8),
+    ])
+    return [row.tobytes() for row in rows]
+
+
+class PredictionCache:
+    """
+    Кэш скоров по (модель, версия, канонический вход).
+
+    Первый уровень — LRU в памяти процесса с ограничением по числу записей и TTL,
+    второй (необязательный) — общий Redis. Версия модели входит в ключ, поэтому
+    после перезагрузки модели старые записи просто перестают находиться.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, redis_url: str = ""):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._local: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(model_name: str, version: str, raw: bytes) -> str:
+        return f"{KEY_PREFIX}:{model_name}:{version}:{raw.hex()}"
+
+    def get_many(self, keys: Sequence[str]) -> list[float | None]:
+        now = time.monotonic()
+        scores: list[float | None] = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._local.get(key)
+                if entry is None:
+                    continue
+                expires_at, score = entry
+                if expires_at < now:
+                    del self._local[key]
+                    continue
+                self._local.move_to_end(key)
+                scores[i] = score
+        local_hits = sum(score is not None for score in scores)
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        redis_hits = 0
+        if missing and self._redis is not None:
+            try:
+                values = self._redis.mget([keys[i] for i in missing])
+            except redis.RedisError:
+                logger.exception("[CACHE][REDIS][ERROR] MGET failed, treating as miss")
+                values = [None] * len(missing)
+            found = {}
+            for i, value in zip(missing, values):
+                if value is not None:
+                    scores[i] = found[keys[i]] = float(value)
+            redis_hits = len(found)
+            self._store_local(found)
+
+        with self._lock:
+            self.stats["local_hits"] += local_hits
+            self.stats["redis_hits"] += redis_hits
+            self.stats["misses"] += len(keys) - local_hits - redis_hits
+        return scores
+
+    def set_many(self, items: dict[str, float]):
+        self._store_local(items)
+        if self._redis is None or not items:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, score in items.items():
+                pipe.set(key, repr(float(score)), ex=int(self.ttl_s))
+            pipe.execute()
+        except redis.RedisError:
+            logger.exception("[CACHE][REDIS][ERROR] Failed to store predictions")
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def _store_local(self, items: dict[str, float]):
+        expires_at = time.monotonic() + self.ttl_s
+        with self._lock:
+            for key, score in items.items():
+                self._local[key] = (expires_at, score)
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+prediction_cache = PredictionCache(
+    max_entries=settings.prediction_cache_max_entries,
+    ttl_s=settings.prediction_cache_ttl_s,
+    redis_url=settings.prediction_cache_redis_url,
+)
@@ -0,0 +1,290 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import joblib
+import numpy as np
+from ml_inference.core.config import settings
+from .compiled_trees import compile_ensemble
+from .encoder import encoder, ndarray_features, scale_features
+from .fused_linear import fuse_linear
+from ml_inference.monitoring.metrics import model_load_seconds
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("model_loader")
+
+SCALER_FILE = "scaler.joblib"
+MODEL_SUFFIX = ".pkl"
+# Допустимое расхождение быстрого пути с исходной моделью. Относительный допуск
+# нужен из-за float32 в исходном пути: Income масштабируется с потерей младших разрядов
+PARITY_RTOL = 1e-6
+PARITY_ATOL = 1e-6
+PARITY_PROBE_ROWS = 256
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """Неизменяемый снимок версии модели: предсказания, начатые на нём, доживают на нём же"""
+    name: str
+    version: str
+    model: Any
+    scaler: Any
+    path: Path
+    # Быстрый путь, проверенный на совпадение с model.predict при загрузке
+    kind: str = "sklearn"
+    scorer: Callable[[np.ndarray], np.ndarray] | None = None
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Немасштабированная матрица из encoder -> скоры"""
+        if self.scorer is None:
+            return self.predict_original(features)
+        if not settings.fast_path_verify:
+            return self.scorer(features)
+
+        # Режим сверки: считаем обоими путями и отдаём результат исходного пайплайна
+        fast = self.scorer(features)
+        original = self.predict_original(features)
+        if not fast_path_matches(fast, original):
+            diff = float(np.max(np.abs(fast - original)))
+            logger.warning(f"[VERIFY] {self.name} {self.kind} diverged from model.predict: max diff={diff:.3e}")
+        return original
+
+    def predict_original(self, features: np.ndarray) -> np.ndarray:
+        X = scale_features(features.copy(), self.scaler)
+        with ndarray_features():
+            return np.asarray(self.model.predict(X))
+
+
+@dataclass(frozen=True)
+class _Artifact:
+    obj: Any
+    digest: str
+    stat: tuple[int, int]
+
+
+def _stat(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _compiled_trees_scorer(model, scaler) -> Callable[[np.ndarray], np.ndarray]:
+    compiled = compile_ensemble(model)
+
+    def score(features: np.ndarray) -> np.ndarray:
+        X = scale_features(features.copy(), scaler)
+        # на больших батчах цикл sklearn на Cython быстрее numpy-обхода
+        if X.shape[0] <= settings.compiled_trees_max_rows:
+            return compiled.predict(X)
+        with ndarray_features():
+            return np.asarray(model.predict(X))
+
+    return score
+
+
+def _fused_linear_scorer(model, scaler) -> Callable[[np.ndarray], np.ndarray]:
+    return fuse_linear(model, scaler).predict
+
+
+def fast_path_matches(fast: np.ndarray, original: np.ndarray) -> bool:
+    return bool(np.allclose(fast, original, rtol=PARITY_RTOL, atol=PARITY_ATOL))
+
+
+def build_fast_path(model, scaler) -> tuple[str, Callable[[np.ndarray], np.ndarray] | None]:
+    """-> (kind, scorer) для модели; scorer=None — скорим через model.predict"""
+    candidates = []
+    if settings.compiled_trees_enabled:
+        candidates.append(("compiled_trees", _compiled_trees_scorer))
+    if settings.fused_linear_enabled:
+        candidates.append(("fused_linear", _fused_linear_scorer))
+
+    for kind, make_scorer in candidates:
+        try:
+            scorer = make_scorer(model, scaler)
+        except ValueError:
+            continue
+        probe = encoder.sample_features(PARITY_PROBE_ROWS)
+        fast = scorer(probe)
+        with ndarray_features():
+            original = np.asarray(model.predict(scale_features(probe.copy(), scaler)))
+        if not fast_path_matches(fast, original):
+            diff = float(np.max(np.abs(fast - original)))
+            logger.warning(f"[FAST PATH] {kind} diverges from model.predict (max diff={diff:.3e}), not using it")
+            continue
+        return kind, scorer
+    return "sklearn", None
+
+
+def _load_artifact(path: Path) -> _Artifact:
+    stat = _stat(path)
+    data = path.read_bytes()
+    obj = joblib.load(io.BytesIO(data))
+    return _Artifact(obj=obj, digest=hashlib.sha256(data).hexdigest(), stat=stat)
+
+
+class ModelRegistry:
+    """
+    Реестр моделей из model_dir с одним общим скейлером.
+
+    Версия модели — sha256 содержимого артефакта модели и скейлера. Фоновый
+    поток раз в reload_interval_s сверяет mtime/размер файлов и при изменении
+    загружает новую версию целиком, после чего атомарно подменяет запись.
+    """
+
+    def __init__(self, model_dir: str | None = None, reload_interval_s: float | None = None):
+        self._model_dir = model_dir
+        self._reload_interval_s = reload_interval_s
+        self._lock = threading.RLock()
+        self._models: dict[str, LoadedModel] = {}
+        self._artifacts: dict[str, _Artifact] = {}
+        self._scaler: _Artifact | None = None
+        self._loaded_from: Path | None = None
+        self._watcher_pid = None
+
+    @property
+    def model_dir(self) -> Path:
+        return Path(self._model_dir or settings.model_dir)
+
+    @property
+    def reload_interval_s(self) -> float:
+        if self._reload_interval_s is not None:
+            return self._reload_interval_s
+        return settings.model_reload_interval_s
+
+    def available(self) -> list[str]:
+        return sorted(path.stem for path in self.model_dir.glob(f"*{MODEL_SUFFIX}"))
+
+    def loaded(self) -> dict[str, str]:
+        return {name: entry.version for name, entry in self._models.items()}
+
+    def get(self, name: str, watch: bool = True) -> LoadedModel:
+        """watch=False — без фонового потока перезагрузки (загрузка в родителе prefork до fork)"""
+        if watch:
+            self.start_watcher()
+        entry = self._models.get(name)
+        if entry is not None and self._loaded_from == self.model_dir:
+            return entry
+        with self._lock:
+            self._reset_if_dir_changed()
+            if name not in self._models:
+                self._load(name)
+            return self._models[name]
+
+    def load_all(self, names: list[str] | None = None) -> list[LoadedModel]:
+        return [self.get(name) for name in (self.available() if names is None else names)]
+
+    def refresh(self) -> list[str]:
+        """Перезагружает изменившиеся на диске артефакты, возвращает имена обновлённых моделей"""
+        with self._lock:
+            if self._reset_if_dir_changed() or self._scaler is None:
+                return []
+            scaler_changed = self._changed(self.model_dir / SCALER_FILE, self._scaler)
+            scaler = self._load_scaler() if scaler_changed else self._scaler
+            # Сначала собираем все новые записи: если одна упадёт, скейлер и модели
+            # останутся прежними и следующий refresh() повторит всё целиком
+            staged = []
+            for name, artifact in list(self._artifacts.items()):
+                path = self.model_dir / f"{name}{MODEL_SUFFIX}"
+                if self._changed(path, artifact):
+                    started = time.perf_counter()
+                    artifact = self._read_model(name)
+                    entry = self._build(name, artifact, scaler)
+                    model_load_seconds.labels(name, entry.version).observe(time.perf_counter() - started)
+                elif scaler_changed:
+                    entry = self._build(name, artifact, scaler)
+                else:
+                    continue
+                staged.append((name, artifact, entry))
+            self._scaler = scaler
+            for name, artifact, entry in staged:
+                self._install(name, artifact, entry)
+            return [name for name, _, _ in staged]
+
+    def _changed(self, path: Path, artifact: _Artifact) -> bool:
+        try:
+            return _stat(path) != artifact.stat
+        except FileNotFoundError:
+            logger.warning(f"[RELOAD] Artifact disappeared, keeping loaded version: {path}")
+            return False
+
+    def _reset_if_dir_changed(self) -> bool:
+        if self._loaded_from == self.model_dir:
+            return False
+        self._models, self._artifacts, self._scaler = {}, {}, None
+        self._loaded_from = self.model_dir
+        return True
+
+    def _load_scaler(self) -> _Artifact:
+        scaler_path = self.model_dir / SCALER_FILE
+        try:
+            scaler = _load_artifact(scaler_path)
+            logger.info(f"[LOAD] Scaler loaded: {scaler_path} (sha256={scaler.digest[:12]})")
+            return scaler
+        except Exception:
+            logger.exception(f"[ERROR] Failed to load scaler at {scaler_path}")
+            raise
+
+    def _read_model(self, name: str) -> _Artifact:
+        model_path = self.model_dir / f"{name}{MODEL_SUFFIX}"
+        try:
+            started = time.perf_counter()
+            artifact = _load_artifact(model_path)
+            logger.info(f"[LOAD] Model loaded: {model_path} in {time.perf_counter() - started:.3f}s")
+            return artifact
+        except Exception:
+            logger.exception(f"[ERROR] Failed to load model {name} at {model_path}")
+            raise
+
+    def _load(self, name: str):
+        if self._scaler is None:
+            self._scaler = self._load_scaler()
+        started = time.perf_counter()
+        artifact = self._read_model(name)
+        self._install(name, artifact, self._build(name, artifact, self._scaler))
+        model_load_seconds.labels(name, self._models[name].version).observe(time.perf_counter() - started)
+
+    def _build(self, name: str, artifact: _Artifact, scaler: _Artifact) -> LoadedModel:
+        kind, scorer = build_fast_path(artifact.obj, scaler.obj)
+        return LoadedModel(
+            name=name,
+            version=f"{artifact.digest[:12]}.{scaler.digest[:6]}",
+            model=artifact.obj,
+            scaler=scaler.obj,
+            path=self.model_dir / f"{name}{MODEL_SUFFIX}",
+            kind=kind,
+            scorer=scorer,
+        )
+
+    def _install(self, name: str, artifact: _Artifact, entry: LoadedModel):
+        previous = self._models.get(name)
+        self._artifacts[name] = artifact
+        self._models[name] = entry
+        if previous is None:
+            logger.info(f"[REGISTRY] {name} version={entry.version} kind={entry.kind}")
+        elif previous.version != entry.version:
+            logger.info(f"[RELOAD] {name}: {previous.version} -> {entry.version} kind={entry.kind}")
+
+    def start_watcher(self):
+        # Поток не переживает fork, поэтому в каждом процессе воркера запускаем свой.
+        # В родителе prefork его быть не должно: fork посреди refresh() оставил бы
+        # ребёнку захваченный _lock, который уже некому отпустить
+        if self.reload_interval_s <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval_s)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("[RELOAD][ERROR] Failed to refresh models, keeping current versions")
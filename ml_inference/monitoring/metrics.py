@@ -0,0 +1,138 @@
+import os
+import shutil
+from pathlib import Path
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, start_http_server
+
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("metrics")
+
+# В multiprocess-режиме каждый процесс пишет значения в mmap-файлы этой директории,
+# а HTTP-сервер в родителе воркера агрегирует их. Переменную читает сам prometheus_client
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+model_load_seconds = Histogram(
+    "ml_model_load_seconds",
+    "Model artifact load time including fast path build",
+    ["model", "version"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+preprocess_seconds = Histogram(
+    "ml_inference_preprocess_seconds",
+    "Batch encoding time",
+    ["model", "version"],
+    buckets=LATENCY_BUCKETS,
+)
+predict_seconds = Histogram(
+    "ml_inference_predict_seconds",
+    "Model scoring time for cache misses",
+    ["model", "version"],
+    buckets=LATENCY_BUCKETS,
+)
+task_seconds = Histogram(
+    "ml_inference_task_seconds",
+    "End-to-end Celery task time in the worker",
+    ["model", "version"],
+    buckets=LATENCY_BUCKETS,
+)
+queue_wait_seconds = Histogram(
+    "ml_inference_queue_wait_seconds",
+    "Time between enqueue in the API and task start in the worker",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+batch_rows = Histogram(
+    "ml_inference_batch_rows",
+    "Rows per run_batch_inference call",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 1024, 10_000, 100_000),
+)
+failures_total = Counter(
+    "ml_inference_failures_total",
+    "Inference failures by stage",
+    ["model", "stage"],
+)
+cache_requests_total = Counter(
+    "ml_prediction_cache_requests_total",
+    "Prediction cache lookups",
+    ["model", "result"],
+)
+singleflight_followers_total = Counter(
+    "ml_singleflight_followers_total",
+    "Tasks completed with the result of an identical in-flight task instead of their own run",
+    ["model"],
+)
+
+# Write-behind: consumer очереди результатов (python -m ml_inference.persistence).
+# У всех метрик есть метки: значения без меток создают mmap-файлы уже при импорте,
+# до того как родитель воркера подготовит PROMETHEUS_MULTIPROC_DIR
+persistence_lag_seconds = Gauge(
+    "ml_persistence_lag_seconds",
+    "Age of the oldest result in the last batch taken from the persistence stream",
+    ["stream"],
+    multiprocess_mode="max",
+)
+persistence_pending = Gauge(
+    "ml_persistence_pending",
+    "Results in the persistence stream not yet acknowledged",
+    ["stream"],
+    multiprocess_mode="max",
+)
+persistence_batch_seconds = Histogram(
+    "ml_persistence_batch_seconds",
+    "Time to upsert and finalize one batch",
+    ["stream"],
+    buckets=LATENCY_BUCKETS,
+)
+persistence_rows_total = Counter(
+    "ml_persistence_rows_total",
+    "Results processed by the persistence consumer",
+    ["stream", "outcome"],
+)
+persistence_dead_letter_total = Counter(
+    "ml_persistence_dead_letter_total",
+    "Results moved to the dead-letter stream after repeated persistence failures",
+    ["stream"],
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+def prepare_multiprocess_dir():
+    """Очищает файлы прошлого запуска: иначе счётчики мёртвых процессов попадут в сумму"""
+    path = Path(os.environ[MULTIPROC_DIR_ENV])
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+
+def start_metrics_server(port: int):
+    """Поднимает /metrics в текущем процессе; под prefork — в родителе, до fork"""
+    if port <= 0:
+        return
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        prepare_multiprocess_dir()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        logger.warning(
+            f"[METRICS] {MULTIPROC_DIR_ENV} is not set: only metrics of this process are exported, "
+            f"prefork children will not be visible"
+        )
+        registry = REGISTRY
+    start_http_server(port, registry=registry)
+    logger.info(f"[METRICS] Serving metrics on :{port} (multiprocess={multiprocess_enabled()})")
+
+
+def mark_process_dead(pid: int):
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,309 @@
+import json
+import os
+import socket
+import time
+from datetime import datetime
+
+import redis
+from prometheus_client import start_http_server
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from ml_inference.core.config import settings
+from ml_inference.core.logger import get_logger
+from ml_inference.monitoring import metrics
+
+logger = get_logger("persistence")
+
+# Поля строки inference_tasks, которые пишет consumer; у всех строк пачки одинаковый набор
+TIMING_FIELDS = ["enqueued_at", "started_at", "predicted_at"]
+
+# Ошибки связи с БД: пачка целиком ждёт повтора, по одной записи её не разбираем
+DB_UNAVAILABLE = (OperationalError, InterfaceError)
+
+_client: redis.Redis | None = None
+
+
+def get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.persistence_redis_url)
+    return _client
+
+
+def publish_result(
+    task_uuid: str,
+    user_id: int,
+    model_type: str,
+    user_input: dict,
+    result: dict,
+    timings: dict,
+    status: str = "COMPLETED"
+) -> str:
+    """
+    Кладёт готовый результат в поток на запись вместо синхронных коммитов в Postgres.
+    status="FAILED" — задача не досчиталась: в result ошибка, consumer вернёт заморозку
+    """
+    entry_id = get_client().xadd(settings.persistence_stream, {"data": json.dumps({
+        "task_uuid": task_uuid,
+        "user_id": user_id,
+        "model_type": model_type,
+        "input_data": json.dumps(user_input),
+        "output_data": json.dumps(result),
+        "status": status,
+        "finished_at": time.time(),
+        "timings": {field: timings.get(field) for field in TIMING_FIELDS},
+    })})
+    logger.info(f"[PUBLISH] Result queued for persistence | task_uuid={task_uuid} entry={entry_id}")
+    return entry_id
+
+
+def _to_row(record: dict, committed_at: datetime) -> dict:
+    def ts(value):
+        return datetime.utcfromtimestamp(value) if value is not None else None
+
+    return {
+        "task_uuid": record["task_uuid"],
+        "user_id": record["user_id"],
+        "model_type": record["model_type"],
+        "input_data": record["input_data"],
+        "output_data": record["output_data"],
+        # записи без status — от воркеров до появления FAILED
+        "status": record.get("status", "COMPLETED"),
+        "finished_at": ts(record["finished_at"]),
+        **{field: ts(record["timings"].get(field)) for field in TIMING_FIELDS},
+        "committed_at": committed_at,
+    }
+
+
+def _entry_age_s(entry_id: bytes | str, now: float) -> float:
+    # id записи потока — "<unix ms>-<seq>"
+    millis = int((entry_id.decode() if isinstance(entry_id, bytes) else entry_id).split("-")[0])
+    return max(0.0, now - millis / 1000)
+
+
+class PersistenceConsumer:
+    """
+    Разбирает поток результатов пачками: один многострочный upsert в inference_tasks,
+    один INSERT записей finalize в billing_records, один коммит, затем XACK.
+
+    Гарантия at-least-once: запись подтверждается только после коммита, а упавший
+    consumer отдаёт свои записи через XAUTOCLAIM. Повтор безопасен — upsert не
+    трогает уже завершённые задачи и не возвращает их, поэтому finalize не дублируется.
+    Запись, которая не пишется и отдельно (FK, удалённый пользователь), после
+    max_deliveries доставок уходит в dead-letter поток.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        session_factory,
+        stream: str | None = None,
+        group: str | None = None,
+        consumer: str | None = None,
+        batch_size: int | None = None,
+        block_ms: int | None = None,
+        claim_idle_ms: int | None = None,
+        max_deliveries: int | None = None,
+        dead_letter_stream: str | None = None,
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.stream = stream or settings.persistence_stream
+        self.group = group or settings.persistence_group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size or settings.persistence_batch_size
+        self.block_ms = block_ms if block_ms is not None else settings.persistence_block_ms
+        self.claim_idle_ms = claim_idle_ms if claim_idle_ms is not None else settings.persistence_claim_idle_ms
+        self.max_deliveries = max_deliveries or settings.persistence_max_deliveries
+        self.dead_letter_stream = dead_letter_stream or settings.persistence_dead_letter_stream
+
+    def ensure_group(self):
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"[CONSUMER] Created group {self.group} on {self.stream}")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read_batch(self) -> list[tuple[bytes, dict]]:
+        # Сначала забираем записи, зависшие у упавших consumer'ов, потом новые
+        _, claimed, *_ = self.client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id="0-0", count=self.batch_size,
+        )
+        if claimed:
+            logger.warning(f"[CONSUMER] Reclaimed {len(claimed)} stale entries")
+            return claimed
+        response = self.client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms,
+        )
+        return response[0][1] if response else []
+
+    def process(self, entries: list[tuple[bytes, dict]]) -> int:
+        """
+        Пишет пачку в Postgres и подтверждает её. -> число задач, завершённых этой пачкой.
+        Если пачка не записалась не из-за связи с БД, записи пишутся по одной: записанные
+        подтверждаются, плохая остаётся в потоке и после max_deliveries доставок уходит в dead-letter
+        """
+        if not entries:
+            return 0
+        now = time.time()
+        metrics.persistence_lag_seconds.labels(self.stream).set(max(_entry_age_s(entry_id, now) for entry_id, _ in entries))
+
+        records, entry_ids, acked, invalid = {}, {}, set(), 0
+        for entry_id, fields in entries:
+            try:
+                record = json.loads(fields[b"data"] if b"data" in fields else fields["data"])
+                # один task_uuid дважды в пачке (повторная публикация) — берём последний
+                records[record["task_uuid"]] = record
+                entry_ids.setdefault(record["task_uuid"], []).append(entry_id)
+            except (KeyError, ValueError):
+                invalid += 1
+                acked.add(entry_id)
+                logger.exception(f"[CONSUMER] Malformed entry {entry_id!r}, dropping")
+
+        started = time.perf_counter()
+        completed, failed, dead = [], [], 0
+        if records:
+            try:
+                completed, failed = self._write(list(records.values()))
+                acked.update(entry_id for ids in entry_ids.values() for entry_id in ids)
+            except DB_UNAVAILABLE:
+                logger.exception(f"[CONSUMER] Database unavailable, batch of {len(records)} will retry")
+                raise
+            except Exception:
+                logger.exception(f"[CONSUMER] Failed to persist batch of {len(records)}, retrying row by row")
+                for task_uuid, record in records.items():
+                    try:
+                        row_completed, row_failed = self._write([record])
+                    except DB_UNAVAILABLE:
+                        logger.exception("[CONSUMER] Database unavailable, rest of the batch will retry")
+                        break
+                    except Exception as e:
+                        logger.exception(f"[CONSUMER] Failed to persist task_uuid={task_uuid}")
+                        if self._dead_letter(entry_ids[task_uuid], record, e):
+                            acked.update(entry_ids[task_uuid])
+                            dead += 1
+                        continue
+                    completed += row_completed
+                    failed += row_failed
+                    acked.update(entry_ids[task_uuid])
+        metrics.persistence_batch_seconds.labels(self.stream).observe(time.perf_counter() - started)
+
+        ids = [entry_id for entry_id, _ in entries if entry_id in acked]
+        if ids:
+            self.client.xack(self.stream, self.group, *ids)
+            self.client.xdel(self.stream, *ids)
+
+        duplicates = len(records) - len(completed) - len(failed) - dead
+        self._invalidate_caches({user_id for _, user_id in completed + failed})
+        metrics.persistence_rows_total.labels(self.stream, "completed").inc(len(completed))
+        metrics.persistence_rows_total.labels(self.stream, "failed").inc(len(failed))
+        metrics.persistence_rows_total.labels(self.stream, "duplicate").inc(max(0, duplicates))
+        metrics.persistence_rows_total.labels(self.stream, "invalid").inc(invalid)
+        logger.info(
+            f"[CONSUMER] Batch persisted: entries={len(entries)} acked={len(ids)} completed={len(completed)} "
+            f"failed={len(failed)} dead_letter={dead} invalid={invalid}"
+        )
+        return len(completed)
+
+    @staticmethod
+    def _persist(db, records: list[dict]) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        """
+        Без коммита: завершённые задачи — одним upsert и одним INSERT finalize, упавшие — upsert
+        по модели (стоимость возврата зависит от неё) и возврат заморозки.
+        -> (id, user_id) завершённых и упавших этой пачкой
+        """
+        from ml_service.app.repositories.billing_repo import BillingRepository
+        from ml_service.app.repositories.inference_repo import InferenceRepository
+        from ml_service.app.services.billing_service import BillingService
+
+        committed_at = datetime.utcnow()
+        repo = InferenceRepository(db)
+        rows = [_to_row(record, committed_at) for record in records]
+        completed = []
+        if any(row["status"] == "COMPLETED" for row in rows):
+            completed = repo.upsert_results([row for row in rows if row["status"] == "COMPLETED"])
+            BillingRepository(db).create_many([
+                {"user_id": user_id, "task_id": task_id, "amount": 0, "type": "finalize"}
+                for task_id, user_id in completed
+            ])
+
+        failed = []
+        for model_type in {row["model_type"] for row in rows if row["status"] == "FAILED"}:
+            refunded = repo.upsert_results([
+                row for row in rows if row["status"] == "FAILED" and row["model_type"] == model_type
+            ])
+            BillingService(db).refund_many(refunded, model_type)
+            failed += refunded
+        return completed, failed
+
+    def _write(self, records: list[dict]) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        db = self.session_factory()
+        try:
+            completed, failed = self._persist(db, records)
+            db.commit()
+            return completed, failed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _dead_letter(self, entry_ids: list[bytes], record: dict, error: Exception) -> bool:
+        """Запись, доставленную max_deliveries раз, переносит в dead-letter поток. -> перенесена ли"""
+        pending = self.client.xpending_range(self.stream, self.group, min=entry_ids[0], max=entry_ids[0], count=1)
+        deliveries = pending[0]["times_delivered"] if pending else 0
+        if deliveries < self.max_deliveries:
+            return False
+        self.client.xadd(self.dead_letter_stream, {
+            "data": json.dumps(record),
+            "error": f"{type(error).__name__}: {error}",
+            "entry_id": entry_ids[0],
+        })
+        metrics.persistence_dead_letter_total.labels(self.stream).inc()
+        logger.error(
+            f"[CONSUMER] task_uuid={record['task_uuid']} failed {deliveries} deliveries, "
+            f"moved to {self.dead_letter_stream}"
+        )
+        return True
+
+    def update_pending(self):
+        metrics.persistence_pending.labels(self.stream).set(self.client.xpending(self.stream, self.group)["pending"])
+
+    def run_forever(self):
+        self.ensure_group()
+        logger.info(f"[CONSUMER] {self.consumer} reading {self.stream} as {self.group}")
+        while True:
+            try:
+                entries = self.read_batch()
+                if entries:
+                    self.process(entries)
+                else:
+                    metrics.persistence_lag_seconds.labels(self.stream).set(0)
+                self.update_pending()
+            except redis.RedisError:
+                logger.exception("[CONSUMER] Redis error, retrying")
+                time.sleep(1)
+            except Exception:
+                # пачка не подтверждена и вернётся через XAUTOCLAIM
+                time.sleep(1)
+
+    @staticmethod
+    def _invalidate_caches(user_ids: set[int]):
+        from ml_service.app.services.cache_service import invalidate_user_cache
+
+        for user_id in user_ids:
+            invalidate_user_cache(user_id)
+
+
+def main():
+    from ml_service.app.db.session import SessionLocal
+
+    if settings.persistence_metrics_port > 0:
+        start_http_server(settings.persistence_metrics_port)
+    PersistenceConsumer(get_client(), SessionLocal).run_forever()
+
+
+if __name__ == "__main__":
+    main()
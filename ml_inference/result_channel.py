@@ -0,0 +1,36 @@
+import json
+
+import redis
+
+from ml_inference.core.config import settings
+from ml_inference.core.logger import get_logger
+
+logger = get_logger("result_channel")
+
+# Один и тот же ключ — канал pub/sub и строка с копией результата на случай,
+# если API подписался позже, чем воркер опубликовал
+RESULT_KEY = "inference:result:{}"
+
+_client: redis.Redis | None = None
+
+
+def get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.result_channel_redis_url)
+    return _client
+
+
+def result_key(task_uuid: str) -> str:
+    return RESULT_KEY.format(task_uuid)
+
+
+def notify_result(task_uuid: str, payload: dict):
+    """Отдаёт результат (или {"error": ...}) ждущему API: SET с TTL и PUBLISH одной транзакцией"""
+    key = result_key(task_uuid)
+    data = json.dumps(payload)
+    pipe = get_client().pipeline(transaction=True)
+    pipe.set(key, data, ex=settings.result_channel_ttl_s)
+    pipe.publish(key, data)
+    _, receivers = pipe.execute()
+    logger.info(f"[NOTIFY] Result pushed | task_uuid={task_uuid} receivers={receivers}")
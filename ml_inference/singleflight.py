@@ -0,0 +1,120 @@
+import hashlib
+import json
+
+import redis
+
+from ml_inference.core.config import settings
+from ml_inference.core.logger import get_logger
+from ml_inference.result_channel import get_client, notify_result
+
+logger = get_logger("singleflight")
+
+# Lease лидера: hash (model_type, вход) -> task_uuid задачи, которая сейчас считается.
+# Истекает сам через singleflight_lease_ms, если воркер умер и не снял его
+FLIGHT_KEY = "inference:flight:{}"
+# Присоединившиеся к лидеру: task_uuid лидера -> список {"task_uuid", "user_id", "enqueued_at"}.
+# Ключ по лидеру, а не по входу: список переживает истёкший lease, пока лидер не завершится
+FOLLOWERS_KEY = "inference:flight:followers:{}"
+# Последний лидер полёта: живёт дольше lease, чтобы новый лидер нашёл список умершего
+OWNER_KEY = "inference:flight:owner:{}"
+
+# Атомарно: есть лидер — встаём в его список, нет — сами становимся лидером.
+# Если lease истёк, а прежний лидер так и не снял его (воркер убит), его ждущие
+# переходят к новому лидеру — иначе они висели бы в PENDING с замороженными кредитами.
+# Ключ списка собирается внутри скрипта (нужен один Redis, не кластер)
+_JOIN = """
+local leader = redis.call('GET', KEYS[1])
+if leader then
+    local followers = ARGV[4] .. leader
+    redis.call('RPUSH', followers, ARGV[2])
+    redis.call('EXPIRE', followers, ARGV[5])
+    return leader
+end
+local previous = redis.call('GET', KEYS[2])
+if previous then
+    local orphans = ARGV[4] .. previous
+    local adopted = ARGV[4] .. ARGV[1]
+    local member = redis.call('LPOP', orphans)
+    while member do
+        redis.call('RPUSH', adopted, member)
+        member = redis.call('LPOP', orphans)
+    end
+    if redis.call('EXISTS', adopted) == 1 then
+        redis.call('EXPIRE', adopted, ARGV[5])
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[5])
+return false
+"""
+
+# Атомарно с _JOIN: снимаем свой lease (чужой, взятый после истечения нашего, не трогаем)
+# и забираем всех присоединившихся — опоздавший после этого станет новым лидером
+_LEAVE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+if redis.call('GET', KEYS[3]) == ARGV[1] then
+    redis.call('DEL', KEYS[3])
+end
+local followers = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+return followers
+"""
+
+
+def enabled() -> bool:
+    return settings.singleflight_enabled
+
+
+def flight_key(model_type: str, user_input: str | dict) -> str:
+    """Ключ полёта: модель + канонический вход (компактная запись wire или dict с отсортированными ключами)"""
+    payload = user_input if isinstance(user_input, str) else json.dumps(user_input, sort_keys=True)
+    return hashlib.sha256(f"{model_type}:{payload}".encode()).hexdigest()
+
+
+def join(flight: str, task_uuid: str, user_id: int, enqueued_at: float) -> str | None:
+    """
+    -> task_uuid лидера, если такая же задача уже в работе (тогда ставить свою не нужно),
+    иначе None: вызывающий стал лидером (или Redis недоступен) и ставит задачу сам.
+    Новый лидер забирает ждущих прежнего, если тот умер, не сняв lease
+    """
+    member = json.dumps({"task_uuid": task_uuid, "user_id": user_id, "enqueued_at": enqueued_at})
+    try:
+        leader = get_client().eval(
+            _JOIN, 2, FLIGHT_KEY.format(flight), OWNER_KEY.format(flight),
+            task_uuid, member, settings.singleflight_lease_ms,
+            FOLLOWERS_KEY.format(""), settings.singleflight_followers_ttl_s,
+        )
+    except redis.RedisError:
+        logger.exception(f"[JOIN] Redis error, task_uuid={task_uuid} runs on its own")
+        return None
+    if leader is None:
+        return None
+    leader = leader.decode() if isinstance(leader, bytes) else leader
+    logger.info(f"[JOIN] task_uuid={task_uuid} attached to in-flight task_uuid={leader}")
+    return leader
+
+
+def leave(flight: str, leader_uuid: str) -> list[dict]:
+    """Снимает lease лидера. -> присоединившиеся к нему задачи, им теперь нужно отдать результат"""
+    try:
+        members = get_client().eval(
+            _LEAVE, 3, FLIGHT_KEY.format(flight), FOLLOWERS_KEY.format(leader_uuid), OWNER_KEY.format(flight),
+            leader_uuid,
+        )
+    except redis.RedisError:
+        logger.exception(f"[LEAVE] Redis error, followers of task_uuid={leader_uuid} are left pending")
+        return []
+    return [json.loads(member) for member in members]
+
+
+def fail(flight: str, leader_uuid: str, error: str) -> list[dict]:
+    """Лидер не досчитал: снимает lease и отдаёт ошибку всем, кто его ждал"""
+    followers = leave(flight, leader_uuid)
+    for follower in followers:
+        try:
+            notify_result(follower["task_uuid"], {"error": error})
+        except Exception:
+            logger.exception(f"[FAIL] Failed to push error to follower task_uuid={follower['task_uuid']}")
+    return followers
@@ -1,57 +1,294 @@
 from ml_inference.core.celery_app import celery_app
-from ml_service.app.core.config import settings
-from shared.schemas.inference import InferenceInput
+from ml_inference.core.config import settings
+from shared.schemas.wire import decode_input
 
 
-from ml_inference.model.predict import run_inference_task as sync_task
+from ml_inference.model.predict import run_inference_task as sync_task, run_multi_inference
+from ml_inference.model.batcher import run_batched_inference
 
 
 from ml_service.app.db.session import SessionLocal
-from ml_service.app.repositories.inference_repo import InferenceRepository
+from ml_service.app.repositories.inference_repo import InferenceRepository, failed_row
+from ml_service.app.repositories.billing_repo import BillingRepository
 from datetime import datetime
 from ml_service.app.services.billing_service import BillingService 
+from ml_service.app.services.cache_service import invalidate_user_cache
 import json
+import time
+from uuid import uuid4
 
 from ml_inference.core.logger import get_logger
+from ml_inference.monitoring import metrics
+from ml_inference.persistence import TIMING_FIELDS, publish_result
+from ml_inference.result_channel import notify_result
+from ml_inference import singleflight
 
 
 logger = get_logger("ml_inference_task")
 
 
 @celery_app.task(name="run_inference_task")
-def run_inference_task(model_type: str, user_input: dict, user_id: int):
+def run_inference_task(
+    model_type: str,
+    user_input: str | dict,
+    user_id: int,
+    enqueued_at: float | None = None,
+    task_uuid: str | None = None,
+    flight: str | None = None
+):
+    """user_input — компактная запись shared.schemas.wire от API или dict InferenceInput"""
     logger.info(f"[START] Inference task started | model_type={model_type} | user_id={user_id}")
-    
-    input_obj = InferenceInput(**user_input)  
-    
-    result = sync_task(model_type, input_obj)
-    
+    started = time.perf_counter()
+    # Метки времени стадий (epoch-секунды) уходят в результат, API кладёт их в строку задачи
+    timings = {"enqueued_at": enqueued_at, "started_at": time.time()}
+    if enqueued_at is not None:
+        metrics.queue_wait_seconds.labels(model_type).observe(max(0.0, timings["started_at"] - enqueued_at))
+
+    try:
+        input_obj, user_input = decode_input(user_input)
+
+        if settings.inference_batching_enabled:
+            result = run_batched_inference(model_type, input_obj)
+        else:
+            result = sync_task(model_type, input_obj)
+    except Exception as e:
+        metrics.failures_total.labels(model_type, "task").inc()
+        _fail(task_uuid, flight, model_type, user_input, user_id, f"{type(e).__name__}: {e}")
+        raise
+    timings["predicted_at"] = time.time()
 
     logger.info(f"[INFERENCE] Inference result received | model_type={model_type} | result_type={type(result)}")
-   
+
+    task_id = _save_and_finalize(task_uuid, model_type, user_input, user_id, result, timings)
+    metrics.task_seconds.labels(model_type, result.get("model_version", "")).observe(time.perf_counter() - started)
+    logger.info(f"[FINISH] Inference task completed | task_id={task_id}")
+    payload = {**result, "timings": timings}
+    _notify(task_uuid, model_type, payload)
+    if flight is not None:
+        _complete_followers(flight, task_uuid, model_type, user_input, result, timings)
+    return payload
+
+
+@celery_app.task(name="run_multi_inference_task")
+def run_multi_inference_task(
+    model_types: list[str],
+    user_input: str | dict,
+    user_id: int,
+    enqueued_at: float | None = None,
+    task_uuid: str | None = None,
+    flight: str | None = None
+):
+    """Несколько моделей на одном входе: одна задача, одна строка и одно списание за все модели"""
+    model_type = "+".join(model_types)
+    logger.info(f"[START] Multi-model inference task started | model_types={model_type} | user_id={user_id}")
+    started = time.perf_counter()
+    timings = {"enqueued_at": enqueued_at, "started_at": time.time()}
+    if enqueued_at is not None:
+        metrics.queue_wait_seconds.labels(model_type).observe(max(0.0, timings["started_at"] - enqueued_at))
+
+    try:
+        input_obj, user_input = decode_input(user_input)
+        result = run_multi_inference(model_types, input_obj)
+    except Exception as e:
+        metrics.failures_total.labels(model_type, "task").inc()
+        _fail(task_uuid, flight, model_type, user_input, user_id, f"{type(e).__name__}: {e}")
+        raise
+    timings["predicted_at"] = time.time()
+
+    task_id = _save_and_finalize(task_uuid, model_type, user_input, user_id, result, timings)
+    for name, model_result in result["results"].items():
+        metrics.task_seconds.labels(name, model_result["model_version"]).observe(time.perf_counter() - started)
+    logger.info(f"[FINISH] Multi-model inference task completed | task_id={task_id}")
+    payload = {**result, "timings": timings}
+    _notify(task_uuid, model_type, payload)
+    if flight is not None:
+        _complete_followers(flight, task_uuid, model_type, user_input, result, timings)
+    return payload
+
+
+def _save_and_finalize(
+    task_uuid: str | None,
+    model_type: str,
+    user_input: dict,
+    user_id: int,
+    result: dict,
+    timings: dict
+) -> int | None:
+    """
+    Обновляет строку задачи, созданную API, по task_uuid (или вставляет, если её нет)
+    и финализирует биллинг. Upsert не коммитит сам, поэтому результат и запись
+    биллинга уходят одной транзакцией.
+    """
+    if settings.persistence_mode == "stream":
+        # Write-behind: строку и биллинг пачками запишет python -m ml_inference.persistence
+        try:
+            publish_result(task_uuid or str(uuid4()), user_id, model_type, user_input, result, timings)
+        except Exception as e:
+            metrics.failures_total.labels(model_type, "persist").inc()
+            logger.exception(f"[ERROR] Failed to publish result for persistence | user_id={user_id} | error={e}")
+        return None
 
     db = SessionLocal()
     repo = InferenceRepository(db)
     billing = BillingService(db)
+    task_id = None
 
     try:
-
-        task = repo.create({
+        task_id = repo.upsert_result(task_uuid or str(uuid4()), {
             "user_id": user_id,
             "model_type": model_type,
-            "input_data": json.dumps(user_input),  
-            "output_data": json.dumps(result), 
-            "status": "completed",
-            "finished_at": datetime.utcnow()
+            "input_data": json.dumps(user_input),
+            "output_data": json.dumps(result),
+            "status": "COMPLETED",
+            "finished_at": datetime.utcnow(),
+            **{field: datetime.utcfromtimestamp(ts) for field, ts in timings.items() if ts is not None}
         })
-        logger.info(f"[DB] Inference task created in DB | task_id={task.id}")
+        if task_id is None:
+            db.rollback()
+            return None
+        logger.info(f"[DB] Inference result stored | task_id={task_id}")
 
-        billing.finalize(user_id=user_id, task_id=task.id)
-        logger.info(f"[BILLING] Finalized billing for user_id={user_id}, task_id={task.id}")
+        billing.finalize(user_id=user_id, task_id=task_id)
+        logger.info(f"[BILLING] Finalized billing for user_id={user_id}, task_id={task_id}")
+        timings["committed_at"] = time.time()
     except Exception as e:
+        db.rollback()
+        metrics.failures_total.labels(model_type, "persist").inc()
         logger.exception(f"[ERROR] Failed to save task or finalize billing | user_id={user_id} | error={e}")
     finally:
         db.close()
-    logger.info(f"[FINISH] Inference task completed | task_id={task.id}")
-    return result
+    return task_id
+
+
+def _complete_followers(
+    flight: str,
+    leader_uuid: str,
+    model_type: str,
+    user_input: dict,
+    result: dict,
+    timings: dict
+):
+    """
+    Singleflight: результат лидера отдаётся задачам, присоединившимся к нему в API.
+    У каждой своя строка (своё enqueued_at), своя финализация биллинга и своё уведомление;
+    в режиме sync все строки и записи биллинга уходят одной транзакцией
+    """
+    followers = singleflight.leave(flight, leader_uuid)
+    if not followers:
+        return
+    metrics.singleflight_followers_total.labels(model_type).inc(len(followers))
+    shared = {field: timings.get(field) for field in TIMING_FIELDS if field != "enqueued_at"}
+    follower_timings = {f["task_uuid"]: {**shared, "enqueued_at": f["enqueued_at"]} for f in followers}
+
+    if settings.persistence_mode == "stream":
+        for follower in followers:
+            try:
+                publish_result(
+                    follower["task_uuid"], follower["user_id"], model_type, user_input, result,
+                    follower_timings[follower["task_uuid"]]
+                )
+            except Exception as e:
+                metrics.failures_total.labels(model_type, "persist").inc()
+                logger.exception(f"[ERROR] Failed to publish follower result | task_uuid={follower['task_uuid']} | error={e}")
+    else:
+        db = SessionLocal()
+        completed = []
+        try:
+            finished_at = datetime.utcnow()
+            completed = InferenceRepository(db).upsert_results([
+                {
+                    "task_uuid": follower["task_uuid"],
+                    "user_id": follower["user_id"],
+                    "model_type": model_type,
+                    "input_data": json.dumps(user_input),
+                    "output_data": json.dumps(result),
+                    "status": "COMPLETED",
+                    "finished_at": finished_at,
+                    **{
+                        field: datetime.utcfromtimestamp(ts) if ts is not None else None
+                        for field, ts in follower_timings[follower["task_uuid"]].items()
+                    },
+                }
+                for follower in followers
+            ])
+            BillingRepository(db).create_many([
+                {"user_id": user_id, "task_id": task_id, "amount": 0, "type": "finalize"}
+                for task_id, user_id in completed
+            ])
+            db.commit()
+            committed_at = time.time()
+            for follower_timing in follower_timings.values():
+                follower_timing["committed_at"] = committed_at
+        except Exception as e:
+            db.rollback()
+            completed = []
+            metrics.failures_total.labels(model_type, "persist").inc()
+            logger.exception(f"[ERROR] Failed to save {len(followers)} follower results | leader={leader_uuid} | error={e}")
+        finally:
+            db.close()
+        for user_id in {user_id for _, user_id in completed}:
+            invalidate_user_cache(user_id)
+
+    logger.info(f"[SINGLEFLIGHT] Result of task_uuid={leader_uuid} shared with {len(followers)} followers")
+    for follower in followers:
+        _notify(follower["task_uuid"], model_type, {**result, "timings": follower_timings[follower["task_uuid"]]})
+
 
+def _fail(
+    task_uuid: str | None,
+    flight: str | None,
+    model_type: str,
+    user_input: str | dict,
+    user_id: int,
+    error: str
+):
+    """
+    Задача не досчиталась: строки её и присоединившихся к ней задач получают FAILED
+    с ошибкой в output_data, заморозка возвращается — тем же upsert, одной транзакцией.
+    Иначе после истечения ключа результата задача навсегда осталась бы PENDING с замороженными кредитами
+    """
+    tasks = [{"task_uuid": task_uuid, "user_id": user_id}] if task_uuid is not None else []
+    if flight is not None:
+        tasks += singleflight.leave(flight, task_uuid)
+
+    if tasks and settings.persistence_mode == "stream":
+        for task in tasks:
+            try:
+                publish_result(task["task_uuid"], task["user_id"], model_type, user_input, {"error": error}, {}, status="FAILED")
+            except Exception as e:
+                metrics.failures_total.labels(model_type, "persist").inc()
+                logger.exception(f"[ERROR] Failed to publish task failure | task_uuid={task['task_uuid']} | error={e}")
+    elif tasks:
+        db = SessionLocal()
+        failed = []
+        try:
+            failed = InferenceRepository(db).upsert_results([
+                failed_row(task["task_uuid"], task["user_id"], model_type, json.dumps(user_input), error)
+                for task in tasks
+            ])
+            BillingService(db).refund_many(failed, model_type)
+            db.commit()
+            logger.info(f"[DB] {len(failed)} tasks marked FAILED and refunded | error={error}")
+        except Exception as e:
+            db.rollback()
+            failed = []
+            metrics.failures_total.labels(model_type, "persist").inc()
+            logger.exception(f"[ERROR] Failed to store task failure | task_uuid={task_uuid} | error={e}")
+        finally:
+            db.close()
+        for failed_user_id in {user_id for _, user_id in failed}:
+            invalidate_user_cache(failed_user_id)
+
+    for task in tasks:
+        _notify(task["task_uuid"], model_type, {"error": error})
+
+
+def _notify(task_uuid: str | None, model_type: str, payload: dict):
+    # Без task_uuid задачу поставил не API (ручной запуск) — ждать результат некому
+    if task_uuid is None:
+        return
+    try:
+        notify_result(task_uuid, payload)
+    except Exception as e:
+        metrics.failures_total.labels(model_type, "notify").inc()
+        logger.exception(f"[ERROR] Failed to push result to API | task_uuid={task_uuid} | error={e}")
@@ -1,14 +1,10 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ml_service.app.services.billing_service import BillingService
+from ml_service.app.api.deps import billing_repository, billing_service, cache, call, inference_repository
 from ml_service.app.core.security import get_current_user
-from ml_service.app.db.session import get_db
+from ml_service.app.db.session import get_session
 from ml_service.app.db.models.user import User
 from ml_service.app.schemas.billing import BillingRecordPublic
-from ml_service.app.services.cache_service import get_user_credits_cached, set_user_credits_cached
-from ml_service.app.db.models.inference_task import InferenceTask
 from ml_service.app.schemas.billing import BillingHistoryItem
-from ml_service.app.repositories.billing_repo import BillingRepository
 from ml_service.app.core.logger import get_logger
 from ml_service.app.schemas.billing import BillingRecordPublic
 from typing import List
@@ -19,23 +15,22 @@ logger = get_logger("api.billing")
 
 
 @router.get("/balance")
-def get_balance(
-    db: Session = Depends(get_db),
+async def get_balance(
+    db=Depends(get_session),
     user: User = Depends(get_current_user)
 ):
     try:
         
-        cached = get_user_credits_cached(user.id)
+        cached = await call(cache(db).get_user_credits_cached, user.id)
         if cached:
             logger.info(f"[BALANCE] Cache HIT: user_id={user.id}")
             return {"balance": cached["available_credits"]}
         
         
         logger.info(f"[BALANCE] Cache MISS: user_id={user.id}")
-        service = BillingService(db)
-        balance = service.get_balance(user.id)
+        balance = await call(billing_service(db).get_balance, user.id)
 
-        set_user_credits_cached(user.id, {
+        await call(cache(db).set_user_credits_cached, user.id, {
             "available_credits": balance,
             "frozen_credits": 0  
         })
@@ -46,13 +41,12 @@ def get_balance(
     
 
 @router.get("/history", response_model=List[BillingRecordPublic])
-def get_billing_history(
-    db: Session = Depends(get_db),
+async def get_billing_history(
+    db=Depends(get_session),
     user: User = Depends(get_current_user)
 ):
     try:
-        service = BillingService(db)
-        records = service.billing_repo.get_by_user(user.id)
+        records = await call(billing_repository(db).get_by_user, user.id)
         logger.info(f"[HISTORY] {len(records)} records for user_id={user.id}")
         return records
     except Exception:
@@ -60,18 +54,13 @@ def get_billing_history(
         raise
 
 @router.get("/history_detailed", response_model=List[BillingHistoryItem])
-def get_billing_history_detailed(
-    db: Session = Depends(get_db),
+async def get_billing_history_detailed(
+    db=Depends(get_session),
     user: User = Depends(get_current_user)
 ):
     try:
-        repo = BillingRepository(db)
-        records = repo.get_by_user(user.id)
-
-        task_map = {
-            t.id: t.model_type
-            for t in db.query(InferenceTask).filter(InferenceTask.user_id == user.id).all()
-        }
+        records = await call(billing_repository(db).get_by_user, user.id)
+        task_map = await call(inference_repository(db).get_model_types_by_user, user.id)
 
         result = []
 
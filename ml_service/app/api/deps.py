@@ -0,0 +1,55 @@
+import inspect
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from ml_service.app.repositories.billing_repo import AsyncBillingRepository, BillingRepository
+from ml_service.app.repositories.inference_repo import AsyncInferenceRepository, InferenceRepository
+from ml_service.app.repositories.user_repo import AsyncUserRepository, UserRepository
+from ml_service.app.services import async_cache_service, cache_service
+from ml_service.app.services.auth_service import AsyncAuthService, AuthService
+from ml_service.app.services.billing_service import AsyncBillingService, BillingService
+from ml_service.app.services.inference_service import AsyncInferenceService, InferenceService
+
+# Роуты одни на оба режима: по типу сессии из get_session (ASYNC_DB) выбирается
+# async- или обычный сервис/репозиторий, а call одинаково вызывает и те, и другие
+
+
+async def call(fn, *args, **kwargs):
+    """Корутину ждём в цикле событий, синхронный вызов отправляем в пул потоков"""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def is_async(db) -> bool:
+    return isinstance(db, AsyncSession)
+
+
+def auth_service(db) -> AuthService | AsyncAuthService:
+    return AsyncAuthService(db) if is_async(db) else AuthService(db)
+
+
+def billing_service(db) -> BillingService | AsyncBillingService:
+    return AsyncBillingService(db) if is_async(db) else BillingService(db)
+
+
+def inference_service(db) -> InferenceService | AsyncInferenceService:
+    return AsyncInferenceService(db) if is_async(db) else InferenceService(db)
+
+
+def user_repository(db) -> UserRepository | AsyncUserRepository:
+    return AsyncUserRepository(db) if is_async(db) else UserRepository(db)
+
+
+def billing_repository(db) -> BillingRepository | AsyncBillingRepository:
+    return AsyncBillingRepository(db) if is_async(db) else BillingRepository(db)
+
+
+def inference_repository(db) -> InferenceRepository | AsyncInferenceRepository:
+    return AsyncInferenceRepository(db) if is_async(db) else InferenceRepository(db)
+
+
+def cache(db):
+    """Модуль кэша под режим: redis.asyncio для AsyncSession, иначе синхронный redis"""
+    return async_cache_service if is_async(db) else cache_service
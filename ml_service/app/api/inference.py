@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ml_service.app.db.session import get_db
-from ml_service.app.schemas.inference import InferenceTaskCreate, InferenceTaskRead, InferenceResult, InferenceHistoryPublic
-from ml_service.app.services.inference_service import InferenceService
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from ml_service.app.api.deps import call, inference_service
+from ml_service.app.db.session import get_session
+from ml_service.app.schemas.inference import (
+    InferenceTaskCreate, InferenceTaskRead, InferenceResult, InferenceHistoryPublic,
+    MultiInferenceTaskCreate, MultiInferenceResult, InferenceTaskAccepted, InferenceTaskStatus, ModelCatalogEntry
+)
+from ml_service.app.services.idempotency import IdempotencyConflict
+from ml_service.app.services.model_catalog import model_catalog
+from ml_service.app.core.config import settings
 from ml_service.app.core.security import get_current_user
 from ml_service.app.db.models.user import User
-from typing import List
+from typing import List, Optional
 import json
 from time import sleep
 from ml_service.app.repositories.inference_repo import InferenceRepository
@@ -18,22 +26,34 @@ from ml_service.app.core.logger import get_logger
 router = APIRouter()
 logger = get_logger("api.inference")
 
+
+async def _submit(submit, user_id: int, task_data, idempotency_key: Optional[str]):
+    """Постановка задачи сервисом; повтор Idempotency-Key с другим телом -> 422"""
+    try:
+        return await call(submit, user_id, task_data, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
 @router.post("/submit", response_model=InferenceResult)
-def submit_inference_task(
+async def submit_inference_task(
     task_data: InferenceTaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     try:
-        service = InferenceService(db)
-        task = service.submit_task(current_user.id, task_data)
+        service = inference_service(db)
+        # Синхронная запись в БД — в пуле потоков, async — в цикле; ожидание результата поток не занимает
+        task = await _submit(service.submit_task, current_user.id, task_data, idempotency_key)
+        task = await service.wait_result(task, task.model_type)
 
         if task.output_data:
             try:
                 data = json.loads(task.output_data)
                 explanation = data.get("explanation", "No explanation available")
                 logger.info(f"[SUBMIT] user_id={current_user.id} task_id={task.id} → success")
-                return InferenceResult(result=explanation)
+                return InferenceResult(result=explanation, model_type=task.model_type)
             except Exception:
                 logger.warning(f"[SUBMIT] user_id={current_user.id} task_id={task.id} → corrupted output")
                 return InferenceResult(result="Corrupted output")
@@ -44,13 +64,131 @@ def submit_inference_task(
         logger.exception(f"[SUBMIT] Failed for user_id={current_user.id}")
         raise
 
+@router.post("/submit/multi", response_model=MultiInferenceResult)
+async def submit_multi_inference_task(
+    task_data: MultiInferenceTaskCreate,
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    try:
+        service = inference_service(db)
+        task = await _submit(service.submit_multi_task, current_user.id, task_data, idempotency_key)
+        task = await service.wait_result(task, task.model_type)
+
+        if task.output_data:
+            try:
+                data = json.loads(task.output_data)
+                logger.info(f"[SUBMIT][MULTI] user_id={current_user.id} task_id={task.id} → success")
+                return MultiInferenceResult(result="OK", scores=data.get("results", {}))
+            except Exception:
+                logger.warning(f"[SUBMIT][MULTI] user_id={current_user.id} task_id={task.id} → corrupted output")
+                return MultiInferenceResult(result="Corrupted output")
+        logger.info(f"[SUBMIT][MULTI] user_id={current_user.id} task_id={task.id} → timeout")
+        return MultiInferenceResult(result="Timeout: task not completed")
+
+    except Exception:
+        logger.exception(f"[SUBMIT][MULTI] Failed for user_id={current_user.id}")
+        raise
+
+@router.get("/models", response_model=List[ModelCatalogEntry])
+async def list_models(current_user: User = Depends(get_current_user)):
+    """Каталог моделей: наличие артефакта, цена, p95 задержки и глубина очереди"""
+    models = await run_in_threadpool(model_catalog.models)
+    return [
+        ModelCatalogEntry(
+            name=info.name,
+            available=info.available,
+            cost=info.cost,
+            p95_s=info.p95_s,
+            queue_depth=info.queue_depth,
+            expected_latency_s=info.expected_latency_s,
+        )
+        for info in models
+    ]
+
+
+@router.post("/tasks", response_model=InferenceTaskAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def create_inference_task(
+    task_data: InferenceTaskCreate,
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Ставит задачу и сразу отвечает; результат — через GET /tasks/{task_uuid} или /tasks/{task_uuid}/events"""
+    task = await _submit(inference_service(db).submit_task, current_user.id, task_data, idempotency_key)
+    logger.info(f"[TASKS] user_id={current_user.id} task_uuid={task.task_uuid} → accepted")
+    return InferenceTaskAccepted(task_uuid=task.task_uuid, status=task.status)
+
+
+@router.post("/tasks/multi", response_model=InferenceTaskAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def create_multi_inference_task(
+    task_data: MultiInferenceTaskCreate,
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    task = await _submit(inference_service(db).submit_multi_task, current_user.id, task_data, idempotency_key)
+    logger.info(f"[TASKS][MULTI] user_id={current_user.id} task_uuid={task.task_uuid} → accepted")
+    return InferenceTaskAccepted(task_uuid=task.task_uuid, status=task.status)
+
+
+async def _get_task_or_404(service, user_id: int, task_uuid: str):
+    task = await call(service.get_task, user_id, task_uuid)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@router.get("/tasks/{task_uuid}", response_model=InferenceTaskStatus)
+async def get_inference_task(
+    task_uuid: str,
+    wait: float = Query(0, ge=0, description="long-poll: ждать результат до wait секунд"),
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    service = inference_service(db)
+    task = await _get_task_or_404(service, current_user.id, task_uuid)
+    return await service.wait_task(task, min(wait, settings.task_poll_max_wait_s))
+
+
+@router.get("/tasks/{task_uuid}/events")
+async def stream_inference_task(
+    task_uuid: str,
+    db=Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """SSE: keepalive-комментарии, пока задача в работе, затем одно событие result (или timeout)"""
+    service = inference_service(db)
+    task = await _get_task_or_404(service, current_user.id, task_uuid)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.task_events_max_s
+        while True:
+            remaining = deadline - loop.time()
+            task_status = await service.wait_task(task, max(0.0, min(settings.task_events_heartbeat_s, remaining)))
+            if task_status.status != "PENDING":
+                yield f"event: result\ndata: {task_status.model_dump_json()}\n\n"
+                return
+            if remaining <= settings.task_events_heartbeat_s:
+                yield f"event: timeout\ndata: {task_status.model_dump_json()}\n\n"
+                return
+            yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history", response_model=List[InferenceHistoryPublic])
-def get_history(
-    db: Session = Depends(get_db),
+async def get_history(
+    db=Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    service = InferenceService(db)
-    tasks = service.get_user_history(current_user.id)
+    tasks = await call(inference_service(db).get_user_history, current_user.id)
 
     response = []
     for task in tasks:
@@ -1,5 +1,15 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+
+class RateLimit(BaseModel):
+    """Token bucket: пополнение в секунду и ёмкость (сколько запросов можно подряд)"""
+    rate_per_s: float
+    burst: int
+
+
 class Settings(BaseSettings):
     database_hostname: str
     database_port: str
@@ -12,6 +22,57 @@ class Settings(BaseSettings):
     model_dir: str = ""  
     celery_broker_url: str = ""
 
+    # Async-стек запроса: AsyncSession на asyncpg, async-репозитории и сервисы, redis.asyncio для кэша.
+    # false — синхронная сессия psycopg2, сервисы идут в пуле потоков FastAPI
+    async_db: bool = False
+    async_db_pool_size: int = 20
+    async_db_max_overflow: int = 10
+
+    # Модели, которые API скорит сам в пуле потоков, минуя Celery (например ["simple"])
+    inline_models: list[str] = []
+    inline_pool_size: int = 4
+    inline_timeout_s: float = 5.0
+
+    # Сколько /inference/submit ждёт результат воркера, прежде чем ответить таймаутом
+    inference_result_timeout_s: float = 5.0
+    # База Redis, где воркер публикует результаты (inference:result:<task_uuid>)
+    result_redis_db: int = 4
+    # Сколько хранится Idempotency-Key отправки задачи
+    idempotency_ttl_s: int = 24 * 3600
+    # GET /inference/tasks/{uuid}?wait= держит запрос не дольше этого
+    task_poll_max_wait_s: float = 30.0
+    # SSE /inference/tasks/{uuid}/events: keepalive-комментарий и предельная длительность потока
+    task_events_heartbeat_s: float = 15.0
+    task_events_max_s: float = 300.0
+
+    # Допуск задач до заморозки кредитов: токены на пользователя (общий бакет и бакет по очереди
+    # модели из inference_queues) -> 429, глубина очереди в брокере -> 503; оба с Retry-After
+    admission_enabled: bool = True
+    rate_limit_user: RateLimit = RateLimit(rate_per_s=5, burst=20)
+    rate_limit_tiers: dict[str, RateLimit] = {
+        "premium": RateLimit(rate_per_s=1, burst=5),
+        "multi": RateLimit(rate_per_s=1, burst=5),
+    }
+    admission_max_queue_depth: dict[str, int] = {"simple": 5000, "premium": 500, "multi": 500, "default": 500}
+    # Глубина очереди читается не чаще раза в столько секунд на процесс
+    admission_depth_cache_s: float = 0.5
+    admission_retry_after_s: float = 5.0
+
+    # Деградация по SLO: если модель недоступна (нет артефакта) или её ожидаемая задержка
+    # (p95 исполнения * очередь) больше model_slo_s (по умолчанию inference_result_timeout_s):
+    # "fallback" — более дешёвая модель из model_fallbacks, "reject" — сразу 503, "off" — как есть
+    slo_policy: Literal["fallback", "reject", "off"] = "fallback"
+    model_slo_s: dict[str, float] = {}
+    model_fallbacks: dict[str, list[str]] = {"premium": ["advanced", "simple"], "advanced": ["simple"]}
+    # p95 времени исполнения (started_at -> predicted_at) — по последним catalog_latency_window задачам
+    # модели не старше catalog_sample_max_age_s, не меньше чем по catalog_min_samples. Без свежих
+    # замеров оценки нет и модель снова принимается: иначе заменённая модель не восстановилась бы
+    catalog_latency_window: int = 200
+    catalog_min_samples: int = 20
+    catalog_sample_max_age_s: float = 300.0
+    # Как часто перечитывать список артефактов в model_dir
+    catalog_refresh_s: float = 30.0
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": False,
@@ -3,10 +3,9 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from ml_service.app.db.session import get_db
+from ml_service.app.api.deps import call, user_repository
+from ml_service.app.db.session import get_session
 from ml_service.app.db.models.user import User
-from ml_service.app.repositories.user_repo import UserRepository
 
 
 SECRET_KEY = "your_secret_key"
@@ -33,16 +32,15 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
 ) -> User:
     payload = verify_token(token)
     user_id: str = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=401, detail="User not found")
-    repo = UserRepository(db)
-    user = repo.get_by_id(user_id)
+    user = await call(user_repository(db).get_by_id, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -12,6 +12,8 @@ class InferenceTask(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     model_type = Column(String, nullable=False) 
+    # Что просил пользователь; model_type — модель, которая обслужила и оплатила запрос
+    requested_model_type = Column(String, nullable=True)
     input_data = Column(String, nullable=False)
     output_data = Column(Text, nullable=True)
     status = Column(String, default="PENDING")
@@ -20,4 +22,12 @@ class InferenceTask(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     finished_at = Column(DateTime, nullable=True)
 
+    # Разбивка задержки задачи (UTC): постановка в очередь -> старт в воркере ->
+    # предсказание -> коммит в БД воркером -> результат увидел API
+    enqueued_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    predicted_at = Column(DateTime, nullable=True)
+    committed_at = Column(DateTime, nullable=True)
+    observed_at = Column(DateTime, nullable=True)
+
     user = relationship("User", back_populates="tasks")
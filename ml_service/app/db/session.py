@@ -7,6 +7,11 @@ SQLALCHEMY_DATABASE_URL = (
     f"postgresql://{settings.database_username}:{settings.database_password}"
     f"@{settings.database_hostname}:{settings.database_port}/{settings.database_name}?client_encoding=utf8"
 )
+# asyncpg сам работает в utf8 и не понимает client_encoding в URL
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}"
+    f"@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+)
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,3 +25,36 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+_async_session_factory = None
+
+
+def get_async_session_factory():
+    """Async engine создаётся при первом обращении: без ASYNC_DB asyncpg может быть не установлен"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            pool_size=settings.async_db_pool_size,
+            max_overflow=settings.async_db_max_overflow,
+        )
+        # expire_on_commit=False: в async нет ленивой подгрузки атрибутов после коммита
+        _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+
+async def dispose_async_engine():
+    if _async_session_factory is not None:
+        await _async_session_factory.kw["bind"].dispose()
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+# Сессия, которую получают роуты: AsyncSession при ASYNC_DB=true, иначе обычная
+get_session = get_async_db if settings.async_db else get_db
@@ -5,6 +5,9 @@ from ml_service.app.api import inference
 import logging
 
 from ml_service.app.core.logger import get_logger  
+from ml_service.app.db.session import dispose_async_engine
+from ml_service.app.services import async_cache_service
+from ml_service.app.services.result_waiter import result_waiter
 from prometheus_fastapi_instrumentator import Instrumentator
 
 logger = get_logger("main")
@@ -20,6 +23,17 @@ app.include_router(inference.router, prefix="/inference", tags=["Inference"])
 Instrumentator().instrument(app).expose(app)
 
 
+@app.on_event("shutdown")
+async def close_result_waiter():
+    await result_waiter.close()
+
+
+@app.on_event("shutdown")
+async def close_async_clients():
+    await async_cache_service.r.aclose()
+    await dispose_async_engine()
+
+
 
 @app.get("/")
 def read_root():
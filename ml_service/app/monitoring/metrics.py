@@ -1,4 +1,4 @@
-from prometheus_client import Histogram
+from prometheus_client import Counter, Histogram
 
 age_hist = Histogram(
     'input_feature_age',
@@ -6,3 +6,39 @@ age_hist = Histogram(
     buckets=[18, 25, 35, 45, 55, 65, 75, 90]
 )
 
+admission_rejected_total = Counter(
+    'inference_admission_rejected_total',
+    'Inference submits rejected before billing by admission control',
+    ['tier', 'reason']
+)
+
+inference_degraded_total = Counter(
+    'inference_degraded_total',
+    'Inference submits served by a cheaper model because the requested one would miss its SLO',
+    ['requested', 'served']
+)
+
+
+# Стадии задачи инференса: (название, начало, конец) по меткам времени из result["timings"]
+TASK_STAGES = [
+    ("queue_wait", "enqueued_at", "started_at"),
+    ("execution", "started_at", "predicted_at"),
+    ("persist", "predicted_at", "committed_at"),
+    ("result_pickup", "committed_at", "observed_at"),
+    ("total", "enqueued_at", "observed_at"),
+]
+
+inference_stage_seconds = Histogram(
+    'inference_stage_seconds',
+    'Inference task latency by stage as observed by the API',
+    ['model_type', 'stage'],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+
+
+def observe_task_timings(model_type: str, timings: dict[str, float]):
+    """Пишет длительности стадий, для которых известны обе метки (epoch-секунды)"""
+    for stage, start, end in TASK_STAGES:
+        if timings.get(start) is not None and timings.get(end) is not None:
+            # метки ставят разные контейнеры, небольшой отрицательный сдвиг часов обрезаем
+            inference_stage_seconds.labels(model_type, stage).observe(max(0.0, timings[end] - timings[start]))
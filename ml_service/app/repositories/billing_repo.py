@@ -1,3 +1,5 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ml_service.app.db.models.billing_record import BillingRecord
 from ml_service.app.schemas.billing import BillingRecordCreate
@@ -25,6 +27,12 @@ class BillingRepository:
 
         return billing
 
+    def create_many(self, records: list[dict]):
+        """Несколько записей одним INSERT, без коммита: коммитит вызывающий вместе с остальной пачкой"""
+        if records:
+            self.db.execute(insert(BillingRecord), records)
+            logger.info(f"[CREATE] {len(records)} BillingRecords in one batch")
+
     def get_by_user(self, user_id: int) -> list[BillingRecord]:
         logger.info(f"[GET] Billing records for user_id={user_id}")
         return (
@@ -33,3 +41,38 @@ class BillingRepository:
             .order_by(BillingRecord.timestamp.desc())
             .all()
         )
+
+
+class AsyncBillingRepository:
+    """BillingRepository на AsyncSession"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, user_id: int, data: BillingRecordCreate, task_id: int | None = None) -> BillingRecord:
+        billing = BillingRecord(
+            user_id=user_id,
+            task_id=task_id,
+            amount=data.amount,
+            type=data.type
+        )
+        self.db.add(billing)
+        await self.db.commit()
+        await self.db.refresh(billing)
+
+        logger.info(f"[CREATE] BillingRecord: user_id={user_id}, type={data.type}, amount={data.amount}, task_id={task_id}")
+
+        return billing
+
+    async def get_by_user(self, user_id: int) -> list[BillingRecord]:
+        logger.info(f"[GET] Billing records for user_id={user_id}")
+        result = await self.db.scalars(
+            select(BillingRecord)
+            .filter(BillingRecord.user_id == user_id)
+            .order_by(BillingRecord.timestamp.desc())
+        )
+        return list(result.all())
+
+    async def create_many(self, records: list[dict]):
+        if records:
+            await self.db.execute(insert(BillingRecord), records)
+            logger.info(f"[CREATE] {len(records)} BillingRecords in one batch")
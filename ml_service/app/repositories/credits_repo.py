@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ml_service.app.db.models.user_credits import UserCredits
 
@@ -28,3 +30,29 @@ class CreditsRepository:
         else:
             logger.info(f"[EXISTING] Returning existing credits for user_id={user_id}")
         return credits
+
+
+class AsyncCreditsRepository:
+    """CreditsRepository на AsyncSession"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_user_id(self, user_id: int) -> UserCredits | None:
+        credits = await self.db.scalar(select(UserCredits).filter_by(user_id=user_id))
+        if credits:
+            logger.info(f"[GET] Found credits for user_id={user_id}: available={credits.available_credits}, frozen={credits.frozen_credits}")
+        else:
+            logger.info(f"[GET] No credits found for user_id={user_id}")
+        return credits
+
+    async def get_or_create(self, user_id: int) -> UserCredits:
+        credits = await self.get_by_user_id(user_id)
+        if not credits:
+            credits = UserCredits(user_id=user_id, available_credits=0)
+            self.db.add(credits)
+            await self.db.commit()
+            await self.db.refresh(credits)
+            logger.info(f"[CREATE] Created new credits for user_id={user_id}")
+        else:
+            logger.info(f"[EXISTING] Returning existing credits for user_id={user_id}")
+        return credits
@@ -1,12 +1,33 @@
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ml_service.app.db.models.inference_task import InferenceTask
 from typing import List
 from typing import Optional
 import json
+from datetime import datetime
 
 from ml_service.app.core.logger import get_logger  
 logger = get_logger("inference_repo")
 
+# Задачи в этих статусах upsert больше не трогает
+FINAL_STATUSES = ("COMPLETED", "FAILED")
+
+
+def failed_row(task_uuid: str, user_id: int, model_type: str, input_data: str, error: str) -> dict:
+    """Строка для upsert задачи, которая не досчиталась: ошибка в output_data, как её отдаёт воркер"""
+    return {
+        "task_uuid": task_uuid,
+        "user_id": user_id,
+        "model_type": model_type,
+        "input_data": input_data,
+        "output_data": json.dumps({"error": error}),
+        "status": "FAILED",
+        "finished_at": datetime.utcnow(),
+    }
+
+
 class InferenceRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -24,6 +45,11 @@ class InferenceRepository:
         logger.info(f"[GET ALL] Retrieved {len(tasks)} tasks for user_id={user_id}")
         return tasks
     
+    def get_model_types_by_user(self, user_id: int) -> dict[int, str]:
+        """id задачи -> model_type, для подписей в истории биллинга"""
+        rows = self.db.query(InferenceTask.id, InferenceTask.model_type).filter_by(user_id=user_id).all()
+        return {task_id: model_type for task_id, model_type in rows}
+
     def get_by_id_and_user(self, task_id: int, user_id: int) -> Optional[InferenceTask]:
         task = self.db.query(InferenceTask).filter_by(id=task_id, user_id=user_id).first()
         if task:
@@ -32,18 +58,115 @@ class InferenceRepository:
             logger.warning(f"[GET ONE] No task found with id={task_id} for user_id={user_id}")
         return task
     
-    def update_output(self, task_id: int, output: dict | str):
+    def get_by_uuid_and_user(self, task_uuid: str, user_id: int) -> Optional[InferenceTask]:
+        # task_uuid уникален — поиск по индексу, а не выборка всей истории
+        task = self.db.query(InferenceTask).filter_by(task_uuid=task_uuid, user_id=user_id).first()
+        if task is None:
+            logger.warning(f"[GET ONE] No task found with task_uuid={task_uuid} for user_id={user_id}")
+        return task
+
+    def upsert_result(self, task_uuid: str, task_data: dict) -> Optional[int]:
+        """
+        Записывает результат в строку задачи по task_uuid одним INSERT ... ON CONFLICT DO UPDATE
+        (строки нет — вставляет). Не коммитит: коммит делает вызывающий, вместе с финализацией биллинга.
+        -> id строки или None, если задача уже завершена (повторная доставка сообщения)
+        """
+        row = self.db.execute(self._upsert_statement([{"task_uuid": task_uuid, **task_data}])).first()
+        task_id = row.id if row is not None else None
+        if task_id is None:
+            logger.warning(f"[UPSERT] Task {task_uuid} is already completed, skipping")
+        else:
+            logger.info(f"[UPSERT] Result stored for task_uuid={task_uuid}: id={task_id}")
+        return task_id
+
+    def upsert_results(self, rows: List[dict]) -> List[tuple[int, int]]:
+        """
+        Пачка результатов одним многострочным upsert (у всех строк одинаковый набор полей).
+        Не коммитит. -> (id, user_id) только для строк, завершённых этим вызовом
+        """
+        result = self.db.execute(self._upsert_statement(rows)).all()
+        logger.info(f"[UPSERT] Batch of {len(rows)} results: {len(result)} completed now")
+        return [(row.id, row.user_id) for row in result]
+
+    @staticmethod
+    def _upsert_statement(rows: List[dict]):
+        stmt = insert(InferenceTask).values(rows)
+        # Поля, которые выставил API при создании строки, не перетираем
+        keep = {"task_uuid", "user_id", "model_type", "input_data", "enqueued_at"}
+        return (
+            stmt.on_conflict_do_update(
+                index_elements=[InferenceTask.task_uuid],
+                set_={key: stmt.excluded[key] for key in rows[0] if key not in keep},
+                # уже завершённую (или упавшую) задачу повторная доставка не трогает и не возвращает
+                where=InferenceTask.status.notin_(FINAL_STATUSES),
+            )
+            .returning(InferenceTask.id, InferenceTask.user_id)
+        )
+
+    def update_timings(self, task_id: int, timings: dict[str, datetime]):
+        self.db.query(InferenceTask).filter_by(id=task_id).update(timings)
+        self.db.commit()
+
+    def update_output(self, task_id: int, output: dict | str, timings: dict[str, datetime] | None = None):
         if isinstance(output, dict):
             output = json.dumps(output)
         task = self.db.query(InferenceTask).filter_by(id=task_id).first()
         if task:
             task.output_data = output
             task.status = "COMPLETED"
+            for field, value in (timings or {}).items():
+                setattr(task, field, value)
             self.db.commit()
             logger.info(f"[UPDATE] Task {task_id} marked as COMPLETED with output")
         else:
             logger.warning(f"[UPDATE] Attempt to update non-existent task_id={task_id}")
 
-    
 
+class AsyncInferenceRepository:
+    """InferenceRepository на AsyncSession — те же запросы, включая upsert результата"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, task_data: dict) -> InferenceTask:
+        task = InferenceTask(**task_data)
+        self.db.add(task)
+        await self.db.commit()
+        await self.db.refresh(task)
+        logger.info(f"[CREATE] New inference task created: id={task.id}, user_id={task.user_id}, model={task.model_type}")
+        return task
+
+    async def get_all_by_user_id(self, user_id: int) -> List[InferenceTask]:
+        tasks = list((await self.db.scalars(select(InferenceTask).filter_by(user_id=user_id))).all())
+        logger.info(f"[GET ALL] Retrieved {len(tasks)} tasks for user_id={user_id}")
+        return tasks
+
+    async def get_model_types_by_user(self, user_id: int) -> dict[int, str]:
+        rows = await self.db.execute(select(InferenceTask.id, InferenceTask.model_type).filter_by(user_id=user_id))
+        return {task_id: model_type for task_id, model_type in rows.all()}
+
+    async def get_by_uuid_and_user(self, task_uuid: str, user_id: int) -> Optional[InferenceTask]:
+        task = await self.db.scalar(select(InferenceTask).filter_by(task_uuid=task_uuid, user_id=user_id))
+        if task is None:
+            logger.warning(f"[GET ONE] No task found with task_uuid={task_uuid} for user_id={user_id}")
+        return task
+
+    async def upsert_result(self, task_uuid: str, task_data: dict) -> Optional[int]:
+        """См. InferenceRepository.upsert_result: не коммитит, -> id или None для уже завершённой задачи"""
+        result = await self.db.execute(InferenceRepository._upsert_statement([{"task_uuid": task_uuid, **task_data}]))
+        row = result.first()
+        task_id = row.id if row is not None else None
+        if task_id is None:
+            logger.warning(f"[UPSERT] Task {task_uuid} is already completed, skipping")
+        else:
+            logger.info(f"[UPSERT] Result stored for task_uuid={task_uuid}: id={task_id}")
+        return task_id
+
+    async def upsert_results(self, rows: List[dict]) -> List[tuple[int, int]]:
+        result = (await self.db.execute(InferenceRepository._upsert_statement(rows))).all()
+        logger.info(f"[UPSERT] Batch of {len(rows)} results: {len(result)} completed now")
+        return [(row.id, row.user_id) for row in result]
 
+    async def update_timings(self, task_id: int, timings: dict[str, datetime]):
+        if timings:
+            await self.db.execute(update(InferenceTask).filter_by(id=task_id).values(**timings))
+        await self.db.commit()
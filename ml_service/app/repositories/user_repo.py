@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ml_service.app.db.models.user import User
 from ml_service.app.schemas.auth import UserCreate
@@ -34,3 +36,29 @@ class UserRepository:
         logger.info(f" Поиск пользователя по username: {username}")
         return self.db.query(User).filter(User.username == username).first()
 
+
+class AsyncUserRepository:
+    """UserRepository на AsyncSession"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_email(self, email: str) -> User | None:
+        logger.info(f" Поиск пользователя по email: {email}")
+        return await self.db.scalar(select(User).filter(User.email == email))
+
+    async def create(self, user_create: UserCreate, hashed_password: str) -> User:
+        logger.info(f" Создание пользователя: {user_create.email}")
+        user = User(
+            username=user_create.username,
+            email=user_create.email,
+            password_hash=hashed_password
+        )
+        self.db.add(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        logger.info(f" Пользователь создан: id={user.id}, email={user.email}")
+        return user
+
+    async def get_by_id(self, user_id: int) -> User | None:
+        logger.info(f" Поиск пользователя по ID: {user_id}")
+        return await self.db.scalar(select(User).filter(User.id == int(user_id)))
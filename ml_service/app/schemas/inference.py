@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Literal, Dict, Any, Optional
+from typing import Literal, Dict, Any, Optional, List
+from pydantic import Field, field_validator
 from shared.schemas.inference import InferenceInput
 
 # 🟢 Запрос от пользователя
@@ -10,6 +11,24 @@ class InferenceTaskCreate(BaseModel):
     
 
 
+# Один вход — несколько моделей: признаки кодируются один раз, списание одно за все модели
+class MultiInferenceTaskCreate(BaseModel):
+    model_types: List[Literal["simple", "advanced", "premium"]] = Field(min_length=1)
+    input_data: InferenceInput
+
+    @field_validator("model_types")
+    @classmethod
+    def unique_models(cls, value):
+        if len(set(value)) != len(value):
+            raise ValueError("model_types must not repeat")
+        return value
+
+    @property
+    def model_type(self) -> str:
+        """Ключ для строки задачи и биллинга, например simple+premium"""
+        return "+".join(self.model_types)
+
+
 class InferenceTaskRead(InferenceTaskCreate):
     id: int
     model_type: str
@@ -24,9 +43,52 @@ class InferenceTaskRead(InferenceTaskCreate):
 
 class InferenceResult(BaseModel):
     result: str
+    # модель, которая обслужила и оплатила запрос (может быть дешевле запрошенной)
+    model_type: Optional[str] = None
+
+
+class ModelScore(BaseModel):
+    score: float
+    explanation: str
+    model_version: Optional[str] = None
+    predict_ms: Optional[float] = None
+
+
+class MultiInferenceResult(BaseModel):
+    result: str
+    scores: Dict[str, ModelScore] = {}
         
 
 
+# Ответ 202 на постановку задачи: дальше клиент ждёт её по task_uuid
+class InferenceTaskAccepted(BaseModel):
+    task_uuid: str
+    status: str
+
+
+class InferenceTaskStatus(BaseModel):
+    task_uuid: str
+    model_type: str
+    requested_model_type: Optional[str] = None
+    status: Literal["PENDING", "COMPLETED", "FAILED"]
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    score: Optional[float] = None
+    result: Optional[str] = None
+    scores: Dict[str, ModelScore] = {}
+    error: Optional[str] = None
+
+
+# Запись каталога моделей: то, на что смотрит путь отправки при выборе модели
+class ModelCatalogEntry(BaseModel):
+    name: str
+    available: bool
+    cost: int
+    p95_s: Optional[float] = None
+    queue_depth: Optional[int] = None
+    expected_latency_s: Optional[float] = None
+
+
 class InferenceHistoryPublic(BaseModel):
     model_type: str
     created_at: datetime
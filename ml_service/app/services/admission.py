@@ -0,0 +1,128 @@
+import math
+import time
+
+import redis
+from fastapi import HTTPException
+
+from ml_inference.core.config import settings as inference_settings
+from ml_inference.core.queues import queue_name, tier_for
+from ml_service.app.core.config import settings
+from ml_service.app.core.logger import get_logger
+from ml_service.app.monitoring.metrics import admission_rejected_total
+
+logger = get_logger("admission")
+
+r = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=2,
+    decode_responses=True
+)
+
+RATE_LIMIT_KEY = "ratelimit:{}:{}"
+
+# Token bucket на несколько бакетов сразу: токен берётся из всех или ни из одного.
+# KEYS — бакеты, ARGV[1] — сейчас (мс), далее пары (токенов в секунду, ёмкость) на каждый бакет.
+# -> 0, если пропускаем, иначе через сколько мс появится токен в самом пустом бакете
+_TAKE = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(burst, available + math.max(0, now - ts) * rate / 1000)
+    if available < 1 then
+        wait = math.max(wait, math.ceil((1 - available) * 1000 / rate))
+    end
+    tokens[i] = available
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+return 0
+"""
+
+_broker: redis.Redis | None = None
+# очередь -> (до какого time.monotonic() верна, глубина): LLEN не на каждый запрос
+_depths: dict[str, tuple[float, int]] = {}
+
+
+def _get_broker() -> redis.Redis:
+    global _broker
+    if _broker is None:
+        _broker = redis.Redis.from_url(inference_settings.celery_broker_url)
+    return _broker
+
+
+def queue_depth(queue: str) -> int | None:
+    """Сколько задач ждёт в очереди брокера (None — брокер недоступен)"""
+    now = time.monotonic()
+    cached = _depths.get(queue)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        depth = _get_broker().llen(queue)
+    except redis.RedisError:
+        logger.exception(f"[ADMISSION][ERROR] Failed to read depth of {queue}, admitting")
+        return None
+    _depths[queue] = (now + settings.admission_depth_cache_s, depth)
+    return depth
+
+
+def take_token(user_id: int, tier: str) -> float:
+    """Токен из бакета пользователя и его бакета по очереди модели. -> 0 или сколько секунд ждать"""
+    limits = [(RATE_LIMIT_KEY.format("user", user_id), settings.rate_limit_user)]
+    if tier in settings.rate_limit_tiers:
+        limits.append((RATE_LIMIT_KEY.format(tier, user_id), settings.rate_limit_tiers[tier]))
+    args = [int(time.time() * 1000)]
+    for _, limit in limits:
+        args += [limit.rate_per_s, limit.burst]
+    try:
+        wait_ms = r.eval(_TAKE, len(limits), *[key for key, _ in limits], *args)
+    except redis.RedisError:
+        logger.exception(f"[ADMISSION][ERROR] Redis unavailable, user_id={user_id} is not rate limited")
+        return 0.0
+    return wait_ms / 1000
+
+
+def _reject(status_code: int, reason: str, tier: str, retry_after_s: float, detail: str):
+    admission_rejected_total.labels(tier, reason).inc()
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_s)))},
+    )
+
+
+def admit(user_id: int, model_type: str | list[str]):
+    """
+    Проверка до заморозки кредитов: очередь модели не переполнена (иначе 503)
+    и у пользователя есть токен (иначе 429). Оба ответа с Retry-After.
+    Глубина очереди проверяется первой, чтобы отказ по ней не тратил токены.
+    Redis недоступен — пропускаем, как кэш и идемпотентность
+    """
+    if not settings.admission_enabled:
+        return
+    tier = tier_for(model_type)
+
+    max_depth = settings.admission_max_queue_depth.get(tier)
+    if max_depth is not None:
+        depth = queue_depth(queue_name(tier))
+        if depth is not None and depth >= max_depth:
+            logger.warning(f"[ADMISSION] Queue {tier} is full ({depth} >= {max_depth}), rejecting user_id={user_id}")
+            _reject(503, "queue_depth", tier, settings.admission_retry_after_s, "Inference queue is full, retry later")
+
+    wait_s = take_token(user_id, tier)
+    if wait_s > 0:
+        logger.info(f"[ADMISSION] Rate limit for user_id={user_id} tier={tier}, retry in {wait_s:.2f}s")
+        _reject(429, "rate_limit", tier, wait_s, "Too many inference requests")
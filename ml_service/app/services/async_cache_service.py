@@ -0,0 +1,91 @@
+import json
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from ml_service.app.core.config import settings
+from ml_service.app.schemas.auth import UserRead
+from ml_service.app.services.cache_service import CREDITS_KEY, HISTORY_KEY, PROFILE_KEY
+from ml_service.app.core.logger import get_logger
+
+logger = get_logger("cache")
+
+# Те же ключи и та же база, что у cache_service, но через redis.asyncio — для async-стека API
+r = aioredis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=2,
+    decode_responses=True
+)
+
+
+async def get_user_profile_cached(user_id: int) -> Optional[UserRead]:
+    try:
+        data = await r.hgetall(PROFILE_KEY.format(user_id))
+        if data:
+            logger.info(f"[REDIS][NOEXPIRE] HIT: user profile (user_id={user_id})")
+            return UserRead(**data)
+        logger.info(f"[REDIS][NOEXPIRE] MISS: user profile (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to get user profile (user_id={user_id})")
+    return None
+
+
+async def set_user_profile_cached(user_id: int, profile: UserRead | dict):
+    try:
+        data = profile.model_dump() if isinstance(profile, UserRead) else profile
+        await r.hset(PROFILE_KEY.format(user_id), mapping=data)
+        logger.info(f"[REDIS][NOEXPIRE] SET: user profile (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to set user profile (user_id={user_id})")
+
+
+async def get_user_credits_cached(user_id: int) -> Optional[dict]:
+    try:
+        data = await r.hgetall(CREDITS_KEY.format(user_id))
+        if data:
+            logger.info(f"[REDIS][NOEXPIRE] HIT: user credits (user_id={user_id})")
+            return {
+                "available_credits": int(data.get("available_credits", 0)),
+                "frozen_credits": int(data.get("frozen_credits", 0))
+            }
+        logger.info(f"[REDIS][NOEXPIRE] MISS: user credits (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to get user credits (user_id={user_id})")
+    return None
+
+
+async def set_user_credits_cached(user_id: int, credits: dict):
+    try:
+        await r.hset(CREDITS_KEY.format(user_id), mapping=credits)
+        logger.info(f"[REDIS][NOEXPIRE] SET: user credits (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to set user credits (user_id={user_id})")
+
+
+async def invalidate_user_cache(user_id: int):
+    try:
+        await r.delete(PROFILE_KEY.format(user_id), CREDITS_KEY.format(user_id))
+        logger.info(f"[REDIS][NOEXPIRE] DELETE: user cache (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to invalidate cache (user_id={user_id})")
+
+
+async def get_user_history_cached(user_id: int) -> Optional[list]:
+    try:
+        cached = await r.get(HISTORY_KEY.format(user_id))
+        if cached is not None:
+            logger.info(f"[REDIS][NOEXPIRE] HIT: user history (user_id={user_id})")
+            return json.loads(cached)
+        logger.info(f"[REDIS][NOEXPIRE] MISS: user history (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to get user history (user_id={user_id})")
+    return None
+
+
+async def set_user_history_cached(user_id: int, history: list):
+    try:
+        await r.set(HISTORY_KEY.format(user_id), json.dumps(history))
+        logger.info(f"[REDIS][NOEXPIRE] SET: user history (user_id={user_id})")
+    except Exception:
+        logger.exception(f"[REDIS][ERROR] Failed to set user history (user_id={user_id})")
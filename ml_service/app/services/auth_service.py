@@ -1,10 +1,13 @@
 from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 
 from ml_service.app.schemas.auth import UserCreate
-from ml_service.app.repositories.user_repo import UserRepository
-from ml_service.app.services.billing_service import BillingService  
+from ml_service.app.repositories.user_repo import AsyncUserRepository, UserRepository
+from ml_service.app.services.billing_service import AsyncBillingService, BillingService  
+from ml_service.app.services import async_cache_service
 from ml_service.app.services.cache_service import set_user_profile_cached 
 from ml_service.app.db.models.user import User
 from ml_service.app.core.logger import get_logger
@@ -65,3 +68,51 @@ class AuthService:
             )
         logger.info(f"[AUTH] Login success for user_id={user.id}")
         return user
+
+
+class AsyncAuthService:
+    """AuthService на AsyncSession. bcrypt — чистый CPU, его считаем в пуле потоков, не в цикле событий"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repo = AsyncUserRepository(db)
+        self.billing = AsyncBillingService(db)
+
+    async def register_user(self, user_data: UserCreate) -> User:
+        if await self.repo.get_by_email(user_data.email):
+            logger.warning(f"[AUTH] Attempt to register existing user: {user_data.email}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this email already exists"
+            )
+
+        hashed_password = await run_in_threadpool(pwd_context.hash, user_data.password)
+
+        try:
+            user = await self.repo.create(user_data, hashed_password)
+        except IntegrityError as e:
+            await self.db.rollback()
+            logger.warning(f"[AUTH] Integrity error on user creation: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with that name already exists"
+            )
+
+        logger.info(f"[AUTH] New user registered: {user.email} (id={user.id})")
+        await self.billing.credit_user(user.id, amount=10)
+        await async_cache_service.set_user_profile_cached(user.id, {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email
+        })
+        return user
+
+    async def authenticate_user(self, email: str, password: str) -> User:
+        user = await self.repo.get_by_email(email)
+        if not user or not await run_in_threadpool(pwd_context.verify, password, user.password_hash):
+            logger.warning(f"[AUTH] Failed login for {email}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid email or password"
+            )
+        logger.info(f"[AUTH] Login success for user_id={user.id}")
+        return user
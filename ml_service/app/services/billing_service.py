@@ -1,6 +1,7 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ml_service.app.repositories.billing_repo import BillingRepository
-from ml_service.app.repositories.credits_repo import CreditsRepository
+from ml_service.app.repositories.billing_repo import AsyncBillingRepository, BillingRepository
+from ml_service.app.repositories.credits_repo import AsyncCreditsRepository, CreditsRepository
 from ml_service.app.schemas.billing import BillingRecordCreate
 from ml_service.app.db.models.user_credits import UserCredits
 from ml_service.app.services.cache_service import (  
@@ -8,10 +9,23 @@ from ml_service.app.services.cache_service import (
     set_user_credits_cached,
     invalidate_user_cache,
 )
+from ml_service.app.services import async_cache_service
 from ml_service.app.core.logger import get_logger
 
 logger = get_logger("billing")
 
+# Стоимость запуска модели; по этим же ключам каталог моделей знает, какие модели бывают
+MODEL_COSTS = {
+    "simple": 1,
+    "advanced": 3,
+    "premium": 5,
+}
+
+
+def model_cost(model_type: str) -> int:
+    """Стоимость запуска модели по типу; "simple+premium" — сумма по всем моделям запроса"""
+    return sum(MODEL_COSTS.get(part, 1) for part in model_type.split("+"))
+
 class BillingService:
     def __init__(self, db: Session):
         self.db = db
@@ -91,14 +105,23 @@ class BillingService:
             "frozen_credits": credits.frozen_credits
         })
 
+    def refund_many(self, tasks: list[tuple[int, int]], model_type: str):
+        """
+        Возврат заморозки задачам (task_id, user_id), которые не досчитались. Не коммитит:
+        коммитит вызывающий вместе с записью FAILED в строки задач, кэш сбрасывает он же
+        """
+        cost = self._get_model_cost(model_type)
+        for task_id, user_id in tasks:
+            self.credits_repo.get_by_user_id(user_id).available_credits += cost
+            logger.info(f"[UNFREEZE] User {user_id}: refund {cost} credits for failed task_id={task_id}, model={model_type}")
+        self.billing_repo.create_many([
+            {"user_id": user_id, "task_id": task_id, "amount": cost, "type": "unfreeze"}
+            for task_id, user_id in tasks
+        ])
+
     def _get_model_cost(self, model_type: str) -> int:
-        """Стоимость запуска модели по типу"""
-        cost_map = {
-            "simple": 1,
-            "advanced": 3,
-            "premium": 5,
-        }
-        return cost_map.get(model_type, 1) 
+        return model_cost(model_type)
+
     def get_balance(self, user_id: int) -> int:
         credits = self.credits_repo.get_by_user_id(user_id)
         if credits:
@@ -110,3 +133,98 @@ class BillingService:
         logger.warning(f"[BALANCE] User {user_id}: no credits record found")
         return 0
 
+
+class AsyncBillingService:
+    """BillingService на AsyncSession и redis.asyncio"""
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.billing_repo = AsyncBillingRepository(db)
+        self.credits_repo = AsyncCreditsRepository(db)
+
+    async def credit_user(self, user_id: int, amount: int):
+        credits = await self.credits_repo.get_or_create(user_id)
+        credits.available_credits += amount
+
+        logger.info(f"[CREDIT] User {user_id}: +{amount} credits → available={credits.available_credits}")
+
+        await self.billing_repo.create(
+            user_id=user_id,
+            data=BillingRecordCreate(type="credit", amount=amount)
+        )
+        await self.db.commit()
+        await async_cache_service.set_user_credits_cached(user_id, {
+            "available_credits": credits.available_credits,
+            "frozen_credits": credits.frozen_credits
+        })
+
+    async def freeze(self, user_id: int, model_type: str, task_id: int | None = None):
+        cost = model_cost(model_type)
+        credits = await self.credits_repo.get_by_user_id(user_id)
+
+        if not credits or credits.available_credits < cost:
+            raise ValueError("Insufficient funds")
+
+        credits.available_credits -= cost
+
+        logger.info(f"[FREEZE] User {user_id}: -{cost} credits for model={model_type}, task_id={task_id}")
+
+        await self.billing_repo.create(
+            user_id=user_id,
+            data=BillingRecordCreate(type="freeze", amount=-cost),
+            task_id=task_id
+        )
+        await self.db.commit()
+        await async_cache_service.set_user_credits_cached(user_id, {
+            "available_credits": credits.available_credits,
+            "frozen_credits": credits.frozen_credits
+        })
+
+    async def finalize(self, user_id: int, task_id: int):
+        logger.info(f"[FINALIZE] User {user_id}: task_id={task_id} confirmed")
+
+        await self.billing_repo.create(
+            user_id=user_id,
+            data=BillingRecordCreate(type="finalize", amount=0),
+            task_id=task_id
+        )
+        await self.db.commit()
+        await async_cache_service.invalidate_user_cache(user_id)
+
+    async def unfreeze(self, user_id: int, model_type: str, task_id: int):
+        cost = model_cost(model_type)
+        credits = await self.credits_repo.get_by_user_id(user_id)
+        credits.available_credits += cost
+
+        logger.info(f"[UNFREEZE] User {user_id}: refund {cost} credits for task_id={task_id}, model={model_type}")
+
+        await self.billing_repo.create(
+            user_id=user_id,
+            data=BillingRecordCreate(type="unfreeze", amount=cost),
+            task_id=task_id
+        )
+        await self.db.commit()
+        await async_cache_service.set_user_credits_cached(user_id, {
+            "available_credits": credits.available_credits,
+            "frozen_credits": credits.frozen_credits
+        })
+
+    async def refund_many(self, tasks: list[tuple[int, int]], model_type: str):
+        cost = model_cost(model_type)
+        for task_id, user_id in tasks:
+            (await self.credits_repo.get_by_user_id(user_id)).available_credits += cost
+            logger.info(f"[UNFREEZE] User {user_id}: refund {cost} credits for failed task_id={task_id}, model={model_type}")
+        await self.billing_repo.create_many([
+            {"user_id": user_id, "task_id": task_id, "amount": cost, "type": "unfreeze"}
+            for task_id, user_id in tasks
+        ])
+
+    async def get_balance(self, user_id: int) -> int:
+        credits = await self.credits_repo.get_by_user_id(user_id)
+        if credits:
+            await async_cache_service.set_user_credits_cached(user_id, {
+                "available_credits": credits.available_credits,
+                "frozen_credits": credits.frozen_credits
+            })
+            return credits.available_credits
+        logger.warning(f"[BALANCE] User {user_id}: no credits record found")
+        return 0
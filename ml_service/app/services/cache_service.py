@@ -16,6 +16,7 @@ r = redis.Redis(
 
 PROFILE_KEY = "user:profile:{}"
 CREDITS_KEY = "user:credits:{}"
+HISTORY_KEY = "user:history:{}"
 
 
 def get_user_profile_cached(user_id: int) -> Optional[UserRead]:
@@ -75,7 +76,7 @@ def invalidate_user_cache(user_id: int):
 
 
 def get_user_history_cached(user_id: int) -> Optional[list]:
-    key = f"user:history:{user_id}"
+    key = HISTORY_KEY.format(user_id)
     try:
         if r.exists(key):
             logger.info(f"[REDIS][NOEXPIRE] HIT: user history (user_id={user_id})")
@@ -87,7 +88,7 @@ def get_user_history_cached(user_id: int) -> Optional[list]:
 
 
 def set_user_history_cached(user_id: int, history: list):
-    key = f"user:history:{user_id}"
+    key = HISTORY_KEY.format(user_id)
     try:
         r.set(key, json.dumps(history))
         logger.info(f"[REDIS][NOEXPIRE] SET: user history (user_id={user_id})")
@@ -0,0 +1,64 @@
+import hashlib
+import json
+from typing import Optional
+
+import redis
+
+from ml_service.app.core.config import settings
+from ml_service.app.core.logger import get_logger
+
+logger = get_logger("idempotency")
+
+r = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    db=2,
+    decode_responses=True
+)
+
+IDEMPOTENCY_KEY = "idempotency:{}:{}"
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key уже занят запросом с другим телом; API отвечает 422"""
+
+
+def fingerprint(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def claim(user_id: int, key: str, body_fingerprint: str, task_uuid: str) -> Optional[str]:
+    """
+    SET NX записи {task_uuid, fingerprint} под Idempotency-Key пользователя.
+    -> None, если ключ наш и задачу нужно ставить, иначе task_uuid первого запроса.
+    task_uuid известен до постановки, поэтому параллельный повтор сразу ждёт ту же задачу.
+    Redis недоступен — работаем без идемпотентности, как и кэш
+    """
+    redis_key = IDEMPOTENCY_KEY.format(user_id, key)
+    record = json.dumps({"task_uuid": task_uuid, "fingerprint": body_fingerprint})
+    try:
+        claimed = r.set(redis_key, record, nx=True, ex=settings.idempotency_ttl_s)
+        existing = None if claimed else r.get(redis_key)
+        if not claimed and existing is None:
+            # ключ истёк между SET и GET — занимаем заново
+            claimed = r.set(redis_key, record, ex=settings.idempotency_ttl_s)
+    except redis.RedisError:
+        logger.exception(f"[IDEMPOTENCY][ERROR] Redis unavailable, key={key} is not deduplicated")
+        return None
+    if claimed:
+        logger.info(f"[IDEMPOTENCY] Claimed key={key} user_id={user_id} task_uuid={task_uuid}")
+        return None
+
+    first = json.loads(existing)
+    if first["fingerprint"] != body_fingerprint:
+        raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+    logger.info(f"[IDEMPOTENCY] Replay key={key} user_id={user_id} → task_uuid={first['task_uuid']}")
+    return first["task_uuid"]
+
+
+def release(user_id: int, key: str):
+    """Постановка не удалась (нет кредитов, брокер недоступен) — повтор должен выполниться заново"""
+    try:
+        r.delete(IDEMPOTENCY_KEY.format(user_id, key))
+    except redis.RedisError:
+        logger.exception(f"[IDEMPOTENCY][ERROR] Failed to release key={key}")
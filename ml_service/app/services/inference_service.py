@@ -1,17 +1,30 @@
+import asyncio
 import json
+import time
+from uuid import uuid4
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from celery.exceptions import TimeoutError
-from ml_service.app.monitoring.metrics import age_hist
-from ml_service.app.repositories.inference_repo import InferenceRepository
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from ml_service.app.monitoring.metrics import age_hist, observe_task_timings
+from ml_service.app.repositories.inference_repo import AsyncInferenceRepository, InferenceRepository, failed_row
 from ml_service.app.db.models.inference_task import InferenceTask
-from ml_service.app.services.billing_service import BillingService
-from ml_service.app.schemas.inference import InferenceTaskCreate
+from ml_service.app.services.billing_service import AsyncBillingService, BillingService
+from ml_service.app.schemas.inference import InferenceTaskCreate, InferenceTaskStatus, MultiInferenceTaskCreate
 from ml_service.app.services.cache_service import (
     get_user_history_cached,
+    invalidate_user_cache,
     set_user_history_cached
 )
-from ml_inference.tasks.run_inference import run_inference_task
+from ml_service.app.services import admission, async_cache_service, idempotency
+from ml_service.app.services.inline_inference import is_inline, submit_inline
+from ml_service.app.services.model_catalog import model_catalog
+from ml_service.app.services.result_waiter import result_waiter
+from ml_service.app.core.config import settings
+from ml_inference.tasks.run_inference import run_inference_task, run_multi_inference_task
+from ml_inference import singleflight
+from shared.schemas.wire import pack_input
 from ml_service.app.core.logger import get_logger
 
 logger = get_logger("inference")
@@ -23,39 +36,179 @@ class InferenceService:
         self.repo = InferenceRepository(db)
         self.billing = BillingService(db)
 
-    def submit_task(self, user_id: int, task_data: InferenceTaskCreate) -> InferenceTask:
+    def submit_task(self, user_id: int, task_data: InferenceTaskCreate, idempotency_key: Optional[str] = None) -> InferenceTask:
+        task_uuid = str(uuid4())
+        if idempotency_key:
+            replayed = self._replay(user_id, idempotency_key, task_data, task_uuid)
+            if replayed is not None:
+                return replayed
         try:
+            model_type = _admit(user_id, task_data.model_type)
+            self.billing.freeze(user_id, model_type=model_type)
+            input_dict = task_data.input_data.dict()
+            if "Age" in input_dict and input_dict["Age"] is not None:
+                age_hist.observe(input_dict["Age"])
+
+            enqueued_at = time.time()
+            if is_inline(model_type):
+                future = submit_inline(model_type, task_data.input_data)
+                if future is not None:
+                    return self._finish_inline(
+                        user_id, model_type, task_data.model_type, input_dict, future, enqueued_at, task_uuid
+                    )
+
+            return self._enqueue(
+                run_inference_task, model_type, user_id, input_dict, enqueued_at, task_uuid,
+                requested_model_type=task_data.model_type
+            )
+        except Exception:
+            logger.exception(f"[SUBMIT] Failed to submit task for user_id={user_id}")
+            if idempotency_key:
+                idempotency.release(user_id, idempotency_key)
+            raise
+
+    def submit_multi_task(self, user_id: int, task_data: MultiInferenceTaskCreate, idempotency_key: Optional[str] = None) -> InferenceTask:
+        """Одна задача на несколько моделей: одна заморозка на суммарную стоимость и одна строка"""
+        task_uuid = str(uuid4())
+        if idempotency_key:
+            replayed = self._replay(user_id, idempotency_key, task_data, task_uuid)
+            if replayed is not None:
+                return replayed
+        try:
+            _admit_multi(user_id, task_data.model_types)
             self.billing.freeze(user_id, model_type=task_data.model_type)
             input_dict = task_data.input_data.dict()
             if "Age" in input_dict and input_dict["Age"] is not None:
                 age_hist.observe(input_dict["Age"])
 
-            async_result = run_inference_task.apply_async(args=[
-                task_data.model_type,
-                input_dict,
-                user_id
-            ])
-
-            task = self.repo.create({
-                "user_id": user_id,
-                "model_type": task_data.model_type,
-                "input_data": json.dumps(input_dict),
-                "output_data": None,
-                "status": "PENDING",
-                "task_uuid": async_result.id
-            })
+            enqueued_at = time.time()
+            return self._enqueue(
+                run_multi_inference_task, task_data.model_type, user_id, input_dict, enqueued_at, task_uuid,
+                task_arg=task_data.model_types
+            )
+        except Exception:
+            logger.exception(f"[SUBMIT][MULTI] Failed to submit task for user_id={user_id}")
+            if idempotency_key:
+                idempotency.release(user_id, idempotency_key)
+            raise
 
-            try:
-                result = async_result.get(timeout=5)
-                self.repo.update_output(task.id, json.dumps(result))
-                logger.info(f"[SUBMIT] Immediate result stored for task_id={task.id}")
-            except TimeoutError:
-                logger.warning(f"[SUBMIT] Timeout waiting for async task_id={task.id}")
+    def _replay(self, user_id: int, key: str, task_data, task_uuid: str) -> Optional[InferenceTask]:
+        """
+        Повтор по Idempotency-Key: без заморозки и постановки отдаёт задачу первого запроса.
+        Это отсоединённая копия (id=None), так что повтор ничего не пишет в строку первого запроса.
+        Строки может ещё не быть, если первый запрос её только создаёт, — тогда задача PENDING
+        """
+        first_uuid = idempotency.claim(user_id, key, idempotency.fingerprint(task_data.model_dump_json()), task_uuid)
+        if first_uuid is None:
+            return None
+        return _replayed_task(first_uuid, self.repo.get_by_uuid_and_user(first_uuid, user_id), task_data)
 
+    def _create_pending(self, user_id: int, model_type: str, input_dict: dict, enqueued_at: float, task_uuid: str, requested_model_type: Optional[str] = None) -> InferenceTask:
+        return self.repo.create(_pending_row(user_id, model_type, input_dict, enqueued_at, task_uuid, requested_model_type))
+
+    def _enqueue(self, celery_task, model_type: str, user_id: int, input_dict: dict, enqueued_at: float, task_uuid: str, task_arg=None, requested_model_type: Optional[str] = None) -> InferenceTask:
+        """
+        Строка задачи создаётся до отправки в очередь, её task_uuid становится id задачи Celery.
+        Результат в строку пишет только воркер (upsert по task_uuid), API лишь ждёт его в wait_result.
+        Если такая же (model_type, вход) задача уже считается, своя в очередь не ставится:
+        воркер лидера допишет результат и в эту строку (singleflight)
+        """
+        task = self._create_pending(user_id, model_type, input_dict, enqueued_at, task_uuid, requested_model_type)
+        payload = pack_input(input_dict)
+        flight, leader = _join(task, model_type, user_id, payload, enqueued_at)
+        if leader is not None:
             return task
-        except Exception:
-            logger.exception(f"[SUBMIT] Failed to submit task for user_id={user_id}")
+        try:
+            _send(celery_task, task, model_type, user_id, payload, enqueued_at, flight, task_arg)
+        except Exception as e:
+            logger.exception(f"[SUBMIT] Failed to enqueue task_id={task.id}, refunding")
+            error = f"{type(e).__name__}: {e}"
+            followers = singleflight.fail(flight, task.task_uuid, error) if flight is not None else []
+            self._fail_tasks(model_type, input_dict, error, [{"task_uuid": task.task_uuid, "user_id": user_id}, *followers])
             raise
+        return task
+
+    def _fail_tasks(self, model_type: str, input_dict: dict, error: str, tasks: list[dict]):
+        """
+        Строки задач, которые так и не посчитаются, -> FAILED с ошибкой, заморозка возвращается
+        той же транзакцией. Кроме своей задачи это и присоединившиеся к ней (singleflight)
+        """
+        failed = self.repo.upsert_results([
+            failed_row(task["task_uuid"], task["user_id"], model_type, json.dumps(input_dict), error) for task in tasks
+        ])
+        self.billing.refund_many(failed, model_type)
+        self.db.commit()
+        for user_id in {user_id for _, user_id in failed}:
+            invalidate_user_cache(user_id)
+
+    async def wait_result(self, task: InferenceTask, model_type: str) -> InferenceTask:
+        """
+        Ждёт результат воркера, который приходит через pub/sub, не занимая поток запроса.
+        Синхронная запись меток времени идёт в пуле потоков. Задача, уже завершённая
+        при отправке (inline), возвращается как есть
+        """
+        if task.status != "PENDING":
+            return task
+        result = await result_waiter.wait(task.task_uuid, settings.inference_result_timeout_s)
+        if result is None:
+            logger.warning(f"[SUBMIT] Timeout waiting for task_id={task.id}")
+            return task
+        if "error" in result:
+            raise RuntimeError(f"Inference task {task.task_uuid} failed: {result['error']}")
+        if task.id is None:
+            # повтор по Idempotency-Key: строку и метки времени ведёт первый запрос
+            result.pop("timings", None)
+            task.output_data = json.dumps(result)
+            return task
+        await run_in_threadpool(self._apply_result, task, model_type, result)
+        logger.info(f"[SUBMIT] Result observed for task_id={task.id}")
+        return task
+
+    def _apply_result(self, task: InferenceTask, model_type: str, result: dict):
+        self._record_observed(task.id, model_type, result)
+        if task.output_data is None:
+            # Write-behind: consumer ещё не записал строку — отдаём пришедший результат,
+            # отсоединив объект от сессии, чтобы API не стал вторым писателем
+            self.db.expunge(task)
+            task.output_data = json.dumps(result)
+
+    def _record_observed(self, task_id: int, model_type: str, result: dict):
+        """Метки времени результата — в гистограммы; в строку дописываются только committed_at и observed_at"""
+        # commit внутри update_timings сбрасывает состояние объекта задачи: output_data,
+        # записанный воркером, подтянется из БД при следующем обращении
+        self.repo.update_timings(task_id, _observed_timings(model_type, result))
+
+    def _finish_inline(self, user_id: int, model_type: str, requested_model_type: str, input_dict: dict, future, enqueued_at: float, task_uuid: str) -> InferenceTask:
+        task = self._create_pending(user_id, model_type, input_dict, enqueued_at, task_uuid, requested_model_type)
+        try:
+            result = future.result(timeout=settings.inline_timeout_s)
+        except Exception as e:
+            logger.exception(f"[SUBMIT][INLINE] Inference failed for task_id={task.id}, refunding")
+            self._fail_tasks(model_type, input_dict, f"{type(e).__name__}: {e}", [{"task_uuid": task.task_uuid, "user_id": user_id}])
+            raise
+
+        # Тот же путь записи, что у воркера: upsert по task_uuid и финализация одной транзакцией
+        self.repo.upsert_result(task.task_uuid, _inline_result_row(model_type, result, enqueued_at))
+        self.billing.finalize(user_id=user_id, task_id=task.id)
+        # коммит финализации сбросил объект; перечитываем здесь, в потоке, а не в async-коде роута
+        self.db.refresh(task)
+        logger.info(f"[SUBMIT][INLINE] Result stored for task_id={task.id}")
+        return task
+
+    def get_task(self, user_id: int, task_uuid: str) -> Optional[InferenceTask]:
+        return self.repo.get_by_uuid_and_user(task_uuid, user_id)
+
+    async def wait_task(self, task: InferenceTask, wait_s: float) -> InferenceTaskStatus:
+        """
+        Статус задачи для long-poll и SSE: завершённая отдаётся из строки, иначе
+        до wait_s ждём результат воркера через pub/sub. Запросы в БД здесь не делаются
+        """
+        if task.status != "PENDING":
+            return task_status(task)
+        pushed = await result_waiter.wait(task.task_uuid, wait_s)
+        if pushed is not None:
+            model_catalog.observe(task.model_type, pushed.get("timings", {}))
+        return task_status(task, pushed)
 
     def get_user_history(self, user_id: int) -> List[InferenceTask]:
         cached = get_user_history_cached(user_id)
@@ -63,38 +216,311 @@ class InferenceService:
             return cached
 
         tasks = self.repo.get_all_by_user_id(user_id)
+        try:
+            set_user_history_cached(user_id, _decode_history(tasks))
+        except Exception as e:
+            logger.warning(f"[HISTORY] Failed to cache history for user_id={user_id}: {e}")
 
-        for task in tasks:
-            try:
-                task.input_data = json.loads(task.input_data)
-            except Exception as e:
-                logger.warning(f"[HISTORY] input_data JSON error (task_id={task.id}): {e}")
-                task.input_data = {}
+        return tasks            
 
-            if task.output_data:
-                try:
-                    task.output_data = json.loads(task.output_data)
-                except Exception as e:
-                    logger.warning(f"[HISTORY] output_data JSON error (task_id={task.id}): {e}")
-                    task.output_data = {}
 
+class AsyncInferenceService:
+    """
+    InferenceService на AsyncSession (ASYNC_DB=true): те же шаги и та же запись результата.
+    Короткие синхронные вызовы Redis и брокера (каталог, допуск, идемпотентность,
+    singleflight, apply_async) идут в пуле потоков, БД и кэш — в цикле событий
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repo = AsyncInferenceRepository(db)
+        self.billing = AsyncBillingService(db)
+
+    async def submit_task(self, user_id: int, task_data: InferenceTaskCreate, idempotency_key: Optional[str] = None) -> InferenceTask:
+        task_uuid = str(uuid4())
+        if idempotency_key:
+            replayed = await self._replay(user_id, idempotency_key, task_data, task_uuid)
+            if replayed is not None:
+                return replayed
+        try:
+            model_type = await run_in_threadpool(_admit, user_id, task_data.model_type)
+            await self.billing.freeze(user_id, model_type=model_type)
+            input_dict = task_data.input_data.dict()
+            if "Age" in input_dict and input_dict["Age"] is not None:
+                age_hist.observe(input_dict["Age"])
+
+            enqueued_at = time.time()
+            if is_inline(model_type):
+                future = submit_inline(model_type, task_data.input_data)
+                if future is not None:
+                    return await self._finish_inline(
+                        user_id, model_type, task_data.model_type, input_dict, future, enqueued_at, task_uuid
+                    )
+
+            return await self._enqueue(
+                run_inference_task, model_type, user_id, input_dict, enqueued_at, task_uuid,
+                requested_model_type=task_data.model_type
+            )
+        except Exception:
+            logger.exception(f"[SUBMIT] Failed to submit task for user_id={user_id}")
+            if idempotency_key:
+                await run_in_threadpool(idempotency.release, user_id, idempotency_key)
+            raise
+
+    async def submit_multi_task(self, user_id: int, task_data: MultiInferenceTaskCreate, idempotency_key: Optional[str] = None) -> InferenceTask:
+        task_uuid = str(uuid4())
+        if idempotency_key:
+            replayed = await self._replay(user_id, idempotency_key, task_data, task_uuid)
+            if replayed is not None:
+                return replayed
         try:
-            set_user_history_cached(user_id, [
-                {
-                    "model_type": t.model_type,
-                    "input_data": t.input_data,
-                    "created_at": t.created_at.isoformat(),
-                    "score": t.output_data.get("score") if isinstance(t.output_data, dict) else None,
-                    "result": t.output_data.get("explanation") if isinstance(t.output_data, dict) else None,
-                }
-                for t in tasks
-            ])
+            await run_in_threadpool(_admit_multi, user_id, task_data.model_types)
+            await self.billing.freeze(user_id, model_type=task_data.model_type)
+            input_dict = task_data.input_data.dict()
+            if "Age" in input_dict and input_dict["Age"] is not None:
+                age_hist.observe(input_dict["Age"])
+
+            enqueued_at = time.time()
+            return await self._enqueue(
+                run_multi_inference_task, task_data.model_type, user_id, input_dict, enqueued_at, task_uuid,
+                task_arg=task_data.model_types
+            )
+        except Exception:
+            logger.exception(f"[SUBMIT][MULTI] Failed to submit task for user_id={user_id}")
+            if idempotency_key:
+                await run_in_threadpool(idempotency.release, user_id, idempotency_key)
+            raise
+
+    async def _replay(self, user_id: int, key: str, task_data, task_uuid: str) -> Optional[InferenceTask]:
+        first_uuid = await run_in_threadpool(
+            idempotency.claim, user_id, key, idempotency.fingerprint(task_data.model_dump_json()), task_uuid
+        )
+        if first_uuid is None:
+            return None
+        return _replayed_task(first_uuid, await self.repo.get_by_uuid_and_user(first_uuid, user_id), task_data)
+
+    async def _enqueue(self, celery_task, model_type: str, user_id: int, input_dict: dict, enqueued_at: float, task_uuid: str, task_arg=None, requested_model_type: Optional[str] = None) -> InferenceTask:
+        task = await self.repo.create(_pending_row(user_id, model_type, input_dict, enqueued_at, task_uuid, requested_model_type))
+        payload = pack_input(input_dict)
+        flight, leader = await run_in_threadpool(_join, task, model_type, user_id, payload, enqueued_at)
+        if leader is not None:
+            return task
+        try:
+            await run_in_threadpool(_send, celery_task, task, model_type, user_id, payload, enqueued_at, flight, task_arg)
         except Exception as e:
-            logger.warning(f"[HISTORY] Failed to cache history for user_id={user_id}: {e}")
+            logger.exception(f"[SUBMIT] Failed to enqueue task_id={task.id}, refunding")
+            error = f"{type(e).__name__}: {e}"
+            followers = await run_in_threadpool(singleflight.fail, flight, task.task_uuid, error) if flight is not None else []
+            await self._fail_tasks(model_type, input_dict, error, [{"task_uuid": task.task_uuid, "user_id": user_id}, *followers])
+            raise
+        return task
 
-        return tasks            
+    async def _fail_tasks(self, model_type: str, input_dict: dict, error: str, tasks: list[dict]):
+        failed = await self.repo.upsert_results([
+            failed_row(task["task_uuid"], task["user_id"], model_type, json.dumps(input_dict), error) for task in tasks
+        ])
+        await self.billing.refund_many(failed, model_type)
+        await self.db.commit()
+        for user_id in {user_id for _, user_id in failed}:
+            await async_cache_service.invalidate_user_cache(user_id)
+
+    async def wait_result(self, task: InferenceTask, model_type: str) -> InferenceTask:
+        if task.status != "PENDING":
+            return task
+        result = await result_waiter.wait(task.task_uuid, settings.inference_result_timeout_s)
+        if result is None:
+            logger.warning(f"[SUBMIT] Timeout waiting for task_id={task.id}")
+            return task
+        if "error" in result:
+            raise RuntimeError(f"Inference task {task.task_uuid} failed: {result['error']}")
+        if task.id is not None:
+            await self.repo.update_timings(task.id, _observed_timings(model_type, result))
+            # expire_on_commit=False: строка из БД не перечитывается, поэтому результат
+            # всегда берём пришедший, отсоединив объект — API не пишет output_data
+            self.db.expunge(task)
+            logger.info(f"[SUBMIT] Result observed for task_id={task.id}")
+        result.pop("timings", None)
+        task.output_data = json.dumps(result)
+        return task
+
+    async def _finish_inline(self, user_id: int, model_type: str, requested_model_type: str, input_dict: dict, future, enqueued_at: float, task_uuid: str) -> InferenceTask:
+        task = await self.repo.create(_pending_row(user_id, model_type, input_dict, enqueued_at, task_uuid, requested_model_type))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), settings.inline_timeout_s)
+        except Exception as e:
+            logger.exception(f"[SUBMIT][INLINE] Inference failed for task_id={task.id}, refunding")
+            await self._fail_tasks(model_type, input_dict, f"{type(e).__name__}: {e}", [{"task_uuid": task.task_uuid, "user_id": user_id}])
+            raise
+
+        await self.repo.upsert_result(task.task_uuid, _inline_result_row(model_type, result, enqueued_at))
+        await self.billing.finalize(user_id=user_id, task_id=task.id)
+        await self.db.refresh(task)
+        logger.info(f"[SUBMIT][INLINE] Result stored for task_id={task.id}")
+        return task
+
+    async def get_task(self, user_id: int, task_uuid: str) -> Optional[InferenceTask]:
+        return await self.repo.get_by_uuid_and_user(task_uuid, user_id)
+
+    async def wait_task(self, task: InferenceTask, wait_s: float) -> InferenceTaskStatus:
+        if task.status != "PENDING":
+            return task_status(task)
+        pushed = await result_waiter.wait(task.task_uuid, wait_s)
+        if pushed is not None:
+            model_catalog.observe(task.model_type, pushed.get("timings", {}))
+        return task_status(task, pushed)
+
+    async def get_user_history(self, user_id: int) -> List[InferenceTask]:
+        cached = await async_cache_service.get_user_history_cached(user_id)
+        if cached:
+            return cached
 
-        
+        tasks = await self.repo.get_all_by_user_id(user_id)
+        await async_cache_service.set_user_history_cached(user_id, _decode_history(tasks))
+        return tasks
 
 
+def _admit(user_id: int, model_type: str) -> str:
+    """
+    Выбор модели по SLO и допуск задачи, до заморозки кредитов.
+    -> модель, которая на самом деле обслужит запрос и по которой он оплачивается:
+    запрошенная или более дешёвая, если запрошенная не уложится в SLO
+    """
+    model_type = model_catalog.choose(model_type)
+    admission.admit(user_id, model_type)
+    return model_type
+
+
+def _admit_multi(user_id: int, model_types: list[str]):
+    """Сравнение моделей: все запрошенные модели доступны (без замены) и задача допущена"""
+    model_catalog.require_available(model_types)
+    admission.admit(user_id, model_types)
+
+
+def _replayed_task(first_uuid: str, first: Optional[InferenceTask], task_data) -> InferenceTask:
+    return InferenceTask(
+        task_uuid=first_uuid,
+        model_type=first.model_type if first is not None else task_data.model_type,
+        requested_model_type=task_data.model_type,
+        status=first.status if first is not None else "PENDING",
+        output_data=first.output_data if first is not None else None,
+        created_at=first.created_at if first is not None else None,
+        finished_at=first.finished_at if first is not None else None,
+    )
+
+
+def _pending_row(user_id: int, model_type: str, input_dict: dict, enqueued_at: float, task_uuid: str, requested_model_type: Optional[str] = None) -> dict:
+    return {
+        "user_id": user_id,
+        "model_type": model_type,
+        "requested_model_type": requested_model_type or model_type,
+        "input_data": json.dumps(input_dict),
+        "output_data": None,
+        "status": "PENDING",
+        "task_uuid": task_uuid,
+        "enqueued_at": datetime.utcfromtimestamp(enqueued_at)
+    }
+
+
+def _join(task: InferenceTask, model_type: str, user_id: int, payload: str, enqueued_at: float) -> tuple[Optional[str], Optional[str]]:
+    """
+    Присоединение к такой же задаче в работе (singleflight). -> (flight, task_uuid лидера);
+    лидер None — задачу нужно отправить в Celery самим. Если отправка не удастся, успевших
+    присоединиться к ней отпускает singleflight.fail, а их строки закрывает _fail_tasks
+    """
+    flight = singleflight.flight_key(model_type, payload) if singleflight.enabled() else None
+    if flight is None:
+        return None, None
+    leader = singleflight.join(flight, task.task_uuid, user_id, enqueued_at)
+    if leader is not None:
+        logger.info(f"[SUBMIT] Task task_id={task.id} attached to in-flight task_uuid={leader}")
+    return flight, leader
+
+
+def _send(celery_task, task: InferenceTask, model_type: str, user_id: int, payload: str, enqueued_at: float, flight: Optional[str], task_arg=None):
+    # вход уже провалидирован API — в очередь уходит компактная запись, а не dict
+    celery_task.apply_async(
+        args=[task_arg if task_arg is not None else model_type, payload, user_id],
+        kwargs={"enqueued_at": enqueued_at, "task_uuid": task.task_uuid, "flight": flight},
+        task_id=task.task_uuid
+    )
+    logger.info(f"[SUBMIT] Task queued: task_id={task.id} task_uuid={task.task_uuid}")
+
+
+def _observed_timings(model_type: str, result: dict) -> dict[str, datetime]:
+    """Метки времени результата — в гистограммы и каталог; -> committed_at и observed_at для строки"""
+    # enqueued_at воркер возвращает тем же, что получил от API при постановке
+    timings = {**result.pop("timings", {}), "observed_at": time.time()}
+    observe_task_timings(model_type, timings)
+    model_catalog.observe(model_type, timings)
+    return {
+        field: datetime.utcfromtimestamp(timings[field])
+        for field in ("committed_at", "observed_at") if timings.get(field) is not None
+    }
+
+
+def _inline_result_row(model_type: str, result: dict, enqueued_at: float) -> dict:
+    timings = {**result.pop("timings", {}), "enqueued_at": enqueued_at, "observed_at": time.time()}
+    observe_task_timings(model_type, timings)
+    model_catalog.observe(model_type, timings)
+    return {
+        "output_data": json.dumps(result),
+        "status": "COMPLETED",
+        "finished_at": datetime.utcnow(),
+        **{field: datetime.utcfromtimestamp(ts) for field, ts in timings.items() if ts is not None}
+    }
+
+
+def _decode_history(tasks: List[InferenceTask]) -> list:
+    """Разбирает JSON входа и результата прямо в объектах задач -> записи истории для кэша"""
+    for task in tasks:
+        try:
+            task.input_data = json.loads(task.input_data)
+        except Exception as e:
+            logger.warning(f"[HISTORY] input_data JSON error (task_id={task.id}): {e}")
+            task.input_data = {}
+
+        if task.output_data:
+            try:
+                task.output_data = json.loads(task.output_data)
+            except Exception as e:
+                logger.warning(f"[HISTORY] output_data JSON error (task_id={task.id}): {e}")
+                task.output_data = {}
+
+    return [
+        {
+            "model_type": t.model_type,
+            "input_data": t.input_data,
+            "created_at": t.created_at.isoformat(),
+            "score": t.output_data.get("score") if isinstance(t.output_data, dict) else None,
+            "result": t.output_data.get("explanation") if isinstance(t.output_data, dict) else None,
+        }
+        for t in tasks
+    ]
+
+
+def task_status(task: InferenceTask, pushed: Optional[dict] = None) -> InferenceTaskStatus:
+    """Строка задачи (и результат, пришедший от воркера раньше записи в строку) -> публичный статус"""
+    fields = {
+        "task_uuid": task.task_uuid,
+        "model_type": task.model_type,
+        "requested_model_type": task.requested_model_type,
+        "status": "PENDING",
+        "created_at": task.created_at,
+        "finished_at": task.finished_at,
+    }
+    output = pushed
+    if output is None and task.output_data:
+        try:
+            output = json.loads(task.output_data)
+        except json.JSONDecodeError:
+            output = {"error": "Corrupted output"}
 
+    if output is not None and "error" in output:
+        fields.update(status="FAILED", error=output["error"])
+    elif output is not None:
+        fields.update(
+            status="COMPLETED",
+            score=output.get("score"),
+            result=output.get("explanation"),
+            scores=output.get("results", {}),
+        )
+    return InferenceTaskStatus(**fields)
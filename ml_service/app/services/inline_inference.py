@@ -0,0 +1,34 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from ml_service.app.core.config import settings
+from shared.schemas.inference import InferenceInput
+from ml_inference.model.predict import run_inference_task
+from ml_service.app.core.logger import get_logger
+
+logger = get_logger("inline_inference")
+
+_executor = ThreadPoolExecutor(max_workers=settings.inline_pool_size, thread_name_prefix="inline-inference")
+# Ограничиваем не только потоки, но и очередь: выполняющиеся + ждущие задачи
+_slots = threading.BoundedSemaphore(settings.inline_pool_size * 2)
+
+
+def _score(model_type: str, input_data: InferenceInput) -> dict:
+    started_at = time.time()
+    result = run_inference_task(model_type, input_data)
+    return {**result, "timings": {"started_at": started_at, "predicted_at": time.time()}}
+
+
+def is_inline(model_type: str) -> bool:
+    return model_type in settings.inline_models
+
+
+def submit_inline(model_type: str, input_data: InferenceInput) -> Future | None:
+    """Ставит скоринг в пул API; None — пул занят, задачу нужно отправить в Celery"""
+    if not _slots.acquire(blocking=False):
+        logger.warning(f"[INLINE] Pool is full, falling back to Celery | model_type={model_type}")
+        return None
+    future = _executor.submit(_score, model_type, input_data)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
@@ -0,0 +1,152 @@
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+
+from ml_inference.core.config import settings as inference_settings
+from ml_inference.core.queues import queue_name, tier_for
+from ml_inference.model.load_model import model_registry
+from ml_service.app.core.config import settings
+from ml_service.app.core.logger import get_logger
+from ml_service.app.monitoring.metrics import admission_rejected_total, inference_degraded_total
+from ml_service.app.services.admission import queue_depth
+from ml_service.app.services.billing_service import MODEL_COSTS
+
+logger = get_logger("model_catalog")
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    available: bool
+    cost: int
+    p95_s: float | None
+    queue_depth: int | None
+
+    @property
+    def expected_latency_s(self) -> float | None:
+        """
+        Оценка задержки новой задачи: p95 исполнения (без ожидания в очереди), умноженный
+        на число "волн", которые пройдут, пока разойдётся очередь перед ней (concurrency пула одного воркера)
+        """
+        if self.p95_s is None:
+            return None
+        concurrency = inference_settings.inference_queues.get(tier_for(self.name))
+        concurrency = concurrency.concurrency if concurrency is not None else 1
+        return self.p95_s * (1 + (self.queue_depth or 0) / max(1, concurrency))
+
+
+class ModelCatalog:
+    """
+    Каталог моделей для пути отправки: есть ли артефакт, сколько стоит, p95 времени исполнения
+    (started_at -> predicted_at, свежие замеры процесса API) и глубина очереди.
+    Если модель не укладывается в SLO, choose отдаёт более дешёвую из model_fallbacks
+    или отказывает 503 — до заморозки кредитов, так что списывать и возвращать нечего
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: dict[str, deque] = {}
+        self._available: set[str] = set()
+        self._available_until = 0.0
+
+    def observe(self, model_type: str, timings: dict):
+        """
+        Время исполнения задачи по её меткам (epoch-секунды); без нужных меток ничего не пишет.
+        Ожидание в очереди сюда не входит — его учитывает глубина очереди в expected_latency_s
+        """
+        if timings.get("started_at") is None or timings.get("predicted_at") is None:
+            return
+        with self._lock:
+            window = self._latencies.setdefault(model_type, deque(maxlen=settings.catalog_latency_window))
+            window.append((time.monotonic(), max(0.0, timings["predicted_at"] - timings["started_at"])))
+
+    def p95(self, model_type: str) -> float | None:
+        # замеры старше catalog_sample_max_age_s не в счёт: у заменённой модели новых не будет
+        oldest = time.monotonic() - settings.catalog_sample_max_age_s
+        with self._lock:
+            window = sorted(latency for observed_at, latency in self._latencies.get(model_type, ()) if observed_at >= oldest)
+        if len(window) < settings.catalog_min_samples:
+            return None
+        return window[math.ceil(0.95 * len(window)) - 1]
+
+    def available(self) -> set[str]:
+        now = time.monotonic()
+        if now >= self._available_until:
+            try:
+                self._available = set(model_registry.available())
+            except OSError:
+                logger.exception("[CATALOG] Failed to list model artifacts")
+            self._available_until = now + settings.catalog_refresh_s
+        return self._available
+
+    def is_available(self, model_type: str) -> bool:
+        artifacts = self.available()
+        # model_dir не виден этому процессу API — о наличии артефактов не судим
+        return model_type in artifacts if artifacts else True
+
+    def info(self, model_type: str) -> ModelInfo:
+        return ModelInfo(
+            name=model_type,
+            available=self.is_available(model_type),
+            cost=MODEL_COSTS.get(model_type, 1),
+            p95_s=self.p95(model_type),
+            queue_depth=queue_depth(queue_name(tier_for(model_type))),
+        )
+
+    def models(self) -> list[ModelInfo]:
+        return [self.info(model_type) for model_type in MODEL_COSTS]
+
+    def choose(self, model_type: str) -> str:
+        """-> модель, которая обслужит запрос (и по которой он будет оплачен)"""
+        if settings.slo_policy == "off":
+            return model_type
+        slo_s = settings.model_slo_s.get(model_type, settings.inference_result_timeout_s)
+        requested = self.info(model_type)
+        candidates = [requested]
+        if settings.slo_policy == "fallback":
+            candidates += [
+                info for info in map(self.info, settings.model_fallbacks.get(model_type, []))
+                if info.cost < requested.cost
+            ]
+
+        for info in candidates:
+            expected = info.expected_latency_s
+            if info.available and (expected is None or expected <= slo_s):
+                if info.name != model_type:
+                    inference_degraded_total.labels(model_type, info.name).inc()
+                    logger.warning(
+                        f"[CATALOG] {model_type} would miss SLO {slo_s}s "
+                        f"(available={requested.available}, expected={requested.expected_latency_s}), serving {info.name}"
+                    )
+                return info.name
+
+        admission_rejected_total.labels(tier_for(model_type), "slo").inc()
+        logger.warning(f"[CATALOG] No model can serve {model_type} within SLO {slo_s}s, rejecting")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model {model_type} is unavailable or overloaded, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(settings.admission_retry_after_s)))},
+        )
+
+    def require_available(self, model_types: list[str]):
+        """
+        Сравнение моделей не деградирует: у каждой запрошенной модели должен быть артефакт,
+        иначе 503 до заморозки — воркер упал бы на отсутствующем файле
+        """
+        missing = [model_type for model_type in model_types if not self.is_available(model_type)]
+        if not missing:
+            return
+        admission_rejected_total.labels(tier_for(model_types), "unavailable").inc()
+        logger.warning(f"[CATALOG] Models {missing} are unavailable, rejecting {'+'.join(model_types)}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Models unavailable: {', '.join(missing)}",
+            headers={"Retry-After": str(max(1, math.ceil(settings.admission_retry_after_s)))},
+        )
+
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import redis.asyncio as aioredis
+
+from ml_inference.result_channel import RESULT_KEY, result_key
+from ml_service.app.core.config import settings
+from ml_service.app.core.logger import get_logger
+
+logger = get_logger("result_waiter")
+
+
+class ResultWaiter:
+    """
+    Ожидание результатов воркера без блокирующего опроса.
+
+    Одна подписка на inference:result:* на весь процесс API; запросы ждут свой
+    task_uuid на asyncio.Future и не занимают поток. Воркер делает SET и PUBLISH
+    одной транзакцией, поэтому GET после подписки закрывает гонку
+    "результат пришёл раньше, чем мы начали ждать".
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.prefix = RESULT_KEY.format("")
+        self._client: aioredis.Redis | None = None
+        self._reader: asyncio.Task | None = None
+        self._subscribed: asyncio.Event | None = None
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+
+    async def start(self):
+        if self._reader is None or self._reader.done():
+            self._client = self._client or aioredis.from_url(self.url)
+            self._subscribed = asyncio.Event()
+            self._reader = asyncio.create_task(self._read_loop())
+        await self._subscribed.wait()
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def wait(self, task_uuid: str, timeout: float) -> dict | None:
+        """-> результат задачи ({"error": ...}, если она упала) или None, если не дождались"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        future = loop.create_future()
+        self._waiters.setdefault(task_uuid, []).append(future)
+        try:
+            await asyncio.wait_for(self.start(), timeout)
+            cached = await self._client.get(result_key(task_uuid))
+            if cached is not None:
+                return json.loads(cached)
+            return await asyncio.wait_for(future, max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            # сообщение могло потеряться при переподключении — последняя проверка по ключу
+            return await self._get_quietly(task_uuid)
+        except aioredis.RedisError:
+            logger.exception(f"[WAIT] Redis error while waiting for task_uuid={task_uuid}")
+            return None
+        finally:
+            futures = self._waiters.get(task_uuid, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._waiters.pop(task_uuid, None)
+
+    async def _get_quietly(self, task_uuid: str) -> dict | None:
+        if self._client is None:
+            return None
+        try:
+            cached = await self._client.get(result_key(task_uuid))
+        except aioredis.RedisError:
+            return None
+        return json.loads(cached) if cached is not None else None
+
+    def _dispatch(self, channel: bytes, data: bytes):
+        task_uuid = channel.decode()[len(self.prefix):]
+        futures = self._waiters.get(task_uuid)
+        if not futures:
+            return
+        payload = json.loads(data)
+        for future in futures:
+            if not future.done():
+                future.set_result(payload)
+
+    async def _read_loop(self):
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{self.prefix}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "psubscribe":
+                        self._subscribed.set()
+                        logger.info(f"[SUBSCRIBE] Listening for results on {self.prefix}*")
+                    elif message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._subscribed.clear()
+                logger.exception("[SUBSCRIBE] Result subscription lost, reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+result_waiter = ResultWaiter(
+    f"redis://{settings.redis_host}:{settings.redis_port}/{settings.result_redis_db}"
+)
@@ -1,9 +1,19 @@
+from pathlib import Path
+
 from ml_service.app.db.session import Base, get_db, settings
 from ml_service.app.db.session import engine
 from ml_service.app.db.models import user, user_credits, inference_task, billing_record
 
+# create_all не добавляет колонки в существующие таблицы — это делают идемпотентные SQL-миграции
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
 print("Создание таблиц...")
 print(settings.dict())  
 
 Base.metadata.create_all(bind=engine)
-print("Готово.")
\ No newline at end of file
+
+for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+    print(f"Миграция {migration.name}...")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(migration.read_text())
+print("Готово.")
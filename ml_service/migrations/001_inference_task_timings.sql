@@ -0,0 +1,6 @@
+-- Метки времени стадий задачи инференса (UTC)
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS enqueued_at TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS predicted_at TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS committed_at TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS observed_at TIMESTAMP WITHOUT TIME ZONE;
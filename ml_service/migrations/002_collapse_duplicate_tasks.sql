@@ -0,0 +1,51 @@
+-- Раньше на каждый инференс было две строки: PENDING/COMPLETED от API (task_uuid = id задачи Celery)
+-- и 'completed' от воркера со случайным task_uuid. Связи между ними нет, поэтому пару ищем по
+-- пользователю, модели, входу и ближайшему времени создания. Результат воркера переносим в строку API,
+-- записи биллинга перевешиваем на неё же, строку воркера удаляем. Повторный запуск ничего не меняет
+
+CREATE TEMP TABLE task_duplicates ON COMMIT DROP AS
+WITH candidates AS (
+    SELECT
+        w.id AS worker_id,
+        a.id AS api_id,
+        abs(extract(epoch FROM (w.created_at - a.created_at))) AS gap
+    FROM inference_tasks w
+    JOIN inference_tasks a
+      ON a.user_id = w.user_id
+     AND a.model_type = w.model_type
+     AND a.input_data = w.input_data
+     AND a.id <> w.id
+     AND a.status IN ('PENDING', 'COMPLETED')
+     AND a.created_at BETWEEN w.created_at - INTERVAL '10 minutes' AND w.created_at + INTERVAL '10 minutes'
+    WHERE w.status = 'completed'
+),
+nearest_api_row AS (
+    SELECT DISTINCT ON (worker_id) worker_id, api_id, gap
+    FROM candidates
+    ORDER BY worker_id, gap
+)
+-- одна строка API — не больше одной строки воркера
+SELECT DISTINCT ON (api_id) worker_id, api_id
+FROM nearest_api_row
+ORDER BY api_id, gap;
+
+UPDATE inference_tasks a
+SET output_data = w.output_data,
+    status = 'COMPLETED',
+    finished_at = w.finished_at,
+    started_at = COALESCE(a.started_at, w.started_at),
+    predicted_at = COALESCE(a.predicted_at, w.predicted_at)
+FROM task_duplicates d
+JOIN inference_tasks w ON w.id = d.worker_id
+WHERE a.id = d.api_id;
+
+UPDATE billing_records b
+SET task_id = d.api_id
+FROM task_duplicates d
+WHERE b.task_id = d.worker_id;
+
+DELETE FROM inference_tasks
+WHERE id IN (SELECT worker_id FROM task_duplicates);
+
+-- Строки воркера без пары (строка API не успела создаться) остаются единственными — приводим статус к общему
+UPDATE inference_tasks SET status = 'COMPLETED' WHERE status = 'completed';
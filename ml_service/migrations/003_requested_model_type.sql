@@ -0,0 +1,6 @@
+-- Запрошенная модель отдельно от обслужившей: при деградации по SLO запрос premium
+-- может обслужить и оплатить simple, тогда model_type = 'simple', requested_model_type = 'premium'
+ALTER TABLE inference_tasks ADD COLUMN IF NOT EXISTS requested_model_type VARCHAR;
+
+-- До деградации запрошенная и обслужившая модели всегда совпадали
+UPDATE inference_tasks SET requested_model_type = model_type WHERE requested_model_type IS NULL;
@@ -0,0 +1,62 @@
+import base64
+import struct
+from typing import get_args
+
+from shared.schemas.inference import InferenceInput
+
+# Внутренний формат InferenceInput для сообщений Celery: версия, коды категорий
+# (порядок значений из Literal) и числовые поля int32 — 24 байта вместо ~450 байт JSON.
+# Меняется порядок полей или значений Literal — поднимаем WIRE_VERSION
+WIRE_VERSION = 1
+
+NUMERIC_FIELDS = ["Age", "Income", "Number_of_Children"]
+CATEGORICAL_FIELDS = [name for name in InferenceInput.model_fields if name not in NUMERIC_FIELDS]
+CATEGORIES = {name: get_args(InferenceInput.model_fields[name].annotation) for name in CATEGORICAL_FIELDS}
+_CODES = {name: {value: code for code, value in enumerate(values)} for name, values in CATEGORIES.items()}
+
+_RECORD = struct.Struct("<B" + "B" * len(CATEGORICAL_FIELDS) + "i" * len(NUMERIC_FIELDS))
+# (поле, позиция в записи, значения категории или None для числа) в порядке полей InferenceInput
+_POSITIONS = {
+    **{name: (1 + i, CATEGORIES[name]) for i, name in enumerate(CATEGORICAL_FIELDS)},
+    **{name: (1 + len(CATEGORICAL_FIELDS) + i, None) for i, name in enumerate(NUMERIC_FIELDS)},
+}
+_LAYOUT = [(name, *_POSITIONS[name]) for name in InferenceInput.model_fields]
+
+
+def pack_input(fields: dict) -> str | dict:
+    """
+    Уже провалидированный InferenceInput (как dict) -> base64 компактной записи.
+    Числа вне int32 схема не ограничивает — такой вход уходит обычным dict
+    """
+    try:
+        record = _RECORD.pack(
+            WIRE_VERSION,
+            *(_CODES[name][fields[name]] for name in CATEGORICAL_FIELDS),
+            *(fields[name] for name in NUMERIC_FIELDS),
+        )
+    except struct.error:
+        return fields
+    return base64.b64encode(record).decode("ascii")
+
+
+def unpack_input(payload: str) -> dict:
+    """base64 компактной записи -> dict полей InferenceInput в порядке схемы"""
+    values = _RECORD.unpack(base64.b64decode(payload))
+    if values[0] != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version {values[0]}, expected {WIRE_VERSION}")
+    try:
+        return {name: values[i] if categories is None else categories[values[i]] for name, i, categories in _LAYOUT}
+    except IndexError:
+        raise ValueError("Corrupted wire record: category code out of range") from None
+
+
+def decode_input(user_input: str | dict) -> tuple[InferenceInput, dict]:
+    """
+    Вход задачи воркера -> (InferenceInput, dict полей). Dict — старые сообщения и ручной запуск.
+    Из записи значения приходят уже допустимыми; model_validate на таком dict в pydantic v2
+    быстрее model_construct, поэтому объект собирается им
+    """
+    if isinstance(user_input, str):
+        fields = unpack_input(user_input)
+        return InferenceInput.model_validate(fields), fields
+    return InferenceInput(**user_input), user_input
@@ -51,6 +51,29 @@ token = st.session_state.get("token")
 headers = {"Authorization": f"Bearer {token}"} if token else {}
 
 
+def run_task(path: str, payload: dict, attempts: int = 4, wait_s: int = 15) -> dict:
+    """Ставит задачу (202) и ждёт её long-poll'ом: сервер отвечает, как только готов результат"""
+    response = requests.post(f"{API_URL}/inference/{path}", json=payload, headers=headers)
+    if response.status_code in (429, 503):
+        # лимит запросов или очередь переполнена — API говорит, когда повторить
+        retry_after = response.headers.get("Retry-After", "a few")
+        return {"status": "FAILED", "error": f"Service is busy, try again in {retry_after} seconds"}
+    if response.status_code != 202:
+        return {"status": "FAILED", "error": f"{response.status_code}, {response.text}"}
+    task = response.json()
+    for _ in range(attempts):
+        if task["status"] != "PENDING":
+            break
+        response = requests.get(
+            f"{API_URL}/inference/tasks/{task['task_uuid']}",
+            params={"wait": wait_s}, headers=headers, timeout=wait_s + 5
+        )
+        if response.status_code != 200:
+            return {"status": "FAILED", "error": f"{response.status_code}, {response.text}"}
+        task = response.json()
+    return task
+
+
 st.sidebar.markdown("---")
 if st.sidebar.button("🧠 Check Depression Risk"):
     st.session_state["page"] = "form"
@@ -102,12 +125,41 @@ if st.session_state["page"] == "form":
             "model_type": model_type,
             "input_data": input_data
         }
-        response = requests.post(f"{API_URL}/inference/submit", json=payload, headers=headers)
-        if response.status_code == 200:
-            task = response.json()
+        with st.spinner("Scoring..."):
+            task = run_task("tasks", payload)
+        if task["status"] == "COMPLETED":
             st.success(f"Result: {task.get('result')}")
+            if task.get("model_type") and task["model_type"] != model_type:
+                st.info(f"{model_type} was overloaded — scored and billed by {task['model_type']}")
+        elif task["status"] == "PENDING":
+            st.warning("Still running — the result will appear in Previous Checks")
         else:
-            st.error(f"Error: {response.status_code}, {response.text}")
+            st.error(f"Error: {task.get('error')}")
+
+    # сравнивать можно только модели с артефактом: остальные API отклонит до списания
+    models_resp = requests.get(f"{API_URL}/inference/models", headers=headers)
+    compare_options = (
+        [model["name"] for model in models_resp.json() if model["available"]]
+        if models_resp.status_code == 200 else ["simple", "premium"]
+    )
+    compare_models = st.multiselect(
+        "Compare models", compare_options, default=[name for name in ("simple", "premium") if name in compare_options]
+    )
+    if compare_models and st.button("⚖️ Compare side by side"):
+        payload = {
+            "model_types": compare_models,
+            "input_data": input_data
+        }
+        with st.spinner("Scoring..."):
+            task = run_task("tasks/multi", payload)
+        if task["status"] == "FAILED":
+            st.error(f"Error: {task.get('error')}")
+        elif task["status"] == "PENDING":
+            st.warning("Still running — the result will appear in Previous Checks")
+        scores = task.get("scores") or {}
+        for column, (name, score) in zip(st.columns(max(len(scores), 1)), scores.items()):
+            column.metric(name, f"{score['score']:.2f}")
+            column.caption(score["explanation"])
 
 elif st.session_state["page"] == "history":
     st.title("📜 Previous Checks")
@@ -0,0 +1,9 @@
+import pytest
+from ml_inference.model.prediction_cache import prediction_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_prediction_cache():
+    prediction_cache.clear()
+    yield
+    prediction_cache.clear()
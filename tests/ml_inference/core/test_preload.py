@@ -0,0 +1,60 @@
+import gc
+from unittest.mock import MagicMock, patch
+
+from ml_inference.core import preload
+
+
+@patch("ml_inference.core.preload.model_registry")
+def test_preload_models_loads_and_warms_each_model(mock_registry):
+    models = {name: MagicMock(version=f"{name}-v1") for name in ("simple", "premium")}
+    mock_registry.get.side_effect = lambda name, watch=True: models[name]
+
+    try:
+        loaded = preload.preload_models(["simple", "premium"])
+    finally:
+        gc.unfreeze()
+
+    assert loaded == {"simple": "simple-v1", "premium": "premium-v1"}
+    # в родителе prefork поток перезагрузки не запускается
+    assert all(c.kwargs == {"watch": False} for c in mock_registry.get.call_args_list)
+    for model in models.values():
+        model.predict.assert_called_once()
+        assert model.predict.call_args.args[0].shape == (1, 10)
+
+
+@patch("ml_inference.core.preload.model_registry")
+def test_preload_skips_broken_model(mock_registry):
+    def get(name, watch=True):
+        if name == "premium":
+            raise OSError("corrupted artifact")
+        return MagicMock(version="v1")
+
+    mock_registry.get.side_effect = get
+
+    try:
+        loaded = preload.preload_models(["premium", "simple"])
+    finally:
+        gc.unfreeze()
+
+    assert loaded == {"simple": "v1"}
+
+
+@patch("ml_inference.core.preload.model_registry")
+def test_preload_empty_list_loads_nothing(mock_registry, monkeypatch):
+    monkeypatch.setattr(preload.settings, "preload_models", [])
+
+    try:
+        loaded = preload.preload_models()
+    finally:
+        gc.unfreeze()
+
+    assert loaded == {}
+    mock_registry.available.assert_not_called()
+    mock_registry.get.assert_not_called()
+
+
+def test_process_memory_reports_rss():
+    memory = preload.process_memory()
+
+    assert memory
+    assert all(isinstance(value, int) and value >= 0 for value in memory.values())
@@ -0,0 +1,64 @@
+import pytest
+
+from ml_inference.core import queues
+from ml_inference.core.config import QueuePool
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(queues.settings, "inference_queues", {
+        "simple": QueuePool(concurrency=8, prefetch_multiplier=4, soft_time_limit_s=5, time_limit_s=10),
+        "premium": QueuePool(concurrency=2, prefetch_multiplier=1, soft_time_limit_s=60, time_limit_s=120),
+        "multi": QueuePool(concurrency=1),
+        "default": QueuePool(concurrency=1),
+    })
+    monkeypatch.setattr(queues.settings, "worker_queues", None)
+
+
+def test_route_by_model_type(pools):
+    assert queues.route_task("run_inference_task", ["simple", {}, 1], {}, {}) == {"queue": "inference.simple"}
+    assert queues.route_task("run_inference_task", ["premium", {}, 1], {}, {}) == {"queue": "inference.premium"}
+    assert queues.route_task("run_inference_task", [], {"model_type": "simple"}, {}) == {"queue": "inference.simple"}
+
+
+def test_route_multi_and_unknown_models(pools):
+    assert queues.route_task("run_multi_inference_task", [["simple", "premium"], {}, 1], {}, {}) == {"queue": "inference.multi"}
+    assert queues.route_task("run_inference_task", ["experimental", {}, 1], {}, {}) == {"queue": "inference.default"}
+    assert queues.route_task("celery.chord_unlock", [], {}, {}) is None
+
+
+def test_worker_config_for_single_tier(pools, monkeypatch):
+    monkeypatch.setattr(queues.settings, "worker_queues", ["simple"])
+
+    config = queues.celery_queue_config()
+
+    [queue] = config["task_queues"]
+    assert (queue.name, queue.exchange.name, queue.routing_key) == ("inference.simple",) * 3
+    assert config["worker_concurrency"] == 8
+    assert config["worker_prefetch_multiplier"] == 4
+    assert (config["task_soft_time_limit"], config["task_time_limit"]) == (5, 10)
+
+
+def test_worker_config_for_several_tiers(pools, monkeypatch):
+    monkeypatch.setattr(queues.settings, "worker_queues", ["simple", "premium"])
+
+    config = queues.celery_queue_config()
+
+    assert [queue.name for queue in config["task_queues"]] == ["inference.simple", "inference.premium"]
+    assert config["worker_concurrency"] == 10
+    assert config["worker_prefetch_multiplier"] == 1
+    assert (config["task_soft_time_limit"], config["task_time_limit"]) == (60, 120)
+
+
+def test_all_queues_by_default(pools):
+    config = queues.celery_queue_config()
+
+    assert len(config["task_queues"]) == 4
+    assert config["task_default_queue"] == "inference.default"
+
+
+def test_unknown_worker_queue_is_rejected(pools, monkeypatch):
+    monkeypatch.setattr(queues.settings, "worker_queues", ["gpu"])
+
+    with pytest.raises(ValueError):
+        queues.celery_queue_config()
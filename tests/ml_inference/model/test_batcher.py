@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from ml_inference.model.batcher import MicroBatcher
+
+
+def test_concurrent_requests_are_scored_in_one_batch():
+    calls = []
+
+    def score_fn(model_type, inputs):
+        calls.append((model_type, list(inputs)))
+        return [{"score": float(x), "explanation": str(x)} for x in inputs]
+
+    batcher = MicroBatcher("simple", max_batch_size=8, max_wait_ms=200, score_fn=score_fn)
+    futures = [batcher.submit(i) for i in range(5)]
+
+    results = [f.result(timeout=2) for f in futures]
+
+    assert [r["score"] for r in results] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert len(calls) == 1
+    assert calls[0][0] == "simple"
+
+
+def test_batch_is_capped_by_max_size():
+    sizes = []
+
+    def score_fn(model_type, inputs):
+        sizes.append(len(inputs))
+        return [{"score": 0.0, "explanation": ""} for _ in inputs]
+
+    batcher = MicroBatcher("premium", max_batch_size=3, max_wait_ms=200, score_fn=score_fn)
+    futures = [batcher.submit(i) for i in range(7)]
+    for f in futures:
+        f.result(timeout=2)
+
+    assert max(sizes) <= 3
+    assert sum(sizes) == 7
+
+
+def test_batch_failure_is_propagated_to_every_caller():
+    def score_fn(model_type, inputs):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher("simple", max_batch_size=4, max_wait_ms=50, score_fn=score_fn)
+    futures = [batcher.submit(i) for i in range(2)]
+
+    for f in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            f.result(timeout=2)
+
+
+def test_short_result_fails_whole_batch():
+    def score_fn(model_type, inputs):
+        return [{"score": 0.0, "explanation": ""}]
+
+    batcher = MicroBatcher("simple", max_batch_size=4, max_wait_ms=200, score_fn=score_fn)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for f in futures:
+        with pytest.raises(ValueError, match="1 results for 3 inputs"):
+            f.result(timeout=2)
+
+
+def test_worker_survives_cancelled_future():
+    release = threading.Event()
+
+    def score_fn(model_type, inputs):
+        release.wait(timeout=2)
+        return [{"score": float(x), "explanation": ""} for x in inputs]
+
+    batcher = MicroBatcher("simple", max_batch_size=2, max_wait_ms=200, score_fn=score_fn)
+    cancelled, kept = batcher.submit(0), batcher.submit(1)
+    cancelled.cancel()
+    release.set()
+
+    assert kept.result(timeout=2)["score"] == 1.0
+    assert batcher.submit(2).result(timeout=2)["score"] == 2.0
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from ml_inference.model.compiled_trees import CompiledEnsemble, compile_ensemble
+from ml_inference.model.encoder import encoder, ndarray_features
+
+MODELS_DIR = Path(__file__).resolve().parents[3] / "ml_inference" / "models"
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    X = encoder.sample_features(400, seed=3)
+    y = 0.01 * X[:, 0] + X[:, 8] - 0.5 * X[:, 9] + np.random.default_rng(3).normal(0, 0.1, len(X))
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+    RandomForestRegressor(n_estimators=10, max_depth=5, random_state=0),
+    DecisionTreeRegressor(max_depth=4, random_state=0),
+])
+def test_parity_with_sklearn(model, training_data):
+    X, y = training_data
+    model.fit(X, y)
+    compiled = compile_ensemble(model)
+
+    probe = encoder.sample_features(1000, seed=4)
+    np.testing.assert_allclose(compiled.predict(probe), model.predict(probe), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(compiled.predict(probe[:1]), model.predict(probe[:1]), rtol=0, atol=1e-9)
+
+
+def test_save_and_load_roundtrip(tmp_path, training_data):
+    X, y = training_data
+    compiled = compile_ensemble(GradientBoostingRegressor(n_estimators=5, random_state=0).fit(X, y))
+    compiled.save(tmp_path / "model.trees.npz")
+
+    loaded = CompiledEnsemble.load(tmp_path / "model.trees.npz")
+
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+
+
+def test_unsupported_model_raises(training_data):
+    X, y = training_data
+    with pytest.raises(ValueError):
+        compile_ensemble(LinearRegression().fit(X, y))
+
+
+def test_premium_artifact_parity():
+    try:
+        model = joblib.load(MODELS_DIR / "premium.pkl")
+    except Exception as e:
+        pytest.skip(f"premium.pkl cannot be unpickled with this sklearn: {e}")
+    compiled = compile_ensemble(model)
+
+    probe = encoder.sample_features(2000, seed=5)
+    with ndarray_features():
+        expected = model.predict(probe)
+    np.testing.assert_allclose(compiled.predict(probe), expected, rtol=0, atol=1e-9)
@@ -0,0 +1,113 @@
+import itertools
+import random
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from ml_inference.model import predict
+from ml_inference.model.encoder import FEATURE_COLUMNS, encoder
+from shared.schemas.inference import InferenceInput
+
+SCALER_PATH = Path(__file__).resolve().parents[3] / "ml_inference" / "models" / "scaler.joblib"
+
+
+def legacy_preprocess_input(user_input: InferenceInput, scaler):
+    # Исходная реализация preprocess_input на pandas — эталон для сверки
+    employment_map = {"Unemployed": 0, "Employed": 1}
+    marital_map = {
+        'Single': 0, 'Divorced': 0, 'Widowed': 0, 'Separated': 0,
+        'Married': 1, 'In a relationship': 1
+    }
+
+    df = pd.DataFrame([{
+        "Age": user_input.Age,
+        "Employment Status": employment_map[user_input.Employment_Status],
+        "Income": user_input.Income,
+        "Education Level_Bachelor's Degree": user_input.Education_Level == "Bachelor's Degree",
+        "Education Level_High School": user_input.Education_Level == "High School",
+        "Education Level_Master's Degree": user_input.Education_Level == "Master's Degree",
+        "Education Level_PhD": user_input.Education_Level == "PhD",
+        "Social_Support": marital_map[user_input.Marital_Status] + user_input.Number_of_Children,
+        "family_personal_health": (
+            int(user_input.Family_History_of_Depression == "Yes") +
+            int(user_input.History_of_Mental_Illness == "Yes") +
+            int(user_input.Chronic_Medical_Conditions == "Yes")
+        ),
+        "personal_burden": (
+            int(user_input.Smoking_Status == "Current") +
+            int(user_input.Alcohol_Consumption == "High") -
+            int(user_input.Physical_Activity_Level == "Active") -
+            int(user_input.Dietary_Habits == "Healthy") -
+            int(user_input.Sleep_Patterns == "Good")
+        )
+    }])
+
+    df[["Age", "Income"]] = scaler.transform(df[["Age", "Income"]])
+    return df
+
+
+def random_inputs(n: int, seed: int = 0) -> list[InferenceInput]:
+    rng = random.Random(seed)
+    return [
+        InferenceInput(
+            Age=rng.randint(18, 90),
+            Income=rng.randint(0, 200000),
+            Number_of_Children=rng.randint(0, 6),
+            **{name: rng.choice(values) for name, values in encoder.categories.items()},
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.fixture(scope="module")
+def scaler():
+    return joblib.load(SCALER_PATH)
+
+
+def test_every_category_value_matches_legacy(scaler):
+    base = random_inputs(1)[0]
+    inputs = [
+        base.model_copy(update={name: value})
+        for name, values in encoder.categories.items()
+        for value in values
+    ]
+
+    expected = np.vstack([legacy_preprocess_input(x, scaler).to_numpy(dtype=np.float64) for x in inputs])
+    actual = predict.preprocess_batch(inputs, scaler)
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+
+def test_random_batch_matches_legacy(scaler):
+    inputs = random_inputs(300)
+
+    expected = pd.concat([legacy_preprocess_input(x, scaler) for x in inputs])
+    actual = predict.preprocess_input(inputs[0], scaler)
+
+    assert list(expected.columns) == FEATURE_COLUMNS == list(actual.columns)
+    np.testing.assert_allclose(
+        predict.preprocess_batch(inputs, scaler), expected.to_numpy(dtype=np.float64), rtol=1e-6
+    )
+
+
+def test_column_arrays_match_objects():
+    inputs = random_inputs(50, seed=1)
+    columns = {name: [getattr(x, name) for x in inputs] for name in InferenceInput.model_fields}
+
+    np.testing.assert_array_equal(encoder.encode(columns), encoder.encode(inputs))
+
+
+def test_unknown_category_in_columns_raises():
+    columns = {name: [getattr(x, name) for x in random_inputs(2)] for name in InferenceInput.model_fields}
+    columns["Smoking_Status"] = ["Never", "Sometimes"]
+
+    with pytest.raises(ValueError, match="Smoking_Status"):
+        encoder.encode(columns)
+
+
+def test_codes_cover_all_literal_values():
+    for name, values in encoder.categories.items():
+        assert sorted(encoder.codes[name].values()) == list(range(len(values)))
+    assert len(list(itertools.chain(*encoder.categories.values()))) == sum(t.shape[0] for t in encoder.tables)
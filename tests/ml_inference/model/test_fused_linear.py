@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+from ml_inference.model import registry as registry_module
+from ml_inference.model.encoder import SCALED_COLUMNS, encoder
+from ml_inference.model.fused_linear import fuse_linear
+from ml_inference.model.registry import ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    X = encoder.sample_features(300, seed=7).astype(np.float64)
+    scaler = StandardScaler().fit(X[:, SCALED_COLUMNS])
+    Xs = X.copy()
+    Xs[:, SCALED_COLUMNS] = scaler.transform(Xs[:, SCALED_COLUMNS])
+    y = Xs @ np.linspace(-1, 1, X.shape[1]) + 2.0
+    return X, Xs, y, scaler
+
+
+@pytest.mark.parametrize("model_cls", [LinearRegression, Ridge])
+def test_fused_matches_scaler_plus_predict(model_cls, fitted):
+    X, Xs, y, scaler = fitted
+    model = model_cls().fit(Xs, y)
+
+    fused = fuse_linear(model, scaler)
+
+    np.testing.assert_allclose(fused.predict(X.astype(np.float32)), model.predict(Xs), rtol=1e-9, atol=1e-9)
+
+
+def test_non_linear_model_is_rejected(fitted):
+    X, Xs, y, scaler = fitted
+    with pytest.raises(ValueError):
+        fuse_linear(DecisionTreeRegressor().fit(Xs, y), scaler)
+
+
+def test_unsupported_scaler_falls_back_to_original_pipeline(tmp_path, fitted):
+    X, _, y, _ = fitted
+    scaler = MinMaxScaler().fit(X[:, SCALED_COLUMNS])
+    Xs = X.copy()
+    Xs[:, SCALED_COLUMNS] = scaler.transform(Xs[:, SCALED_COLUMNS])
+    model = LinearRegression().fit(Xs, y)
+    with pytest.raises(ValueError):
+        fuse_linear(model, scaler)
+
+    joblib.dump(scaler, tmp_path / "scaler.joblib")
+    joblib.dump(model, tmp_path / "simple.pkl")
+    entry = ModelRegistry(str(tmp_path), reload_interval_s=0).get("simple")
+
+    assert entry.kind == "sklearn"
+    np.testing.assert_allclose(entry.predict(X[:10].astype(np.float32)), model.predict(Xs[:10]), rtol=1e-6)
+
+
+def test_registry_uses_fused_path_and_verify_mode(tmp_path, fitted, monkeypatch):
+    X, Xs, y, scaler = fitted
+    joblib.dump(scaler, tmp_path / "scaler.joblib")
+    joblib.dump(LinearRegression().fit(Xs, y), tmp_path / "simple.pkl")
+
+    entry = ModelRegistry(str(tmp_path), reload_interval_s=0).get("simple")
+    assert entry.kind == "fused_linear"
+
+    features = X[:10].astype(np.float32)
+    monkeypatch.setattr(registry_module.settings, "fast_path_verify", True)
+    with patch.object(registry_module, "logger") as logger_mock:
+        np.testing.assert_array_equal(entry.predict(features), entry.predict_original(features))
+    logger_mock.warning.assert_not_called()
+
+    broken = registry_module.LoadedModel(
+        name="simple", version="v", model=entry.model, scaler=scaler, path=entry.path,
+        kind="fused_linear", scorer=lambda f: entry.scorer(f) + 1.0,
+    )
+    with patch.object(registry_module, "logger") as logger_mock:
+        np.testing.assert_array_equal(broken.predict(features), entry.predict_original(features))
+    logger_mock.warning.assert_called_once()
@@ -1,8 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from pathlib import Path
 from ml_inference.model import predict
+from ml_inference.model.registry import LoadedModel
 from shared.schemas.inference import InferenceInput
 import pandas as pd
+import numpy as np
 
 def make_user_input():
     return InferenceInput(
@@ -35,20 +38,23 @@ def test_preprocess_input(monkeypatch):
     assert "Age" in df.columns
     assert df.shape[0] == 1
 
-@patch("ml_inference.model.predict.load_model_and_scaler")
-def test_run_inference_task(mock_load_model_and_scaler):
+@patch("ml_inference.model.predict.load_model")
+def test_run_inference_task(mock_load_model):
     dummy_model = MagicMock()
     dummy_model.predict.return_value = [4.5]
     dummy_scaler = MagicMock()
     dummy_scaler.transform.side_effect = lambda x: x
 
-    mock_load_model_and_scaler.return_value = (dummy_model, dummy_scaler)
+    mock_load_model.return_value = LoadedModel(
+        name="simple", version="v1", model=dummy_model, scaler=dummy_scaler, path=Path("simple.pkl")
+    )
 
     user_input = make_user_input()
     result = predict.run_inference_task("simple", user_input)
 
     assert "score" in result
     assert "explanation" in result
+    assert result["model_version"] == "v1"
     dummy_model.predict.assert_called_once()
     dummy_scaler.transform.assert_called_once()
 
@@ -56,3 +62,47 @@ def test_interpret_score():
     assert predict.interpret_score(5) == "⚠️ High risk of depression — please consult a specialist."
     assert predict.interpret_score(3) == "🟠 Moderate risk — consider self-assessment or preventive steps."
     assert predict.interpret_score(2) == "🟢 Low risk — no immediate concern detected."
+
+def test_preprocess_batch_matches_single_path():
+    class DummyScaler:
+        def transform(self, X):
+            return X * 2
+
+    user_input = make_user_input()
+    other = user_input.model_copy(update={"Education_Level": "PhD", "Marital_Status": "Married", "Smoking_Status": "Current"})
+
+    X = predict.preprocess_batch([user_input, other], DummyScaler())
+    single = predict.preprocess_input(user_input, DummyScaler())
+
+    assert X.shape == (2, len(predict.FEATURE_COLUMNS))
+    assert X.dtype == np.float32
+    assert X.flags["C_CONTIGUOUS"]
+    assert list(single.columns) == predict.FEATURE_COLUMNS
+    assert (single.to_numpy() == X[:1]).all()
+    assert X[0, 0] == 60 and X[0, 2] == 100000
+    assert X[1, 6] == 1 and X[1, 7] == 2 and X[1, 9] == -2
+
+@patch("ml_inference.model.predict.load_model")
+def test_run_multi_inference_encodes_once(mock_load_model):
+    scaler = MagicMock()
+    scaler.transform.side_effect = lambda x: x
+    models = {}
+    for name, score in (("simple", 1.5), ("premium", 6.0)):
+        model = MagicMock()
+        model.predict.return_value = [score]
+        models[name] = LoadedModel(name=name, version=f"{name}-v1", model=model, scaler=scaler, path=Path(f"{name}.pkl"))
+    mock_load_model.side_effect = models.get
+
+    with patch.object(predict.encoder, "encode_codes", wraps=predict.encoder.encode_codes) as encode_mock:
+        result = predict.run_multi_inference(["simple", "premium"], make_user_input())
+
+    encode_mock.assert_called_once()
+    assert set(result["results"]) == {"simple", "premium"}
+    assert result["results"]["premium"]["score"] == 6.0
+    assert result["results"]["premium"]["model_version"] == "premium-v1"
+    assert result["results"]["simple"]["explanation"] == predict.interpret_score(1.5)
+    assert result["results"]["simple"]["predict_ms"] >= 0
+    # обе модели получили одну и ту же матрицу признаков
+    first = models["simple"].model.predict.call_args.args[0]
+    second = models["premium"].model.predict.call_args.args[0]
+    assert (first == second).all()
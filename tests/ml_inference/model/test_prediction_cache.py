@@ -0,0 +1,87 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from ml_inference.model import predict
+from ml_inference.model import prediction_cache as cache_module
+from ml_inference.model.encoder import encoder
+from ml_inference.model.prediction_cache import PredictionCache, canonical_keys, prediction_cache
+from ml_inference.model.registry import LoadedModel
+from shared.schemas.inference import InferenceInput
+
+
+def make_input(**overrides):
+    data = dict(
+        Age=30, Income=50000, Number_of_Children=1,
+        **{name: values[0] for name, values in encoder.categories.items()},
+    )
+    data.update(overrides)
+    return InferenceInput(**data)
+
+
+def test_canonical_keys_depend_only_on_content():
+    codes, numeric = encoder.encode_codes([make_input(), make_input(), make_input(Age=31)])
+    keys = canonical_keys(codes, numeric)
+
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+
+
+def test_canonical_keys_keep_large_numbers_apart():
+    # схема не ограничивает Income: за пределами int32 (и точности float32) ключи не должны совпадать
+    inputs = [make_input(Income=3_000_000_000), make_input(Income=9_000_000_000), make_input(Income=2**40 + 1)]
+    codes, numeric = encoder.encode_codes(inputs + [make_input(Income=2**40)])
+
+    assert len(set(canonical_keys(codes, numeric))) == 4
+
+
+def test_lru_is_bounded_and_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_entries=2, ttl_s=10)
+
+    cache.set_many({"a": 1.0, "b": 2.0})
+    cache.get_many(["a"])
+    cache.set_many({"c": 3.0})
+
+    assert cache.get_many(["a", "b", "c"]) == [1.0, None, 3.0]
+    now[0] += 11
+    assert cache.get_many(["a", "c"]) == [None, None]
+    assert cache.stats == {"local_hits": 3, "redis_hits": 0, "misses": 3}
+
+
+def test_redis_tier_backfills_local():
+    cache = PredictionCache(max_entries=10, ttl_s=60)
+    cache._redis = MagicMock()
+    cache._redis.mget.return_value = [b"4.5", None]
+
+    assert cache.get_many(["k1", "k2"]) == [4.5, None]
+    cache._redis.mget.assert_called_once_with(["k1", "k2"])
+    assert cache.get_many(["k1"]) == [4.5]
+    assert cache.stats == {"local_hits": 1, "redis_hits": 1, "misses": 1}
+
+
+def loaded(version, scores):
+    model = MagicMock()
+    model.predict.side_effect = lambda X: np.asarray(scores[:len(X)])
+    return LoadedModel(name="simple", version=version, model=model, scaler=MagicMock(), path=Path("simple.pkl"),
+                       scorer=model.predict)
+
+
+def test_cache_hit_skips_predict_and_version_change_invalidates():
+    first = loaded("v1", [1.0, 2.0])
+    with patch("ml_inference.model.predict.load_model", return_value=first):
+        predict.run_batch_inference("simple", [make_input(), make_input(Age=40)])
+        results = predict.run_batch_inference("simple", [make_input(Age=40), make_input()])
+
+    assert [r["score"] for r in results] == [2.0, 1.0]
+    assert first.model.predict.call_count == 1
+
+    second = loaded("v2", [7.0])
+    with patch("ml_inference.model.predict.load_model", return_value=second):
+        results = predict.run_batch_inference("simple", [make_input()])
+
+    assert results[0]["score"] == 7.0
+    assert results[0]["model_version"] == "v2"
+    second.model.predict.assert_called_once()
+    assert len(prediction_cache) == 3
@@ -0,0 +1,134 @@
+import os
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pytest
+from ml_inference.model import registry as registry_module
+from ml_inference.model.registry import ModelRegistry
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    joblib.dump({"model": "simple-v1"}, tmp_path / "simple.pkl")
+    joblib.dump({"model": "premium-v1"}, tmp_path / "premium.pkl")
+    joblib.dump({"scaler": "s1"}, tmp_path / "scaler.joblib")
+    return tmp_path
+
+
+def bump(path, obj):
+    joblib.dump(obj, path)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_available_and_shared_scaler(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+
+    with patch.object(registry_module.joblib, "load", wraps=joblib.load) as load_mock:
+        simple = registry.get("simple")
+        premium = registry.get("premium")
+        registry.get("simple")
+
+    assert registry.available() == ["premium", "simple"]
+    assert load_mock.call_count == 3  # scaler + две модели, без повторов
+    assert simple.scaler is premium.scaler
+    assert simple.model == {"model": "simple-v1"}
+    assert registry.loaded() == {"simple": simple.version, "premium": premium.version}
+
+
+def test_refresh_swaps_changed_model_only(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+    old_simple = registry.get("simple")
+    old_premium = registry.get("premium")
+
+    assert registry.refresh() == []
+
+    bump(model_dir / "simple.pkl", {"model": "simple-v2"})
+    assert registry.refresh() == ["simple"]
+
+    new_simple = registry.get("simple")
+    assert new_simple.version != old_simple.version
+    assert new_simple.model == {"model": "simple-v2"}
+    # снимок, взятый до перезагрузки, не меняется
+    assert old_simple.model == {"model": "simple-v1"}
+    assert registry.get("premium") is old_premium
+
+
+def test_scaler_change_bumps_every_version(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+    versions = {name: registry.get(name).version for name in ("simple", "premium")}
+
+    bump(model_dir / "scaler.joblib", {"scaler": "s2"})
+
+    assert sorted(registry.refresh()) == ["premium", "simple"]
+    for name, version in versions.items():
+        assert registry.get(name).version != version
+        assert registry.get(name).scaler == {"scaler": "s2"}
+
+
+def test_load_all_with_empty_list_loads_nothing(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+
+    assert registry.load_all([]) == []
+    assert registry.loaded() == {}
+    assert sorted(entry.name for entry in registry.load_all()) == ["premium", "simple"]
+
+
+def test_missing_model_raises(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+
+    with pytest.raises(FileNotFoundError):
+        registry.get("advanced")
+
+
+def test_tree_ensemble_gets_compiled_fast_path(tmp_path):
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.preprocessing import StandardScaler
+    from ml_inference.model.encoder import encoder
+
+    X = encoder.sample_features(200, seed=1)
+    joblib.dump(StandardScaler().fit(X[:, [0, 2]]), tmp_path / "scaler.joblib")
+    joblib.dump(GradientBoostingRegressor(n_estimators=10, random_state=0).fit(X, X[:, 8]), tmp_path / "premium.pkl")
+
+    entry = ModelRegistry(str(tmp_path), reload_interval_s=0).get("premium")
+
+    assert entry.kind == "compiled_trees"
+    np.testing.assert_allclose(entry.predict(X[:5]), entry.predict_original(X[:5]), atol=1e-9)
+
+
+def test_get_without_watch_does_not_start_watcher(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=30)
+
+    with patch("ml_inference.model.registry.threading.Thread") as thread_mock:
+        registry.get("simple", watch=False)
+        thread_mock.assert_not_called()
+
+        registry.start_watcher()
+        registry.start_watcher()
+
+    thread_mock.assert_called_once()
+    assert thread_mock.call_args.kwargs["name"] == "model-registry-watcher"
+
+
+def test_failed_refresh_keeps_old_scaler_and_retries(model_dir):
+    registry = ModelRegistry(str(model_dir), reload_interval_s=0)
+    versions = {name: registry.get(name).version for name in ("simple", "premium")}
+    build = registry._build
+
+    def build_fails_for_premium(name, *args):
+        if name == "premium":
+            raise RuntimeError("boom")
+        return build(name, *args)
+
+    bump(model_dir / "scaler.joblib", {"scaler": "s2"})
+    with patch.object(registry, "_build", side_effect=build_fails_for_premium):
+        with pytest.raises(RuntimeError):
+            registry.refresh()
+
+    # ни одна модель не получила новый скейлер отдельно от остальных
+    assert {name: registry.get(name).version for name in versions} == versions
+    assert registry.get("simple").scaler == {"scaler": "s1"}
+
+    assert sorted(registry.refresh()) == ["premium", "simple"]
+    assert registry.get("premium").scaler == {"scaler": "s2"}
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import REGISTRY
+from ml_inference.model import predict
+from ml_inference.model.registry import LoadedModel
+from shared.schemas.inference import InferenceInput
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_user_input():
+    return InferenceInput(
+        Age=30, Income=50000, Employment_Status="Employed", Education_Level="PhD", Marital_Status="Single",
+        Number_of_Children=1, Family_History_of_Depression="No", History_of_Mental_Illness="No",
+        Chronic_Medical_Conditions="No", Smoking_Status="Never", Alcohol_Consumption="Moderate",
+        Physical_Activity_Level="Active", Dietary_Habits="Healthy", Sleep_Patterns="Good",
+    )
+
+
+@patch("ml_inference.model.predict.load_model")
+def test_batch_inference_records_latency_and_cache(mock_load_model):
+    model = MagicMock()
+    model.predict.return_value = [2.0]
+    scaler = MagicMock()
+    scaler.transform.side_effect = lambda x: x
+    mock_load_model.return_value = LoadedModel(
+        name="metrics-test", version="v7", model=model, scaler=scaler, path=Path("metrics-test.pkl")
+    )
+    labels = {"model": "metrics-test", "version": "v7"}
+
+    predict.run_inference_task("metrics-test", make_user_input())
+    predict.run_inference_task("metrics-test", make_user_input())
+
+    assert sample("ml_inference_preprocess_seconds_count", **labels) == 2
+    assert sample("ml_inference_predict_seconds_count", **labels) == 1
+    assert sample("ml_prediction_cache_requests_total", model="metrics-test", result="miss") == 1
+    assert sample("ml_prediction_cache_requests_total", model="metrics-test", result="hit") == 1
+
+
+@patch("ml_inference.model.predict.load_model", side_effect=FileNotFoundError("no artifact"))
+def test_failures_are_counted(_):
+    before = sample("ml_inference_failures_total", model="missing", stage="inference")
+    try:
+        predict.run_inference_task("missing", make_user_input())
+    except FileNotFoundError:
+        pass
+    assert sample("ml_inference_failures_total", model="missing", stage="inference") == before + 1
+
+
+def test_prefork_children_are_aggregated(tmp_path):
+    # Отдельный интерпретатор: PROMETHEUS_MULTIPROC_DIR должен быть задан до импорта prometheus_client
+    script = textwrap.dedent("""
+        import os
+        from prometheus_client import CollectorRegistry, multiprocess
+        from ml_inference.monitoring import metrics
+
+        metrics.prepare_multiprocess_dir()
+        children = []
+        for _ in range(3):
+            pid = os.fork()
+            if pid == 0:
+                metrics.failures_total.labels("simple", "task").inc()
+                metrics.task_seconds.labels("simple", "v1").observe(0.01)
+                os._exit(0)
+            children.append(pid)
+        for pid in children:
+            os.waitpid(pid, 0)
+            metrics.mark_process_dead(pid)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        print(registry.get_sample_value("ml_inference_failures_total", {"model": "simple", "stage": "task"}))
+        print(registry.get_sample_value("ml_inference_task_seconds_count", {"model": "simple", "version": "v1"}))
+    """)
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "prom"), "PYTHONPATH": str(ROOT)}
+    out = subprocess.run([sys.executable, "-c", script], env=env, cwd=tmp_path, capture_output=True, text=True, check=True)
+
+    assert out.stdout.split() == ["3.0", "3.0"]
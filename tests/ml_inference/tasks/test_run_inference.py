@@ -1,7 +1,16 @@
+import json
+import time
+from datetime import datetime
+
 import pytest
 from unittest.mock import patch, MagicMock
 from ml_inference.tasks import run_inference
 
+@pytest.fixture(autouse=True)
+def mock_notify():
+    with patch("ml_inference.tasks.run_inference.notify_result") as notify:
+        yield notify
+
 @pytest.fixture
 def user_input_dict():
     return {
@@ -40,7 +49,7 @@ def test_run_inference_task(
     mock_session_local.return_value = mock_db
 
     mock_repo = MagicMock()
-    mock_repo.create.return_value = MagicMock(id=123)
+    mock_repo.upsert_result.return_value = 123
     mock_repo_class.return_value = mock_repo
 
     mock_billing = MagicMock()
@@ -56,12 +65,319 @@ def test_run_inference_task(
     mock_db.close.assert_called_once()
 
     
-    mock_repo.create.assert_called_once()
+    mock_repo.upsert_result.assert_called_once()
+    mock_repo.create.assert_not_called()
     
     
     mock_billing.finalize.assert_called_once_with(user_id=1, task_id=123)
 
+    timings = result.pop("timings")
     assert result == {"score": 0.8, "explanation": "some explanation"}
+    assert timings["enqueued_at"] is None
+    assert timings["started_at"] <= timings["predicted_at"] <= timings["committed_at"]
 
     
     assert mock_logger.info.call_count > 0
+
+
+@patch("ml_inference.tasks.run_inference.run_batched_inference")
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_run_inference_task_batching_mode(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    mock_batched,
+    user_input_dict,
+    monkeypatch
+):
+    monkeypatch.setattr(run_inference.settings, "inference_batching_enabled", True)
+    mock_batched.return_value = {"score": 1.0, "explanation": "batched"}
+    mock_repo_class.return_value.upsert_result.return_value = 7
+
+    result = run_inference.run_inference_task("premium", user_input_dict, user_id=2)
+
+    mock_batched.assert_called_once()
+    assert mock_batched.call_args.args[0] == "premium"
+    mock_sync_task.assert_not_called()
+    result.pop("timings")
+    assert result == {"score": 1.0, "explanation": "batched"}
+
+
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_run_inference_task_records_timings(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    user_input_dict
+):
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    mock_repo = mock_repo_class.return_value
+    mock_repo.upsert_result.return_value = 5
+
+    enqueued_at = time.time() - 0.5
+    result = run_inference.run_inference_task(
+        "simple", user_input_dict, user_id=1, enqueued_at=enqueued_at, task_uuid="uuid-1"
+    )
+
+    timings = result["timings"]
+    assert timings["enqueued_at"] == enqueued_at
+    assert timings["started_at"] - enqueued_at >= 0.5
+    task_uuid, row = mock_repo.upsert_result.call_args.args
+    assert task_uuid == "uuid-1"
+    assert row["status"] == "COMPLETED"
+    assert row["enqueued_at"] == datetime.utcfromtimestamp(enqueued_at)
+    assert row["started_at"] <= row["predicted_at"]
+    assert "timings" not in json.loads(row["output_data"])
+
+
+@patch("ml_inference.tasks.run_inference.run_multi_inference")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_run_multi_inference_task(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_multi,
+    user_input_dict
+):
+    mock_multi.return_value = {"results": {
+        "simple": {"score": 1.0, "explanation": "a", "model_version": "s1", "predict_ms": 0.1},
+        "premium": {"score": 5.0, "explanation": "b", "model_version": "p1", "predict_ms": 0.2},
+    }, "encode_ms": 0.05}
+    mock_repo = mock_repo_class.return_value
+    mock_repo.upsert_result.return_value = 11
+
+    result = run_inference.run_multi_inference_task(["simple", "premium"], user_input_dict, user_id=3)
+
+    assert mock_multi.call_args.args[0] == ["simple", "premium"]
+    mock_repo.upsert_result.assert_called_once()
+    assert mock_repo.upsert_result.call_args.args[1]["model_type"] == "simple+premium"
+    mock_billing_service.return_value.finalize.assert_called_once_with(user_id=3, task_id=11)
+    assert result["results"]["premium"]["score"] == 5.0
+    assert "committed_at" in result["timings"]
+
+
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_redelivered_task_does_not_finalize_twice(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    user_input_dict
+):
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    # строка уже COMPLETED: upsert ничего не обновил
+    mock_repo_class.return_value.upsert_result.return_value = None
+
+    run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="uuid-done")
+
+    mock_billing_service.return_value.finalize.assert_not_called()
+    mock_session_local.return_value.rollback.assert_called_once()
+
+
+@patch("ml_inference.tasks.run_inference.publish_result")
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+def test_stream_mode_publishes_instead_of_writing(
+    mock_session_local,
+    mock_sync_task,
+    mock_publish,
+    user_input_dict,
+    monkeypatch
+):
+    monkeypatch.setattr(run_inference.settings, "persistence_mode", "stream")
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+
+    result = run_inference.run_inference_task("simple", user_input_dict, user_id=4, task_uuid="uuid-4")
+
+    mock_session_local.assert_not_called()
+    task_uuid, user_id, model_type, user_input, published, timings = mock_publish.call_args.args
+    assert (task_uuid, user_id, model_type) == ("uuid-4", 4, "simple")
+    assert published == {"score": 0.8, "explanation": "some explanation"}
+    assert "committed_at" not in result["timings"]
+
+
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_result_is_pushed_to_api(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    mock_notify,
+    user_input_dict
+):
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    mock_repo_class.return_value.upsert_result.return_value = 5
+
+    result = run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="uuid-5")
+
+    mock_notify.assert_called_once_with("uuid-5", result)
+    assert "committed_at" in mock_notify.call_args.args[1]["timings"]
+
+
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.sync_task")
+def test_failure_is_pushed_to_api(mock_sync_task, mock_session_local, mock_notify, user_input_dict):
+    mock_sync_task.side_effect = ValueError("bad model")
+
+    with pytest.raises(ValueError):
+        run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="uuid-6")
+
+    task_uuid, payload = mock_notify.call_args.args
+    assert task_uuid == "uuid-6"
+    assert payload == {"error": "ValueError: bad model"}
+
+
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_run_inference_task_accepts_packed_input(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    user_input_dict
+):
+    from shared.schemas.wire import pack_input
+
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    mock_repo_class.return_value.upsert_result.return_value = 9
+
+    run_inference.run_inference_task("simple", pack_input(user_input_dict), user_id=1)
+
+    assert mock_sync_task.call_args.args[1].model_dump() == user_input_dict
+    row = mock_repo_class.return_value.upsert_result.call_args.args[1]
+    assert json.loads(row["input_data"]) == user_input_dict
+
+
+@patch("ml_inference.tasks.run_inference.invalidate_user_cache")
+@patch("ml_inference.tasks.run_inference.singleflight.leave")
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_leader_completes_followers_in_one_transaction(
+    mock_billing_service,
+    mock_billing_repo,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    mock_leave,
+    mock_invalidate,
+    mock_notify,
+    user_input_dict
+):
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    mock_repo_class.return_value.upsert_result.return_value = 1
+    mock_repo_class.return_value.upsert_results.return_value = [(2, 20), (3, 30)]
+    mock_leave.return_value = [
+        {"task_uuid": "f-2", "user_id": 20, "enqueued_at": 100.0},
+        {"task_uuid": "f-3", "user_id": 30, "enqueued_at": 101.0},
+    ]
+
+    run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="leader", flight="abc")
+
+    mock_leave.assert_called_once_with("abc", "leader")
+    rows = mock_repo_class.return_value.upsert_results.call_args.args[0]
+    assert [(row["task_uuid"], row["user_id"]) for row in rows] == [("f-2", 20), ("f-3", 30)]
+    assert rows[0]["enqueued_at"] == datetime.utcfromtimestamp(100.0)
+    assert json.loads(rows[0]["output_data"]) == {"score": 0.8, "explanation": "some explanation"}
+    mock_billing_repo.return_value.create_many.assert_called_once_with([
+        {"user_id": 20, "task_id": 2, "amount": 0, "type": "finalize"},
+        {"user_id": 30, "task_id": 3, "amount": 0, "type": "finalize"},
+    ])
+    assert {c.args[0] for c in mock_invalidate.call_args_list} == {20, 30}
+    # уведомление лидеру и каждому присоединившемуся — со своим enqueued_at
+    notified = {c.args[0]: c.args[1] for c in mock_notify.call_args_list}
+    assert set(notified) == {"leader", "f-2", "f-3"}
+    assert notified["f-3"]["timings"]["enqueued_at"] == 101.0
+    assert notified["f-3"]["score"] == 0.8
+
+
+@patch("ml_inference.tasks.run_inference.singleflight.leave")
+@patch("ml_inference.tasks.run_inference.publish_result")
+@patch("ml_inference.tasks.run_inference.sync_task")
+def test_leader_publishes_follower_results_in_stream_mode(
+    mock_sync_task,
+    mock_publish,
+    mock_leave,
+    user_input_dict,
+    monkeypatch
+):
+    monkeypatch.setattr(run_inference.settings, "persistence_mode", "stream")
+    mock_sync_task.return_value = {"score": 0.8, "explanation": "some explanation"}
+    mock_leave.return_value = [{"task_uuid": "f-2", "user_id": 20, "enqueued_at": 100.0}]
+
+    run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="leader", flight="abc")
+
+    assert [c.args[:2] for c in mock_publish.call_args_list] == [("leader", 1), ("f-2", 20)]
+    assert mock_publish.call_args.args[5]["enqueued_at"] == 100.0
+
+
+@patch("ml_inference.tasks.run_inference.invalidate_user_cache")
+@patch("ml_inference.tasks.run_inference.singleflight.leave")
+@patch("ml_inference.tasks.run_inference.sync_task")
+@patch("ml_inference.tasks.run_inference.SessionLocal")
+@patch("ml_inference.tasks.run_inference.InferenceRepository")
+@patch("ml_inference.tasks.run_inference.BillingService")
+def test_leader_failure_fails_and_refunds_followers(
+    mock_billing_service,
+    mock_repo_class,
+    mock_session_local,
+    mock_sync_task,
+    mock_leave,
+    mock_invalidate,
+    mock_notify,
+    user_input_dict
+):
+    mock_sync_task.side_effect = ValueError("bad model")
+    mock_leave.return_value = [{"task_uuid": "f-2", "user_id": 20, "enqueued_at": 100.0}]
+    mock_repo_class.return_value.upsert_results.return_value = [(1, 1), (2, 20)]
+
+    with pytest.raises(ValueError):
+        run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="leader", flight="abc")
+
+    mock_leave.assert_called_once_with("abc", "leader")
+    # строки лидера и присоединившихся -> FAILED, заморозка возвращается той же транзакцией
+    rows = mock_repo_class.return_value.upsert_results.call_args.args[0]
+    assert [(row["task_uuid"], row["status"]) for row in rows] == [("leader", "FAILED"), ("f-2", "FAILED")]
+    assert json.loads(rows[0]["output_data"]) == {"error": "ValueError: bad model"}
+    mock_billing_service.return_value.refund_many.assert_called_once_with([(1, 1), (2, 20)], "simple")
+    mock_session_local.return_value.commit.assert_called_once()
+    assert {c.args[0] for c in mock_invalidate.call_args_list} == {1, 20}
+    assert {c.args[0]: c.args[1] for c in mock_notify.call_args_list} == {
+        "leader": {"error": "ValueError: bad model"},
+        "f-2": {"error": "ValueError: bad model"},
+    }
+
+
+@patch("ml_inference.tasks.run_inference.publish_result")
+@patch("ml_inference.tasks.run_inference.sync_task")
+def test_failure_is_published_in_stream_mode(mock_sync_task, mock_publish, user_input_dict, monkeypatch):
+    monkeypatch.setattr(run_inference.settings, "persistence_mode", "stream")
+    mock_sync_task.side_effect = ValueError("bad model")
+
+    with pytest.raises(ValueError):
+        run_inference.run_inference_task("simple", user_input_dict, user_id=1, task_uuid="uuid-7")
+
+    args, kwargs = mock_publish.call_args
+    assert args[:2] == ("uuid-7", 1)
+    assert args[4] == {"error": "ValueError: bad model"}
+    assert kwargs == {"status": "FAILED"}
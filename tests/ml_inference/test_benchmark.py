@@ -0,0 +1,40 @@
+import json
+
+from ml_inference import benchmark
+from shared.schemas.inference import InferenceInput
+
+
+def suite(**stages):
+    return {"meta": {}, "results": {"premium": {"32": stages}}}
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = suite(encode=100e-6, model_predict=200e-6, interpret_score=1e-6)
+    current = suite(encode=120e-6, model_predict=300e-6, interpret_score=3e-6)
+
+    regressions = benchmark.compare(baseline, current, threshold=0.25)
+
+    # encode +20% в пределах порога, interpret_score +200%, но разница ниже шумового порога
+    assert len(regressions) == 1
+    assert regressions[0].startswith("premium batch=32 model_predict")
+
+
+def test_compare_ignores_stages_missing_from_baseline():
+    baseline = {"meta": {}, "results": {"simple": {"1": {"encode": 1e-3}}}}
+    current = suite(encode=1.0)
+
+    assert benchmark.compare(baseline, current, threshold=0.1) == []
+
+
+def test_main_fails_on_regression(tmp_path, monkeypatch):
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(suite(encode=1e-3)))
+    monkeypatch.setattr(benchmark, "run_suite", lambda models, sizes, min_time_s: suite(encode=2e-3))
+
+    assert benchmark.main(["--models", "premium", "--baseline", str(baseline_path)]) == 1
+    assert benchmark.main(["--models", "premium", "--baseline", str(baseline_path), "--threshold", "1.5"]) == 0
+
+
+def test_sample_records_are_valid():
+    for record in benchmark.sample_records(50):
+        InferenceInput.model_validate(record)
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from ml_inference import bulk
+
+
+class FakeModel:
+    version = "v-test"
+
+    def predict(self, features):
+        # скор = возраст, чтобы по выходу было видно, какая строка во что превратилась
+        return features[:, 0].astype(np.float64)
+
+
+@pytest.fixture(autouse=True)
+def fake_model():
+    with patch("ml_inference.model.load_model.load_model", return_value=FakeModel()):
+        yield
+
+
+def make_record(age, **extra):
+    record = {
+        "Age": age, "Income": 50000, "Employment_Status": "Employed", "Education_Level": "PhD",
+        "Marital_Status": "Single", "Number_of_Children": 1, "Family_History_of_Depression": "No",
+        "History_of_Mental_Illness": "No", "Chronic_Medical_Conditions": "No", "Smoking_Status": "Never",
+        "Alcohol_Consumption": "None", "Physical_Activity_Level": "Active", "Dietary_Habits": "Healthy",
+        "Sleep_Patterns": "Good",
+    }
+    record.update(extra)
+    return record
+
+
+def jsonl_source(n):
+    lines = [json.dumps(make_record(20 + i, id=f"q{i}")) for i in range(n)]
+    lines.insert(3, "{broken")
+    lines.insert(5, json.dumps(make_record(30, Smoking_Status="Sometimes")))
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def test_jsonl_in_order_with_invalid_rows():
+    sink, errors = io.StringIO(), io.StringIO()
+
+    stats = bulk.run_bulk("simple", jsonl_source(10), sink, errors_sink=errors, chunk_size=4, id_field="id")
+
+    results = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert [r["score"] for r in results] == [float(20 + i) for i in range(10)]
+    assert results[0]["id"] == "q0" and results[0]["model_version"] == "v-test"
+    assert [r["row"] for r in results] == [1, 2, 3, 5, 7, 8, 9, 10, 11, 12]
+
+    failed = [json.loads(line) for line in errors.getvalue().splitlines()]
+    assert [e["row"] for e in failed] == [4, 6]
+    assert "invalid JSON" in failed[0]["error"]
+    assert "Smoking_Status" in failed[1]["error"]
+    assert stats["rows"] == 12 and stats["scored"] == 10 and stats["invalid"] == 2
+
+
+def test_csv_input_and_output():
+    source = io.StringIO()
+    writer = csv.DictWriter(source, fieldnames=list(make_record(0)))
+    writer.writeheader()
+    for age in (40, 50):
+        writer.writerow(make_record(age))
+    source.seek(0)
+    sink = io.StringIO()
+
+    bulk.run_bulk("simple", source, sink, input_format="csv", output_format="csv")
+
+    rows = list(csv.DictReader(io.StringIO(sink.getvalue())))
+    assert list(rows[0]) == bulk.OUTPUT_FIELDS
+    assert [float(r["score"]) for r in rows] == [40.0, 50.0]
+
+
+def test_process_pool_matches_in_process():
+    in_process, pooled = io.StringIO(), io.StringIO()
+
+    bulk.run_bulk("simple", jsonl_source(25), in_process, chunk_size=3)
+    stats = bulk.run_bulk("simple", jsonl_source(25), pooled, chunk_size=3, workers=2)
+
+    assert pooled.getvalue() == in_process.getvalue()
+    assert stats["scored"] == 25
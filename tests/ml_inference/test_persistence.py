@@ -0,0 +1,224 @@
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from ml_inference import persistence
+from ml_inference.persistence import PersistenceConsumer, _entry_age_s, _to_row
+
+
+def _entry(entry_id: bytes, task_uuid: str, user_id: int = 1, score: float = 2.0, **fields):
+    record = {
+        "task_uuid": task_uuid,
+        "user_id": user_id,
+        "model_type": "simple",
+        "input_data": "{}",
+        "output_data": json.dumps({"score": score}),
+        "finished_at": 1_700_000_000.0,
+        "timings": {"enqueued_at": 1_699_999_999.0, "started_at": 1_699_999_999.5, "predicted_at": None},
+        **fields,
+    }
+    return entry_id, {b"data": json.dumps(record).encode()}
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def db():
+    return MagicMock()
+
+
+@pytest.fixture
+def repos():
+    with patch("ml_service.app.repositories.inference_repo.InferenceRepository") as inference_repo, \
+         patch("ml_service.app.repositories.billing_repo.BillingRepository") as billing_repo, \
+         patch("ml_service.app.services.cache_service.invalidate_user_cache") as invalidate:
+        yield inference_repo.return_value, billing_repo.return_value, invalidate
+
+
+def _consumer(client, db):
+    return PersistenceConsumer(client, lambda: db, stream="results", group="persistence", consumer="c1")
+
+
+@patch("ml_inference.persistence.get_client")
+def test_publish_result_adds_entry_to_stream(mock_get_client):
+    mock_get_client.return_value.xadd.return_value = b"1-0"
+
+    entry_id = persistence.publish_result(
+        "uuid-1", 7, "simple", {"Age": 30}, {"score": 1.0}, {"enqueued_at": 1.0, "started_at": 2.0, "predicted_at": 3.0}
+    )
+
+    assert entry_id == b"1-0"
+    stream, fields = mock_get_client.return_value.xadd.call_args.args
+    record = json.loads(fields["data"])
+    assert record["task_uuid"] == "uuid-1"
+    assert record["user_id"] == 7
+    assert json.loads(record["output_data"]) == {"score": 1.0}
+    assert record["timings"] == {"enqueued_at": 1.0, "started_at": 2.0, "predicted_at": 3.0}
+
+
+def test_process_writes_batch_in_one_transaction_before_ack(client, db, repos):
+    inference_repo, billing_repo, invalidate = repos
+    inference_repo.upsert_results.return_value = [(10, 1), (11, 2)]
+    order = MagicMock()
+    order.attach_mock(db.commit, "commit")
+    order.attach_mock(client.xack, "xack")
+
+    completed = _consumer(client, db).process([_entry(b"1-0", "a", 1), _entry(b"1-1", "b", 2)])
+
+    assert completed == 2
+    inference_repo.upsert_results.assert_called_once()
+    rows = inference_repo.upsert_results.call_args.args[0]
+    assert [row["task_uuid"] for row in rows] == ["a", "b"]
+    assert all(row["status"] == "COMPLETED" for row in rows)
+    billing_repo.create_many.assert_called_once_with([
+        {"user_id": 1, "task_id": 10, "amount": 0, "type": "finalize"},
+        {"user_id": 2, "task_id": 11, "amount": 0, "type": "finalize"},
+    ])
+    assert order.mock_calls == [call.commit(), call.xack("results", "persistence", b"1-0", b"1-1")]
+    client.xdel.assert_called_once_with("results", b"1-0", b"1-1")
+    assert {c.args[0] for c in invalidate.call_args_list} == {1, 2}
+    db.close.assert_called_once()
+
+
+def test_process_keeps_last_entry_per_task(client, db, repos):
+    inference_repo, _, _ = repos
+    inference_repo.upsert_results.return_value = [(10, 1)]
+
+    _consumer(client, db).process([_entry(b"1-0", "a", score=1.0), _entry(b"1-1", "a", score=3.0)])
+
+    rows = inference_repo.upsert_results.call_args.args[0]
+    assert len(rows) == 1
+    assert json.loads(rows[0]["output_data"]) == {"score": 3.0}
+    client.xack.assert_called_once_with("results", "persistence", b"1-0", b"1-1")
+
+
+def test_process_already_completed_tasks_are_not_finalized_again(client, db, repos):
+    inference_repo, billing_repo, invalidate = repos
+    inference_repo.upsert_results.return_value = []
+
+    assert _consumer(client, db).process([_entry(b"1-0", "a")]) == 0
+
+    billing_repo.create_many.assert_called_once_with([])
+    db.commit.assert_called_once()
+    client.xack.assert_called_once()
+    invalidate.assert_not_called()
+
+
+def test_process_refunds_failed_tasks_in_same_transaction(client, db, repos):
+    inference_repo, billing_repo, invalidate = repos
+    inference_repo.upsert_results.side_effect = [[(10, 1)], [(11, 2)]]
+    failed = _entry(b"1-1", "b", 2, status="FAILED", model_type="premium", output_data='{"error": "boom"}')
+
+    with patch("ml_service.app.services.billing_service.BillingService.refund_many") as refund_mock:
+        completed = _consumer(client, db).process([_entry(b"1-0", "a", 1), failed])
+
+    assert completed == 1
+    completed_rows, failed_rows = [c.args[0] for c in inference_repo.upsert_results.call_args_list]
+    assert [row["task_uuid"] for row in completed_rows] == ["a"]
+    assert [(row["task_uuid"], row["status"]) for row in failed_rows] == [("b", "FAILED")]
+    billing_repo.create_many.assert_called_once_with([{"user_id": 1, "task_id": 10, "amount": 0, "type": "finalize"}])
+    refund_mock.assert_called_once_with([(11, 2)], "premium")
+    db.commit.assert_called_once()
+    assert {c.args[0] for c in invalidate.call_args_list} == {1, 2}
+
+
+def test_process_does_not_ack_when_database_is_unavailable(client, db, repos):
+    inference_repo, _, _ = repos
+    inference_repo.upsert_results.return_value = [(10, 1)]
+    db.commit.side_effect = OperationalError("COMMIT", {}, Exception("db down"))
+
+    with pytest.raises(OperationalError):
+        _consumer(client, db).process([_entry(b"1-0", "a"), _entry(b"1-1", "b")])
+
+    db.rollback.assert_called_once()
+    client.xack.assert_not_called()
+    client.xdel.assert_not_called()
+
+
+def _fail_task(task_uuid):
+    def upsert(rows):
+        if any(row["task_uuid"] == task_uuid for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("fk violation"))
+        return [(10 + i, row["user_id"]) for i, row in enumerate(rows)]
+    return upsert
+
+
+def test_process_retries_failed_batch_row_by_row(client, db, repos):
+    inference_repo, _, _ = repos
+    inference_repo.upsert_results.side_effect = _fail_task("b")
+    client.xpending_range.return_value = [{"message_id": b"1-1", "times_delivered": 1}]
+
+    completed = _consumer(client, db).process([_entry(b"1-0", "a", 1), _entry(b"1-1", "b", 2), _entry(b"1-2", "c", 3)])
+
+    assert completed == 2
+    assert db.commit.call_count == 2
+    assert db.rollback.call_count == 2
+    # плохая запись остаётся в потоке до max_deliveries
+    client.xack.assert_called_once_with("results", "persistence", b"1-0", b"1-2")
+    client.xdel.assert_called_once_with("results", b"1-0", b"1-2")
+    client.xadd.assert_not_called()
+
+
+def test_process_moves_poison_entry_to_dead_letter(client, db, repos):
+    inference_repo, _, _ = repos
+    inference_repo.upsert_results.side_effect = _fail_task("b")
+    client.xpending_range.return_value = [{"message_id": b"1-1", "times_delivered": 5}]
+    consumer = PersistenceConsumer(
+        client, lambda: db, stream="results", group="persistence", consumer="c1",
+        max_deliveries=5, dead_letter_stream="results:dead",
+    )
+
+    assert consumer.process([_entry(b"1-0", "a", 1), _entry(b"1-1", "b", 2)]) == 1
+
+    client.xpending_range.assert_called_once_with("results", "persistence", min=b"1-1", max=b"1-1", count=1)
+    stream, fields = client.xadd.call_args.args
+    assert stream == "results:dead"
+    assert json.loads(fields["data"])["task_uuid"] == "b"
+    assert fields["error"].startswith("IntegrityError")
+    client.xack.assert_called_once_with("results", "persistence", b"1-0", b"1-1")
+
+
+def test_process_acks_malformed_entries_without_db(client, db, repos):
+    inference_repo, _, _ = repos
+    session_factory = MagicMock()
+    consumer = PersistenceConsumer(client, session_factory, stream="results", group="persistence", consumer="c1")
+
+    assert consumer.process([(b"1-0", {b"data": b"not json"})]) == 0
+
+    session_factory.assert_not_called()
+    inference_repo.upsert_results.assert_not_called()
+    client.xack.assert_called_once_with("results", "persistence", b"1-0")
+
+
+def test_read_batch_prefers_reclaimed_entries(client):
+    stale = [_entry(b"1-0", "a")]
+    client.xautoclaim.return_value = [b"0-0", stale, []]
+
+    assert _consumer(client, MagicMock()).read_batch() == stale
+    client.xreadgroup.assert_not_called()
+
+
+def test_read_batch_reads_new_entries(client):
+    fresh = [_entry(b"2-0", "b")]
+    client.xautoclaim.return_value = [b"0-0", [], []]
+    client.xreadgroup.return_value = [[b"results", fresh]]
+
+    assert _consumer(client, MagicMock()).read_batch() == fresh
+    assert client.xreadgroup.call_args.args[2] == {"results": ">"}
+
+
+def test_entry_age_and_row_conversion():
+    assert _entry_age_s(b"1700000000000-3", 1_700_000_002.5) == pytest.approx(2.5)
+    assert _entry_age_s("1700000005000-0", 1_700_000_000.0) == 0.0
+
+    _, fields = _entry(b"1-0", "a")
+    row = _to_row(json.loads(fields[b"data"]), committed_at="now")
+    assert row["started_at"] == datetime.utcfromtimestamp(1_699_999_999.5)
+    assert row["predicted_at"] is None
+    assert row["committed_at"] == "now"
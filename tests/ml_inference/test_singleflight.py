@@ -0,0 +1,102 @@
+import json
+from unittest.mock import patch
+
+import pytest
+import redis
+
+from ml_inference import singleflight
+
+
+@pytest.fixture
+def client():
+    with patch("ml_inference.singleflight.get_client") as get_client:
+        yield get_client.return_value
+
+
+def test_flight_key_is_canonical():
+    a = singleflight.flight_key("simple", {"Age": 30, "Income": 1})
+    b = singleflight.flight_key("simple", {"Income": 1, "Age": 30})
+
+    assert a == b
+    assert a != singleflight.flight_key("premium", {"Age": 30, "Income": 1})
+    assert singleflight.flight_key("simple", "AQID") != singleflight.flight_key("simple", "AQIE")
+
+
+def test_join_as_leader(client):
+    client.eval.return_value = None
+
+    assert singleflight.join("abc", "uuid-1", 7, 1.5) is None
+
+    script, numkeys, key, owner_key, task_uuid, member, lease_ms, prefix, ttl = client.eval.call_args.args
+    assert (numkeys, key, owner_key, task_uuid) == (2, "inference:flight:abc", "inference:flight:owner:abc", "uuid-1")
+    assert json.loads(member) == {"task_uuid": "uuid-1", "user_id": 7, "enqueued_at": 1.5}
+    assert prefix == "inference:flight:followers:"
+    assert (lease_ms, ttl) == (singleflight.settings.singleflight_lease_ms, singleflight.settings.singleflight_followers_ttl_s)
+
+
+def test_join_as_follower(client):
+    client.eval.return_value = b"uuid-leader"
+
+    assert singleflight.join("abc", "uuid-2", 7, 1.5) == "uuid-leader"
+
+
+def test_join_runs_alone_when_redis_is_down(client):
+    client.eval.side_effect = redis.ConnectionError("down")
+
+    assert singleflight.join("abc", "uuid-3", 7, 1.5) is None
+
+
+def test_leave_returns_followers(client):
+    client.eval.return_value = [json.dumps({"task_uuid": "f1", "user_id": 2, "enqueued_at": 3.0}).encode()]
+
+    assert singleflight.leave("abc", "uuid-leader") == [{"task_uuid": "f1", "user_id": 2, "enqueued_at": 3.0}]
+    _, numkeys, flight_key, followers_key, owner_key, leader = client.eval.call_args.args
+    assert (numkeys, flight_key, followers_key, owner_key, leader) == (
+        3, "inference:flight:abc", "inference:flight:followers:uuid-leader", "inference:flight:owner:abc", "uuid-leader"
+    )
+
+
+@patch("ml_inference.singleflight.notify_result")
+def test_fail_pushes_error_to_followers(mock_notify, client):
+    client.eval.return_value = [
+        json.dumps({"task_uuid": uuid, "user_id": 1, "enqueued_at": 0.0}) for uuid in ("f1", "f2")
+    ]
+
+    singleflight.fail("abc", "uuid-leader", "ValueError: boom")
+
+    assert [c.args for c in mock_notify.call_args_list] == [
+        ("f1", {"error": "ValueError: boom"}),
+        ("f2", {"error": "ValueError: boom"}),
+    ]
+
+
+@pytest.fixture
+def live_redis():
+    # Lua-скрипты проверяем на настоящем Redis: без него тест пропускается
+    client = redis.Redis.from_url(singleflight.settings.result_channel_redis_url, socket_connect_timeout=0.5)
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip("Redis is not reachable")
+    keys = [singleflight.FLIGHT_KEY.format("killed"), singleflight.OWNER_KEY.format("killed")]
+    keys += [singleflight.FOLLOWERS_KEY.format(uuid) for uuid in ("dead-leader", "new-leader")]
+    client.delete(*keys)
+    with patch("ml_inference.singleflight.get_client", return_value=client):
+        yield client
+    client.delete(*keys)
+
+
+def test_new_leader_adopts_followers_of_killed_leader(live_redis):
+    assert singleflight.join("killed", "dead-leader", 1, 0.0) is None
+    assert singleflight.join("killed", "f1", 2, 1.0) == "dead-leader"
+
+    # воркер лидера убит: leave не вызван, lease истёк сам
+    live_redis.delete(singleflight.FLIGHT_KEY.format("killed"))
+
+    assert singleflight.join("killed", "new-leader", 3, 2.0) is None
+    assert singleflight.join("killed", "f2", 4, 3.0) == "new-leader"
+
+    followers = singleflight.leave("killed", "new-leader")
+    assert [f["task_uuid"] for f in followers] == ["f1", "f2"]
+    # запоздавший leave убитого лидера уже никого не получает
+    assert singleflight.leave("killed", "dead-leader") == []
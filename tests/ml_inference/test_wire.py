@@ -0,0 +1,59 @@
+import base64
+import json
+
+import pytest
+
+from ml_inference.benchmark import sample_records
+from ml_inference.model.encoder import encoder
+from shared.schemas import wire
+from shared.schemas.inference import InferenceInput
+
+
+@pytest.fixture
+def record():
+    return sample_records(1, seed=3)[0]
+
+
+def test_round_trip_keeps_fields_and_order(record):
+    fields = InferenceInput(**record).model_dump()
+
+    payload = wire.pack_input(fields)
+    input_obj, decoded = wire.decode_input(payload)
+
+    assert isinstance(payload, str)
+    assert decoded == fields
+    assert list(decoded) == list(InferenceInput.model_fields)
+    assert input_obj == InferenceInput(**record)
+
+
+def test_record_is_much_smaller_than_json(record):
+    fields = InferenceInput(**record).model_dump()
+
+    assert len(base64.b64decode(wire.pack_input(fields))) == 24
+    assert len(wire.pack_input(fields)) * 5 < len(json.dumps(fields))
+
+
+def test_codes_match_feature_encoder():
+    # коды записи и кодера признаков берутся из одних и тех же Literal
+    assert wire.CATEGORICAL_FIELDS == encoder.categorical_fields
+    assert wire.NUMERIC_FIELDS == encoder.numeric_fields
+    assert wire.CATEGORIES == encoder.categories
+
+
+def test_out_of_range_numbers_stay_dict(record):
+    fields = {**InferenceInput(**record).model_dump(), "Income": 10 ** 12}
+
+    assert wire.pack_input(fields) is fields
+    assert wire.decode_input(fields)[1] == fields
+
+
+def test_rejects_other_version_and_bad_codes(record):
+    raw = bytearray(base64.b64decode(wire.pack_input(InferenceInput(**record).model_dump())))
+
+    other_version = bytes([wire.WIRE_VERSION + 1]) + bytes(raw[1:])
+    with pytest.raises(ValueError, match="wire version"):
+        wire.unpack_input(base64.b64encode(other_version).decode())
+
+    raw[1] = 200
+    with pytest.raises(ValueError, match="out of range"):
+        wire.unpack_input(base64.b64encode(bytes(raw)).decode())
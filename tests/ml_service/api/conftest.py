@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from typing import Generator
+from sqlalchemy.orm import Session
+
+from ml_service.app.main import app
+from ml_service.app.db.base import Base
+from ml_service.app.db.session import (
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    SQLALCHEMY_DATABASE_URL,
+    get_async_db,
+    get_db,
+)
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="module")
+def db() -> Generator[Session, None, None]:
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Роуты получают сессию через get_session: прогоняем API в обоих режимах ASYNC_DB
+@pytest.fixture(scope="module", params=["sync", "async"])
+def db_mode(request) -> str:
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def client(db, db_mode):
+    if db_mode == "async":
+        pytest.importorskip("asyncpg")
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        # NullPool: соединения asyncpg привязаны к циклу событий, а у TestClient он свой
+        async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
+        async def override_get_session():
+            async with AsyncSession(async_engine, autoflush=False, expire_on_commit=False) as session:
+                yield session
+    else:
+        def override_get_session():
+            yield db
+
+    # get_session — это get_db или get_async_db, смотря по ASYNC_DB; подменяем оба
+    app.dependency_overrides[get_db] = override_get_session
+    app.dependency_overrides[get_async_db] = override_get_session
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        app.dependency_overrides.clear()
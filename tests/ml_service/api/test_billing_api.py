@@ -1,40 +1,11 @@
 import pytest
-from fastapi.testclient import TestClient
-from ml_service.app.main import app
-from ml_service.app.db.session import get_db, SQLALCHEMY_DATABASE_URL
-from ml_service.app.db.base import Base
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
-from sqlalchemy.orm import Session
 
-DATABASE_URL = SQLALCHEMY_DATABASE_URL
-engine = create_engine(DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="module")
-def db() -> Generator[Session, None, None]:
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@pytest.fixture(scope="module")
-def client(db):
-    def override_get_db():
-        yield db
-
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-
-@pytest.fixture(scope="module")
-def auth_token(client):
+def auth_token(client, db_mode):
     user_data = {
-        "username": "billuser",
-        "email": "billuser@example.com",
+        "username": f"billuser_{db_mode}",
+        "email": f"billuser_{db_mode}@example.com",
         "password": "secret123"
     }
     # Register
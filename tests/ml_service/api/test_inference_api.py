@@ -1,43 +1,16 @@
-import pytest
-from fastapi.testclient import TestClient
-from ml_service.app.main import app
-from ml_service.app.db.base import Base
-from ml_service.app.db.session import SQLALCHEMY_DATABASE_URL, get_db
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
-
-from ml_service.app.core.security import create_access_token
-
-DATABASE_URL = SQLALCHEMY_DATABASE_URL
-engine = create_engine(DATABASE_URL)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-@pytest.fixture(scope="module")
-def db() -> Generator:
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+import asyncio
 
+import pytest
+from fastapi import HTTPException
 
-@pytest.fixture(scope="module")
-def client(db):
-    def override_get_db():
-        yield db
-
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
+from ml_service.app.api.inference import _submit
+from ml_service.app.services.idempotency import IdempotencyConflict
 
 
-def register_user(client):
+def register_user(client, db_mode):
     user_data = {
-        "username": "inferuser",
-        "email": "inferuser@example.com",
+        "username": f"inferuser_{db_mode}",
+        "email": f"inferuser_{db_mode}@example.com",
         "password": "strongpass"
     }
     client.post("/auth/register", json=user_data)
@@ -49,8 +22,8 @@ def get_token(client, email, password):
     return response.json()["access_token"]
 
 
-def test_submit_and_get_history(client):
-    user_data = register_user(client)
+def test_submit_and_get_history(client, db_mode):
+    user_data = register_user(client, db_mode)
     token = get_token(client, user_data["email"], user_data["password"])
     headers = {"Authorization": f"Bearer {token}"}
 
@@ -84,3 +57,12 @@ def test_submit_and_get_history(client):
     assert history_response.status_code == 200
     assert isinstance(history_response.json(), list)
     assert len(history_response.json()) >= 1
+
+
+def test_idempotency_conflict_is_mapped_to_422():
+    def submit(user_id, task_data, idempotency_key):
+        raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_submit(submit, 1, None, "key-1"))
+    assert exc.value.status_code == 422
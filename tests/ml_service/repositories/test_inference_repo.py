@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+from ml_service.app.repositories.inference_repo import InferenceRepository
+
+
+def compiled_sql(db):
+    stmt = db.execute.call_args.args[0]
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_upsert_result_is_single_statement_without_commit():
+    db = MagicMock()
+    db.execute.return_value.first.return_value = MagicMock(id=42)
+    repo = InferenceRepository(db)
+
+    task_id = repo.upsert_result("uuid-1", {
+        "user_id": 1, "model_type": "simple", "input_data": "{}",
+        "output_data": '{"score": 1.0}', "status": "COMPLETED",
+    })
+
+    assert task_id == 42
+    db.execute.assert_called_once()
+    db.commit.assert_not_called()
+
+    sql = compiled_sql(db)
+    assert "ON CONFLICT (task_uuid) DO UPDATE" in sql
+    assert "RETURNING inference_tasks.id" in sql
+    # повторная доставка не перезаписывает уже завершённую или упавшую задачу
+    assert "WHERE (inference_tasks.status NOT IN" in sql
+    update_clause = sql.split("DO UPDATE SET", 1)[1].split(" WHERE ", 1)[0]
+    assert "output_data" in update_clause and "status" in update_clause
+    assert "input_data" not in update_clause and "user_id" not in update_clause
+
+
+def test_upsert_result_returns_none_for_completed_task():
+    db = MagicMock()
+    db.execute.return_value.first.return_value = None
+
+    assert InferenceRepository(db).upsert_result("uuid-done", {"status": "COMPLETED"}) is None
+
+
+def test_upsert_results_batch():
+    db = MagicMock()
+    db.execute.return_value.all.return_value = [MagicMock(id=1, user_id=10), MagicMock(id=3, user_id=11)]
+    rows = [
+        {"task_uuid": f"uuid-{i}", "user_id": 10 + i, "model_type": "simple", "input_data": "{}",
+         "output_data": "{}", "status": "COMPLETED"}
+        for i in range(3)
+    ]
+
+    completed = InferenceRepository(db).upsert_results(rows)
+
+    assert completed == [(1, 10), (3, 11)]
+    db.execute.assert_called_once()
+    db.commit.assert_not_called()
+    sql = compiled_sql(db)
+    assert sql.count("task_uuid_m") == 3
+    assert "excluded.output_data" in sql
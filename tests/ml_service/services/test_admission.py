@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+import pytest
+import redis
+from fastapi import HTTPException
+
+from ml_service.app.core.config import RateLimit
+from ml_service.app.services import admission
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(admission.settings, "admission_enabled", True)
+    monkeypatch.setattr(admission.settings, "rate_limit_user", RateLimit(rate_per_s=5, burst=20))
+    monkeypatch.setattr(admission.settings, "rate_limit_tiers", {"premium": RateLimit(rate_per_s=1, burst=5)})
+    monkeypatch.setattr(admission.settings, "admission_max_queue_depth", {"simple": 100, "premium": 10})
+    monkeypatch.setattr(admission, "_depths", {})
+
+
+@pytest.fixture
+def broker():
+    with patch("ml_service.app.services.admission._get_broker") as get_broker:
+        get_broker.return_value.llen.return_value = 0
+        yield get_broker.return_value
+
+
+@patch("ml_service.app.services.admission.r")
+def test_admitted_takes_user_and_tier_tokens(mock_redis, broker):
+    mock_redis.eval.return_value = 0
+
+    admission.admit(1, "premium")
+
+    broker.llen.assert_called_once_with("inference.premium")
+    _, numkeys, user_key, tier_key, now_ms, *limits = mock_redis.eval.call_args.args
+    assert (numkeys, user_key, tier_key) == (2, "ratelimit:user:1", "ratelimit:premium:1")
+    assert limits == [5, 20, 1, 5]
+
+
+@patch("ml_service.app.services.admission.r")
+def test_tier_without_own_limit_uses_user_bucket_only(mock_redis, broker):
+    mock_redis.eval.return_value = 0
+
+    admission.admit(1, "simple")
+
+    assert mock_redis.eval.call_args.args[1:3] == (1, "ratelimit:user:1")
+
+
+@patch("ml_service.app.services.admission.r")
+def test_rate_limited_with_retry_after(mock_redis, broker):
+    mock_redis.eval.return_value = 1200
+
+    with pytest.raises(HTTPException) as exc:
+        admission.admit(1, "simple")
+
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "2"}
+
+
+@patch("ml_service.app.services.admission.r")
+def test_full_queue_rejected_before_taking_tokens(mock_redis, broker):
+    broker.llen.return_value = 10
+
+    with pytest.raises(HTTPException) as exc:
+        admission.admit(1, "premium")
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers == {"Retry-After": "5"}
+    mock_redis.eval.assert_not_called()
+
+
+@patch("ml_service.app.services.admission.r")
+def test_queue_depth_is_cached(mock_redis, broker):
+    mock_redis.eval.return_value = 0
+
+    admission.admit(1, "simple")
+    admission.admit(2, "simple")
+
+    broker.llen.assert_called_once()
+
+
+@patch("ml_service.app.services.admission.r")
+def test_redis_errors_admit(mock_redis, broker):
+    broker.llen.side_effect = redis.ConnectionError("down")
+    mock_redis.eval.side_effect = redis.ConnectionError("down")
+
+    admission.admit(1, "premium")
+
+
+@patch("ml_service.app.services.admission.r")
+def test_disabled(mock_redis, broker, monkeypatch):
+    monkeypatch.setattr(admission.settings, "admission_enabled", False)
+
+    admission.admit(1, "premium")
+
+    broker.llen.assert_not_called()
+    mock_redis.eval.assert_not_called()
@@ -73,3 +73,24 @@ def test_authenticate_user_wrong_password(auth_service):
             auth_service.authenticate_user("test@example.com", "wrongpass")
 
     assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_async_register_user_success(user_data):
+    from unittest.mock import AsyncMock
+    from ml_service.app.services.auth_service import AsyncAuthService
+
+    service = AsyncAuthService(AsyncMock())
+    service.repo = AsyncMock()
+    service.repo.get_by_email.return_value = None
+    service.repo.create.return_value = MagicMock(spec=User, id=1, email=user_data.email, username=user_data.username)
+    service.billing = AsyncMock()
+
+    with patch("ml_service.app.services.auth_service.async_cache_service.set_user_profile_cached") as cache_mock:
+        result = await service.register_user(user_data)
+
+    assert result.email == user_data.email
+    hashed = service.repo.create.call_args.args[1]
+    assert hashed != user_data.password
+    service.billing.credit_user.assert_awaited_once_with(1, amount=10)
+    cache_mock.assert_awaited_once()
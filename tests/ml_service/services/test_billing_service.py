@@ -111,3 +111,67 @@ def test_get_balance_no_user(billing_service):
     balance = billing_service.get_balance(user_id)
 
     assert balance == 0
+
+def test_freeze_multi_model_is_one_record(billing_service):
+    credits_mock = MagicMock(available_credits=10, frozen_credits=0)
+    billing_service.credits_repo.get_by_user_id.return_value = credits_mock
+
+    with patch("ml_service.app.services.billing_service.set_user_credits_cached"):
+        billing_service.freeze(1, "simple+premium")
+
+    assert credits_mock.available_credits == 4
+    billing_service.billing_repo.create.assert_called_once_with(
+        user_id=1,
+        data=BillingRecordCreate(type="freeze", amount=-6),
+        task_id=None
+    )
+
+
+@pytest.fixture
+def async_billing_service():
+    from unittest.mock import AsyncMock
+    from ml_service.app.services.billing_service import AsyncBillingService
+    service = AsyncBillingService(AsyncMock())
+    service.credits_repo = AsyncMock()
+    service.billing_repo = AsyncMock()
+    return service
+
+@pytest.mark.asyncio
+async def test_async_freeze_success(async_billing_service):
+    credits_mock = MagicMock(available_credits=10, frozen_credits=0)
+    async_billing_service.credits_repo.get_by_user_id.return_value = credits_mock
+
+    with patch("ml_service.app.services.billing_service.async_cache_service.set_user_credits_cached") as cache_mock:
+        await async_billing_service.freeze(1, model_type="premium", task_id=42)
+
+    assert credits_mock.available_credits == 5
+    async_billing_service.billing_repo.create.assert_awaited_once_with(
+        user_id=1,
+        data=BillingRecordCreate(type="freeze", amount=-5),
+        task_id=42
+    )
+    async_billing_service.db.commit.assert_awaited_once()
+    cache_mock.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_async_freeze_insufficient_funds(async_billing_service):
+    async_billing_service.credits_repo.get_by_user_id.return_value = MagicMock(available_credits=0)
+
+    with pytest.raises(ValueError):
+        await async_billing_service.freeze(1, model_type="simple")
+
+    async_billing_service.billing_repo.create.assert_not_awaited()
+
+def test_refund_many_returns_credits_without_commit(billing_service):
+    credits = {1: MagicMock(available_credits=0), 2: MagicMock(available_credits=3)}
+    billing_service.credits_repo.get_by_user_id.side_effect = credits.__getitem__
+
+    billing_service.refund_many([(10, 1), (11, 2)], "simple+premium")
+
+    assert credits[1].available_credits == 6
+    assert credits[2].available_credits == 9
+    billing_service.billing_repo.create_many.assert_called_once_with([
+        {"user_id": 1, "task_id": 10, "amount": 6, "type": "unfreeze"},
+        {"user_id": 2, "task_id": 11, "amount": 6, "type": "unfreeze"},
+    ])
+    billing_service.db.commit.assert_not_called()
@@ -0,0 +1,52 @@
+import json
+from unittest.mock import patch
+
+import pytest
+import redis
+
+from ml_service.app.services import idempotency
+
+
+@patch("ml_service.app.services.idempotency.r")
+def test_first_request_claims_key(mock_redis):
+    mock_redis.set.return_value = True
+
+    assert idempotency.claim(1, "key-1", "fp", "uuid-1") is None
+
+    key, record = mock_redis.set.call_args.args
+    assert key == "idempotency:1:key-1"
+    assert json.loads(record) == {"task_uuid": "uuid-1", "fingerprint": "fp"}
+    assert mock_redis.set.call_args.kwargs["nx"] is True
+
+
+@patch("ml_service.app.services.idempotency.r")
+def test_duplicate_gets_first_task(mock_redis):
+    mock_redis.set.return_value = None
+    mock_redis.get.return_value = json.dumps({"task_uuid": "uuid-first", "fingerprint": "fp"})
+
+    assert idempotency.claim(1, "key-1", "fp", "uuid-second") == "uuid-first"
+
+
+@patch("ml_service.app.services.idempotency.r")
+def test_key_reused_with_other_body_is_rejected(mock_redis):
+    mock_redis.set.return_value = None
+    mock_redis.get.return_value = json.dumps({"task_uuid": "uuid-first", "fingerprint": "fp"})
+
+    with pytest.raises(idempotency.IdempotencyConflict):
+        idempotency.claim(1, "key-1", "other", "uuid-second")
+
+
+@patch("ml_service.app.services.idempotency.r")
+def test_key_expired_between_set_and_get_is_claimed_again(mock_redis):
+    mock_redis.set.side_effect = [None, True]
+    mock_redis.get.return_value = None
+
+    assert idempotency.claim(1, "key-1", "fp", "uuid-1") is None
+    assert mock_redis.set.call_count == 2
+
+
+@patch("ml_service.app.services.idempotency.r")
+def test_redis_down_disables_deduplication(mock_redis):
+    mock_redis.set.side_effect = redis.ConnectionError("down")
+
+    assert idempotency.claim(1, "key-1", "fp", "uuid-1") is None
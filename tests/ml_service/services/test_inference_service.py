@@ -1,11 +1,34 @@
+import json
+from datetime import datetime
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from ml_service.app.services.inference_service import InferenceService
 from ml_service.app.schemas.inference import InferenceTaskCreate
 from shared.schemas.inference import InferenceInput
-from celery.exceptions import TimeoutError
 
 
+@pytest.fixture(autouse=True)
+def mock_join():
+    # по умолчанию каждая задача — лидер и ставится в очередь сама
+    with patch("ml_service.app.services.inference_service.singleflight.join", return_value=None) as join:
+        yield join
+
+@pytest.fixture(autouse=True)
+def mock_admit():
+    with patch("ml_service.app.services.inference_service.admission.admit") as admit:
+        yield admit
+
+@pytest.fixture(autouse=True)
+def mock_choose():
+    # по умолчанию запрос обслуживает запрошенная модель
+    with patch("ml_service.app.services.inference_service.model_catalog.choose", side_effect=lambda model_type: model_type) as choose:
+        yield choose
+
+@pytest.fixture(autouse=True)
+def mock_require_available():
+    with patch("ml_service.app.services.inference_service.model_catalog.require_available") as require_available:
+        yield require_available
+
 @pytest.fixture
 def db_mock():
     return MagicMock()
@@ -41,36 +64,103 @@ def task_data():
 
 
 def test_submit_task_success(service, task_data):
-    mock_result = {"score": 0.75, "explanation": "text"}
-    mock_async_result = MagicMock()
-    mock_async_result.id = "task-uuid"
-    mock_async_result.get.return_value = mock_result
-
-    service.repo.create.return_value = MagicMock(id=1)
+    service.repo.create.return_value = MagicMock(id=1, task_uuid="row-uuid")
     service.repo.update_output = MagicMock()
 
-    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async", return_value=mock_async_result):
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
         task = service.submit_task(user_id=1, task_data=task_data)
 
     service.billing.freeze.assert_called_once_with(1, model_type="simple")
     service.repo.create.assert_called_once()
-    service.repo.update_output.assert_called_once()
+    # строку создаёт API до постановки в очередь, результат в неё пишет только воркер
+    assert service.repo.create.call_args.args[0]["status"] == "PENDING"
+    assert apply_mock.call_args.kwargs["task_id"] == "row-uuid"
+    assert apply_mock.call_args.kwargs["kwargs"]["task_uuid"] == "row-uuid"
+    # в очередь уходит компактная запись, а не dict входа
+    from shared.schemas.wire import unpack_input
+    assert unpack_input(apply_mock.call_args.kwargs["args"][1]) == task_data.input_data.model_dump()
+    # результат ждёт wait_result, submit не блокируется
+    apply_mock.return_value.get.assert_not_called()
+    service.repo.update_output.assert_not_called()
+    service.repo.update_timings.assert_not_called()
     assert task.id == 1
 
-def test_submit_task_timeout(service, task_data):
-    mock_async_result = MagicMock()
-    mock_async_result.id = "uuid-timeout"
-    mock_async_result.get.side_effect = TimeoutError()
 
-    task_mock = MagicMock(id=10)
-    service.repo.create.return_value = task_mock
-    service.repo.update_output = MagicMock()
+@pytest.mark.asyncio
+async def test_wait_result_applies_pushed_result(service):
+    task = MagicMock(id=1, task_uuid="row-uuid", status="PENDING", output_data='{"score": 0.75}')
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait",
+               new=AsyncMock(return_value={"score": 0.75, "explanation": "text", "timings": {}})) as wait_mock:
+        result = await service.wait_result(task, "simple")
+
+    assert result is task
+    assert wait_mock.call_args.args[0] == "row-uuid"
+    service.repo.update_timings.assert_called_once()
+    service.db.expunge.assert_not_called()
+
 
-    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async", return_value=mock_async_result):
-        task = service.submit_task(user_id=99, task_data=task_data)
+@pytest.mark.asyncio
+async def test_wait_result_timeout(service):
+    task = MagicMock(id=10, task_uuid="uuid-timeout", status="PENDING", output_data=None)
 
-    assert task.id == 10
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock(return_value=None)):
+        result = await service.wait_result(task, "simple")
+
+    assert result.output_data is None
     service.repo.update_output.assert_not_called()
+    service.repo.update_timings.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_wait_result_raises_worker_error(service):
+    task = MagicMock(id=11, task_uuid="uuid-failed", status="PENDING")
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait",
+               new=AsyncMock(return_value={"error": "ValueError: bad input"})):
+        with pytest.raises(RuntimeError, match="bad input"):
+            await service.wait_result(task, "simple")
+
+
+@pytest.mark.asyncio
+async def test_wait_result_uses_pushed_result_before_row_is_written(service):
+    # write-behind: строку ещё не записал consumer, отдаём пришедший результат
+    task = MagicMock(id=12, task_uuid="uuid-stream", status="PENDING", output_data=None)
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait",
+               new=AsyncMock(return_value={"score": 2.0, "explanation": "ok", "timings": {}})):
+        await service.wait_result(task, "simple")
+
+    service.db.expunge.assert_called_once_with(task)
+    assert json.loads(task.output_data) == {"score": 2.0, "explanation": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_wait_result_skips_finished_inline_task(service):
+    task = MagicMock(status="COMPLETED")
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock()) as wait_mock:
+        assert await service.wait_result(task, "simple") is task
+
+    wait_mock.assert_not_called()
+
+
+def test_submit_task_enqueue_failure_refunds(service, task_data):
+    service.repo.create.return_value = MagicMock(id=12, task_uuid="uuid-12")
+    service.repo.upsert_results.return_value = [(12, 1)]
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async", side_effect=ConnectionError("broker down")), \
+         patch("ml_service.app.services.inference_service.invalidate_user_cache") as invalidate_mock:
+        with pytest.raises(ConnectionError):
+            service.submit_task(user_id=1, task_data=task_data)
+
+    # строка не остаётся PENDING: FAILED с ошибкой и возврат заморозки одной транзакцией
+    [row] = service.repo.upsert_results.call_args.args[0]
+    assert (row["task_uuid"], row["status"]) == ("uuid-12", "FAILED")
+    assert json.loads(row["output_data"]) == {"error": "ConnectionError: broker down"}
+    service.billing.refund_many.assert_called_once_with([(12, 1)], "simple")
+    service.db.commit.assert_called_once()
+    invalidate_mock.assert_called_once_with(1)
 
 
 def test_get_user_history_cached(service):
@@ -96,3 +186,446 @@ def test_get_user_history_fallback_to_db(service):
     assert isinstance(result, list)
     assert result[0].model_type == "simple"
     cache_mock.assert_called_once()
+
+
+def test_submit_task_inline(service, task_data):
+    future = MagicMock()
+    future.result.return_value = {"score": 1.5, "explanation": "low"}
+    service.repo.create.return_value = MagicMock(id=5, task_uuid="inline-uuid")
+
+    with patch("ml_service.app.services.inference_service.is_inline", return_value=True), \
+         patch("ml_service.app.services.inference_service.submit_inline", return_value=future), \
+         patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        task = service.submit_task(user_id=1, task_data=task_data)
+
+    apply_mock.assert_not_called()
+    service.billing.freeze.assert_called_once_with(1, model_type="simple")
+    task_uuid, values = service.repo.upsert_result.call_args.args
+    assert task_uuid == "inline-uuid"
+    assert json.loads(values["output_data"]) == {"score": 1.5, "explanation": "low"}
+    service.billing.finalize.assert_called_once_with(user_id=1, task_id=5)
+    assert task.id == 5
+
+
+def test_submit_task_inline_failure_refunds(service, task_data):
+    future = MagicMock()
+    future.result.side_effect = RuntimeError("model missing")
+    service.repo.create.return_value = MagicMock(id=6, task_uuid="uuid-6")
+    service.repo.upsert_results.return_value = [(6, 1)]
+
+    with patch("ml_service.app.services.inference_service.is_inline", return_value=True), \
+         patch("ml_service.app.services.inference_service.submit_inline", return_value=future), \
+         patch("ml_service.app.services.inference_service.invalidate_user_cache"):
+        with pytest.raises(RuntimeError):
+            service.submit_task(user_id=1, task_data=task_data)
+
+    assert service.repo.upsert_results.call_args.args[0][0]["status"] == "FAILED"
+    service.billing.refund_many.assert_called_once_with([(6, 1)], "simple")
+    service.billing.finalize.assert_not_called()
+
+
+def test_submit_task_inline_pool_full_falls_back_to_celery(service, task_data):
+    service.repo.create.return_value = MagicMock(id=7)
+
+    with patch("ml_service.app.services.inference_service.is_inline", return_value=True), \
+         patch("ml_service.app.services.inference_service.submit_inline", return_value=None), \
+         patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        service.submit_task(user_id=1, task_data=task_data)
+
+    apply_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_submit_task_stores_timings(service, task_data):
+    service.repo.create.return_value = MagicMock(id=8, task_uuid="uuid-timings", status="PENDING")
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        task = service.submit_task(user_id=1, task_data=task_data)
+
+    enqueued_at = apply_mock.call_args.kwargs["kwargs"]["enqueued_at"]
+    assert service.repo.create.call_args.args[0]["enqueued_at"] == datetime.utcfromtimestamp(enqueued_at)
+
+    # воркер возвращает enqueued_at, полученный от API
+    worker_timings = {"enqueued_at": enqueued_at, "started_at": 100.0, "predicted_at": 100.5, "committed_at": 101.0}
+    pushed = {"score": 2.0, "explanation": "ok", "timings": worker_timings}
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock(return_value=pushed)), \
+         patch("ml_service.app.services.inference_service.observe_task_timings") as observe_mock:
+        await service.wait_result(task, "simple")
+
+    # остальные метки воркер пишет сам вместе с результатом
+    task_id, timings = service.repo.update_timings.call_args.args
+    assert task_id == 8
+    assert timings["committed_at"] == datetime.utcfromtimestamp(101.0)
+    assert set(timings) == {"committed_at", "observed_at"}
+
+    observed = observe_mock.call_args.args[1]
+    assert observed["enqueued_at"] == enqueued_at
+    assert observed["started_at"] == 100.0
+
+
+def test_observe_task_timings_skips_unknown_stages():
+    from ml_service.app.monitoring import metrics
+
+    with patch.object(metrics, "inference_stage_seconds") as hist:
+        metrics.observe_task_timings("simple", {"enqueued_at": 1.0, "started_at": 1.25, "predicted_at": 1.5, "observed_at": 2.0})
+
+    stages = {call.args[1]: hist.labels.return_value.observe.call_args_list[i].args[0]
+              for i, call in enumerate(hist.labels.call_args_list)}
+    assert stages == {"queue_wait": 0.25, "execution": 0.25, "total": 1.0}
+
+
+def test_submit_multi_task_single_freeze_and_row(service, task_data):
+    from ml_service.app.schemas.inference import MultiInferenceTaskCreate
+
+    multi = MultiInferenceTaskCreate(model_types=["simple", "premium"], input_data=task_data.input_data)
+    service.repo.create.return_value = MagicMock(id=9)
+
+    with patch("ml_service.app.services.inference_service.run_multi_inference_task.apply_async") as apply_mock:
+        task = service.submit_multi_task(user_id=1, task_data=multi)
+
+    service.billing.freeze.assert_called_once_with(1, model_type="simple+premium")
+    assert apply_mock.call_args.kwargs["args"][0] == ["simple", "premium"]
+    assert service.repo.create.call_args.args[0]["model_type"] == "simple+premium"
+    service.repo.update_output.assert_not_called()
+    assert task.id == 9
+
+
+def test_multi_task_rejects_duplicate_models(task_data):
+    from pydantic import ValidationError
+    from ml_service.app.schemas.inference import MultiInferenceTaskCreate
+
+    with pytest.raises(ValidationError):
+        MultiInferenceTaskCreate(model_types=["simple", "simple"], input_data=task_data.input_data)
+
+
+def _pending_task(**fields):
+    defaults = dict(task_uuid="uuid-poll", model_type="simple", requested_model_type="simple", status="PENDING",
+                    created_at=datetime(2026, 1, 1), finished_at=None, output_data=None)
+    return MagicMock(**{**defaults, **fields})
+
+
+@pytest.mark.asyncio
+async def test_wait_task_returns_finished_row_without_waiting(service):
+    task = _pending_task(status="COMPLETED", output_data='{"score": 4.0, "explanation": "moderate"}')
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock()) as wait_mock:
+        status = await service.wait_task(task, 10)
+
+    wait_mock.assert_not_called()
+    assert (status.status, status.score, status.result) == ("COMPLETED", 4.0, "moderate")
+
+
+@pytest.mark.asyncio
+async def test_wait_task_long_polls_pending_task(service):
+    pushed = {"results": {"simple": {"score": 1.0, "explanation": "low"}}, "timings": {}}
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock(return_value=pushed)) as wait_mock:
+        status = await service.wait_task(_pending_task(model_type="simple+premium"), 10)
+
+    assert wait_mock.call_args.args == ("uuid-poll", 10)
+    assert status.status == "COMPLETED"
+    assert status.scores["simple"].score == 1.0
+
+
+@pytest.mark.asyncio
+async def test_wait_task_still_pending_and_failed(service):
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock(return_value=None)):
+        assert (await service.wait_task(_pending_task(), 0)).status == "PENDING"
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait",
+               new=AsyncMock(return_value={"error": "ValueError: bad"})):
+        status = await service.wait_task(_pending_task(), 1)
+    assert (status.status, status.error) == ("FAILED", "ValueError: bad")
+
+
+def test_get_task_looks_up_by_uuid_and_user(service):
+    service.get_task(user_id=3, task_uuid="uuid-x")
+
+    service.repo.get_by_uuid_and_user.assert_called_once_with("uuid-x", 3)
+
+
+def test_idempotent_replay_does_not_freeze_or_enqueue(service, task_data):
+    service.repo.get_by_uuid_and_user.return_value = MagicMock(
+        status="COMPLETED", output_data='{"explanation": "low"}', created_at=None, finished_at=None
+    )
+
+    with patch("ml_service.app.services.inference_service.idempotency.claim", return_value="uuid-first") as claim_mock, \
+         patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        task = service.submit_task(user_id=1, task_data=task_data, idempotency_key="retry-1")
+
+    assert claim_mock.call_args.args[:2] == (1, "retry-1")
+    service.billing.freeze.assert_not_called()
+    service.repo.create.assert_not_called()
+    apply_mock.assert_not_called()
+    assert (task.id, task.task_uuid, task.status) == (None, "uuid-first", "COMPLETED")
+
+
+def test_first_idempotent_request_uses_claimed_uuid(service, task_data):
+    service.repo.create.return_value = MagicMock(id=1)
+
+    with patch("ml_service.app.services.inference_service.idempotency.claim", return_value=None) as claim_mock, \
+         patch("ml_service.app.services.inference_service.run_inference_task.apply_async"):
+        service.submit_task(user_id=1, task_data=task_data, idempotency_key="retry-2")
+
+    claimed_uuid = claim_mock.call_args.args[3]
+    assert service.repo.create.call_args.args[0]["task_uuid"] == claimed_uuid
+
+
+def test_failed_submit_releases_idempotency_key(service, task_data):
+    service.billing.freeze.side_effect = ValueError("Insufficient funds")
+
+    with patch("ml_service.app.services.inference_service.idempotency.claim", return_value=None), \
+         patch("ml_service.app.services.inference_service.idempotency.release") as release_mock:
+        with pytest.raises(ValueError):
+            service.submit_task(user_id=1, task_data=task_data, idempotency_key="retry-3")
+
+    release_mock.assert_called_once_with(1, "retry-3")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_on_first_task(service):
+    from ml_service.app.db.models.inference_task import InferenceTask
+
+    # первый запрос ещё не создал строку: повтор ждёт результат по его task_uuid и ничего не пишет
+    task = InferenceTask(task_uuid="uuid-first", model_type="simple", status="PENDING")
+    pushed = {"score": 1.0, "explanation": "low", "timings": {"started_at": 1.0}}
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait", new=AsyncMock(return_value=pushed)) as wait_mock:
+        await service.wait_result(task, "simple")
+
+    assert wait_mock.call_args.args[0] == "uuid-first"
+    service.repo.update_timings.assert_not_called()
+    assert json.loads(task.output_data) == {"score": 1.0, "explanation": "low"}
+
+
+def test_identical_in_flight_task_is_not_enqueued(service, task_data, mock_join):
+    service.repo.create.return_value = MagicMock(id=21, task_uuid="follower-uuid")
+    mock_join.return_value = "leader-uuid"
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        task = service.submit_task(user_id=2, task_data=task_data)
+
+    # своя строка и своя заморозка есть, в очередь ничего не уходит
+    service.billing.freeze.assert_called_once_with(2, model_type="simple")
+    apply_mock.assert_not_called()
+    flight, task_uuid, user_id, _ = mock_join.call_args.args
+    assert (task_uuid, user_id) == ("follower-uuid", 2)
+    assert task.id == 21
+
+
+def test_leader_passes_flight_to_worker(service, task_data, mock_join):
+    service.repo.create.return_value = MagicMock(id=22, task_uuid="leader-uuid")
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        service.submit_task(user_id=1, task_data=task_data)
+
+    assert apply_mock.call_args.kwargs["kwargs"]["flight"] == mock_join.call_args.args[0]
+
+
+def test_singleflight_disabled(service, task_data, mock_join, monkeypatch):
+    from ml_inference import singleflight
+
+    monkeypatch.setattr(singleflight.settings, "singleflight_enabled", False)
+    service.repo.create.return_value = MagicMock(id=23, task_uuid="uuid-23")
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        service.submit_task(user_id=1, task_data=task_data)
+
+    mock_join.assert_not_called()
+    assert apply_mock.call_args.kwargs["kwargs"]["flight"] is None
+
+
+def test_enqueue_failure_releases_followers(service, task_data):
+    service.repo.create.return_value = MagicMock(id=24, task_uuid="leader-uuid")
+    service.repo.upsert_results.return_value = [(24, 1), (25, 2)]
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async", side_effect=ConnectionError("broker down")), \
+         patch("ml_service.app.services.inference_service.invalidate_user_cache"), \
+         patch("ml_service.app.services.inference_service.singleflight.fail",
+               return_value=[{"task_uuid": "f-25", "user_id": 2, "enqueued_at": 1.0}]) as fail_mock:
+        with pytest.raises(ConnectionError):
+            service.submit_task(user_id=1, task_data=task_data)
+
+    flight, leader_uuid, error = fail_mock.call_args.args
+    assert leader_uuid == "leader-uuid"
+    assert error == "ConnectionError: broker down"
+    # присоединившиеся тоже не остаются PENDING с замороженными кредитами
+    rows = service.repo.upsert_results.call_args.args[0]
+    assert [(row["task_uuid"], row["user_id"]) for row in rows] == [("leader-uuid", 1), ("f-25", 2)]
+    service.billing.refund_many.assert_called_once_with([(24, 1), (25, 2)], "simple")
+
+
+def test_rejected_submit_does_not_freeze(service, task_data, mock_admit):
+    from fastapi import HTTPException
+
+    mock_admit.side_effect = HTTPException(status_code=429, detail="Too many", headers={"Retry-After": "2"})
+
+    with patch("ml_service.app.services.inference_service.idempotency.claim", return_value=None), \
+         patch("ml_service.app.services.inference_service.idempotency.release") as release_mock, \
+         patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        with pytest.raises(HTTPException):
+            service.submit_task(user_id=1, task_data=task_data, idempotency_key="key-1")
+
+    mock_admit.assert_called_once_with(1, "simple")
+    service.billing.freeze.assert_not_called()
+    service.repo.create.assert_not_called()
+    apply_mock.assert_not_called()
+    # отказ не занимает Idempotency-Key: повтор после Retry-After выполнится заново
+    release_mock.assert_called_once_with(1, "key-1")
+
+
+def test_multi_submit_is_admitted_on_multi_tier(service, task_data, mock_admit):
+    from ml_service.app.schemas.inference import MultiInferenceTaskCreate
+
+    multi = MultiInferenceTaskCreate(model_types=["simple", "premium"], input_data=task_data.input_data)
+    service.repo.create.return_value = MagicMock(id=9)
+
+    with patch("ml_service.app.services.inference_service.run_multi_inference_task.apply_async"):
+        service.submit_multi_task(user_id=1, task_data=multi)
+
+    mock_admit.assert_called_once_with(1, ["simple", "premium"])
+
+
+def test_multi_submit_with_unavailable_model_does_not_freeze(service, task_data, mock_require_available, mock_admit):
+    from fastapi import HTTPException
+    from ml_service.app.schemas.inference import MultiInferenceTaskCreate
+
+    multi = MultiInferenceTaskCreate(model_types=["simple", "advanced"], input_data=task_data.input_data)
+    mock_require_available.side_effect = HTTPException(status_code=503, detail="Models unavailable: advanced")
+
+    with patch("ml_service.app.services.inference_service.run_multi_inference_task.apply_async") as apply_mock:
+        with pytest.raises(HTTPException):
+            service.submit_multi_task(user_id=1, task_data=multi)
+
+    mock_require_available.assert_called_once_with(["simple", "advanced"])
+    mock_admit.assert_not_called()
+    service.billing.freeze.assert_not_called()
+    apply_mock.assert_not_called()
+
+
+def test_degraded_submit_is_served_and_billed_by_fallback(service, task_data, mock_choose, mock_admit):
+    premium = task_data.model_copy(update={"model_type": "premium"})
+    mock_choose.side_effect = None
+    mock_choose.return_value = "simple"
+    service.repo.create.return_value = MagicMock(id=31, task_uuid="uuid-31")
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        service.submit_task(user_id=1, task_data=premium)
+
+    mock_choose.assert_called_once_with("premium")
+    mock_admit.assert_called_once_with(1, "simple")
+    service.billing.freeze.assert_called_once_with(1, model_type="simple")
+    row = service.repo.create.call_args.args[0]
+    assert (row["model_type"], row["requested_model_type"]) == ("simple", "premium")
+    assert apply_mock.call_args.kwargs["args"][0] == "simple"
+
+
+def test_submit_rejected_by_slo_does_not_freeze(service, task_data, mock_choose):
+    from fastapi import HTTPException
+
+    mock_choose.side_effect = HTTPException(status_code=503, detail="overloaded", headers={"Retry-After": "5"})
+
+    with pytest.raises(HTTPException):
+        service.submit_task(user_id=1, task_data=task_data)
+
+    service.billing.freeze.assert_not_called()
+    service.repo.create.assert_not_called()
+
+
+def test_task_status_reports_requested_model():
+    from ml_service.app.services.inference_service import task_status
+
+    task = MagicMock(task_uuid="u", model_type="simple", requested_model_type="premium", status="COMPLETED",
+                     created_at=None, finished_at=None, output_data=json.dumps({"score": 1.0, "explanation": "ok"}))
+
+    status = task_status(task)
+
+    assert (status.model_type, status.requested_model_type) == ("simple", "premium")
+
+
+@pytest.fixture
+def async_service():
+    from ml_service.app.services.inference_service import AsyncInferenceService
+    service = AsyncInferenceService(MagicMock())
+    service.repo = AsyncMock()
+    service.billing = AsyncMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_async_submit_task_enqueues(async_service, task_data):
+    async_service.repo.create.return_value = MagicMock(id=11, task_uuid="async-uuid", status="PENDING")
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async") as apply_mock:
+        task = await async_service.submit_task(user_id=1, task_data=task_data)
+
+    async_service.billing.freeze.assert_awaited_once_with(1, model_type="simple")
+    assert async_service.repo.create.call_args.args[0]["status"] == "PENDING"
+    assert apply_mock.call_args.kwargs["task_id"] == "async-uuid"
+    assert task.id == 11
+
+
+@pytest.mark.asyncio
+async def test_async_enqueue_failure_refunds(async_service, task_data):
+    async_service.repo.create.return_value = MagicMock(id=12, task_uuid="async-uuid")
+    async_service.repo.upsert_results.return_value = [(12, 1)]
+    async_service.db.commit = AsyncMock()
+
+    with patch("ml_service.app.services.inference_service.run_inference_task.apply_async",
+               side_effect=ConnectionError("broker down")), \
+         patch("ml_service.app.services.inference_service.async_cache_service.invalidate_user_cache", new=AsyncMock()):
+        with pytest.raises(ConnectionError):
+            await async_service.submit_task(user_id=1, task_data=task_data)
+
+    assert async_service.repo.upsert_results.call_args.args[0][0]["status"] == "FAILED"
+    async_service.billing.refund_many.assert_awaited_once_with([(12, 1)], "simple")
+    async_service.db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_async_wait_result_returns_pushed_result(async_service):
+    # expire_on_commit=False: строка не перечитывается, результат берётся из pub/sub
+    task = MagicMock(id=13, task_uuid="async-uuid", status="PENDING", output_data=None)
+
+    with patch("ml_service.app.services.inference_service.result_waiter.wait",
+               new=AsyncMock(return_value={"score": 0.5, "explanation": "ok", "timings": {"committed_at": 2.0}})):
+        result = await async_service.wait_result(task, "simple")
+
+    assert json.loads(result.output_data) == {"score": 0.5, "explanation": "ok"}
+    task_id, timings = async_service.repo.update_timings.call_args.args
+    assert task_id == 13 and set(timings) == {"committed_at", "observed_at"}
+    async_service.db.expunge.assert_called_once_with(task)
+
+
+@pytest.mark.asyncio
+async def test_async_submit_task_inline_awaits_future(async_service, task_data):
+    from concurrent.futures import Future
+    future = Future()
+    future.set_result({"score": 1.5, "explanation": "low"})
+    async_service.repo.create.return_value = MagicMock(id=14, task_uuid="inline-uuid")
+    async_service.db.refresh = AsyncMock()
+
+    with patch("ml_service.app.services.inference_service.is_inline", return_value=True), \
+         patch("ml_service.app.services.inference_service.submit_inline", return_value=future):
+        task = await async_service.submit_task(user_id=1, task_data=task_data)
+
+    task_uuid, values = async_service.repo.upsert_result.call_args.args
+    assert task_uuid == "inline-uuid" and values["status"] == "COMPLETED"
+    async_service.billing.finalize.assert_awaited_once_with(user_id=1, task_id=14)
+    assert task.id == 14
+
+
+@pytest.mark.asyncio
+async def test_async_get_user_history_fallback_to_db(async_service):
+    task_mock = MagicMock(id=1, model_type="simple", input_data='{"Age": 30}', output_data='{"score": 0.9}')
+    task_mock.created_at.isoformat.return_value = "2024-01-01T00:00:00"
+    async_service.repo.get_all_by_user_id.return_value = [task_mock]
+
+    with patch("ml_service.app.services.inference_service.async_cache_service.get_user_history_cached",
+               new=AsyncMock(return_value=None)), \
+         patch("ml_service.app.services.inference_service.async_cache_service.set_user_history_cached",
+               new=AsyncMock()) as cache_mock:
+        result = await async_service.get_user_history(user_id=2)
+
+    assert result == [task_mock]
+    assert cache_mock.call_args.args[1][0]["score"] == 0.9
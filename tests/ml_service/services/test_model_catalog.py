@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from ml_service.app.services import model_catalog as catalog_module
+from ml_service.app.services.model_catalog import ModelCatalog
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.setattr(catalog_module.settings, "slo_policy", "fallback")
+    monkeypatch.setattr(catalog_module.settings, "model_slo_s", {"premium": 2.0})
+    monkeypatch.setattr(catalog_module.settings, "model_fallbacks", {"premium": ["advanced", "simple"], "advanced": ["simple"]})
+    monkeypatch.setattr(catalog_module.settings, "catalog_min_samples", 5)
+    monkeypatch.setattr(catalog_module.settings, "catalog_latency_window", 100)
+    catalog = ModelCatalog()
+    with patch.object(catalog, "available", return_value={"simple", "premium"}), \
+         patch("ml_service.app.services.model_catalog.queue_depth", return_value=0) as depth:
+        catalog.depth = depth
+        yield catalog
+
+
+def _observe(catalog, model_type, latency_s, times=10):
+    for _ in range(times):
+        catalog.observe(model_type, {"enqueued_at": 90.0, "started_at": 100.0, "predicted_at": 100.0 + latency_s})
+
+
+def test_p95_needs_enough_samples(catalog):
+    _observe(catalog, "premium", 1.0, times=4)
+    assert catalog.p95("premium") is None
+
+    _observe(catalog, "premium", 3.0, times=1)
+    assert catalog.p95("premium") == 3.0
+
+
+def test_observe_measures_service_time_without_queue_wait(catalog):
+    for _ in range(5):
+        catalog.observe("simple", {"enqueued_at": 0.0, "started_at": 10.0, "predicted_at": 10.5, "committed_at": 11.0})
+    catalog.observe("simple", {"enqueued_at": 1.0, "committed_at": 2.0})
+
+    # ожидание в очереди (enqueued_at -> started_at) учитывает глубина очереди, а не p95
+    assert catalog.p95("simple") == 0.5
+
+
+def test_stale_samples_expire_and_degraded_model_recovers(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_module.settings, "catalog_sample_max_age_s", 60.0)
+    with patch("ml_service.app.services.model_catalog.time.monotonic", return_value=1000.0):
+        _observe(catalog, "premium", 5.0)
+        assert catalog.choose("premium") == "simple"
+
+    # новых замеров premium не приходит, пока его заменяют; старые устаревают
+    with patch("ml_service.app.services.model_catalog.time.monotonic", return_value=1061.0):
+        assert catalog.p95("premium") is None
+        assert catalog.choose("premium") == "premium"
+
+
+def test_requested_model_within_slo(catalog):
+    _observe(catalog, "premium", 1.0)
+
+    assert catalog.choose("premium") == "premium"
+
+
+def test_unknown_latency_is_admitted(catalog):
+    assert catalog.choose("premium") == "premium"
+
+
+def test_queue_backlog_falls_back_to_cheaper_available_model(catalog):
+    _observe(catalog, "premium", 1.0)
+    # 1с * (1 + 4 / 2 воркера premium) = 3с > SLO 2с; advanced без артефакта пропускается
+    catalog.depth.side_effect = lambda queue: 4 if queue.endswith("premium") else 0
+
+    assert catalog.choose("premium") == "simple"
+
+
+def test_model_without_artifact_falls_back(catalog):
+    assert catalog.choose("advanced") == "simple"
+
+
+def test_multi_requires_every_model_available(catalog):
+    catalog.require_available(["simple", "premium"])
+
+    with pytest.raises(HTTPException) as exc:
+        catalog.require_available(["simple", "advanced"])
+    assert exc.value.status_code == 503
+    assert "advanced" in exc.value.detail
+
+
+def test_reject_policy_fails_fast(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_module.settings, "slo_policy", "reject")
+    _observe(catalog, "premium", 5.0)
+
+    with pytest.raises(HTTPException) as exc:
+        catalog.choose("premium")
+    assert exc.value.status_code == 503
+    assert "Retry-After" in exc.value.headers
+
+
+def test_no_cheaper_model_within_slo(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_module.settings, "model_slo_s", {"premium": 2.0, "simple": 0.1})
+    _observe(catalog, "premium", 5.0)
+    _observe(catalog, "simple", 1.0)
+    # fallback должен быть и дешевле, и укладываться в SLO запрошенной модели
+    _observe(catalog, "simple", 3.0)
+
+    with pytest.raises(HTTPException):
+        catalog.choose("premium")
+
+
+def test_policy_off(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_module.settings, "slo_policy", "off")
+
+    assert catalog.choose("advanced") == "advanced"
+
+
+def test_models_lists_costs(catalog):
+    entries = {info.name: info for info in catalog.models()}
+
+    assert entries["premium"].cost == 5
+    assert entries["advanced"].available is False
+    assert entries["simple"].expected_latency_s is None
@@ -0,0 +1,59 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from ml_service.app.services.result_waiter import ResultWaiter
+
+
+@pytest.fixture
+def waiter():
+    waiter = ResultWaiter("redis://localhost:6379/4")
+    # подписка уже поднята: проверяем только логику ожидания
+    waiter.start = AsyncMock()
+    waiter._client = AsyncMock()
+    waiter._client.get.return_value = None
+    return waiter
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_published_result(waiter):
+    async def publish():
+        await asyncio.sleep(0.01)
+        waiter._dispatch(b"inference:result:uuid-1", json.dumps({"score": 1.0}).encode())
+
+    publisher = asyncio.create_task(publish())
+    result = await waiter.wait("uuid-1", timeout=1.0)
+    await publisher
+
+    assert result == {"score": 1.0}
+    assert waiter._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_wait_picks_up_result_published_before_subscribe(waiter):
+    waiter._client.get.return_value = json.dumps({"score": 2.0}).encode()
+
+    assert await waiter.wait("uuid-2", timeout=1.0) == {"score": 2.0}
+    waiter._client.get.assert_awaited_once_with("inference:result:uuid-2")
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out(waiter):
+    assert await waiter.wait("uuid-3", timeout=0.01) is None
+    assert waiter._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_wakes_all_waiters_of_task_only(waiter):
+    first = asyncio.create_task(waiter.wait("uuid-4", timeout=1.0))
+    second = asyncio.create_task(waiter.wait("uuid-4", timeout=1.0))
+    other = asyncio.create_task(waiter.wait("uuid-5", timeout=0.05))
+    await asyncio.sleep(0.01)
+
+    waiter._dispatch(b"inference:result:uuid-4", b'{"error": "boom"}')
+
+    assert await first == {"error": "boom"}
+    assert await second == {"error": "boom"}
+    assert await other is None